@@ -1,2 +1,7 @@
-from experimentspydesign.factors import FactorDiscrete, FactorContinuous, FactorCombo, FactorBase
-from experimentspydesign.designs import Design, ls, ccdesign, bbdesign, fullfact, ff2n, lhs
+__version__ = '0.8.0'
+
+from experimentspydesign.factors import FactorDiscrete, FactorContinuous, FactorCombo, FactorBase, FactorProduct
+from experimentspydesign.designs import (Design, ls, ccdesign, bbdesign, fullfact, ff2n, lhs, orthogonal_maximin_lhs,
+                                         multistart_lhs, augment_lhs, FullFactorial, CodedDesign, Sobol, Halton,
+                                         sobol, halton, optimal_design, FractionalFactorial,
+                                         fracfact, pbdesign, oa)
@@ -0,0 +1,241 @@
+"""Caches of computed designs
+
+Coded base designs (the -1..1 runs of ff2n, ccdesign and bbdesign before factors are scaled) only depend on a few
+structural parameters, BASE_DESIGNS keeps the most recently used ones in memory as read-only arrays and, when it has
+a directory, as .npy files every process using the same directory can load instead of building them again.
+The directory of BASE_DESIGNS is read from the EXPERIMENTSPYDESIGN_CACHE environment variable.
+
+EXAMPLE, share base designs between the workers of a design service:
+
+    >> from experimentspydesign.cache import BASE_DESIGNS
+    >> BASE_DESIGNS.directory = '/var/cache/designs'
+    >> ccdesign(6)                       # built once, later calls and other processes reuse the coded runs
+
+Designs found by a search, like orthogonal_maximin_lhs with an int seed, are stored in a DesignCache. Its files
+are named by a hash of every parameter of the search and the library version, they are loaded memory mapped and the
+least recently used files are removed once the directory is larger than its size limit.
+
+EXAMPLE:
+
+    >> cache = DesignCache('/var/cache/designs', max_bytes=2 ** 30)
+    >> orthogonal_maximin_lhs(8, n_samples=200, rng=7, cache=cache)     # minutes the first time, then a file read
+"""
+import os
+import json
+from collections import OrderedDict
+from hashlib import sha256
+from re import sub
+from tempfile import mkstemp
+from numpy import asarray, generic, load, save
+
+
+def _atomic_save(path, array):
+    """Write an array to a .npy file, readers never see a partially written file because it is written to a
+    temporary file in the same directory and renamed over 'path'
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary = mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            save(f, array, allow_pickle=False)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def _read_only(array):
+    array = asarray(array)
+    array.setflags(write=False)
+    return array
+
+
+class BaseDesignCache(object):
+    """Least recently used cache of read-only arrays keyed by tuples of structural parameters, with an optional
+    directory of .npy files as a second tier
+    """
+
+    def __init__(self, maxsize=128, directory=None):
+        """
+
+        :param maxsize: int, number of arrays kept in memory
+        :param directory: str, directory of the persistent tier, default None only caches in memory
+        """
+        self.maxsize = maxsize
+        self.directory = directory
+        self._arrays = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._arrays)
+
+    def __contains__(self, key):
+        return key in self._arrays
+
+    def _path(self, key):
+        name = '-'.join([sub(r'[^\w.]', '_', str(part)) for part in key])
+        return os.path.join(self.directory, name + '.npy')
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+        try:
+            return load(self._path(key), allow_pickle=False)
+        except (OSError, ValueError):
+            # missing or unreadable, it is built again and the file replaced
+            return None
+
+    def get(self, key, build):
+        """Array for 'key', built with build() only when neither tier has it
+
+        :param key: tuple of str, int and float
+        :param build: callable without arguments returning the array
+        :return: read-only numpy.ndarray, shared by every caller
+        """
+        if key in self._arrays:
+            self.hits += 1
+            self._arrays.move_to_end(key)
+            return self._arrays[key]
+        self.misses += 1
+        array = self._load(key)
+        if array is None:
+            array = asarray(build())
+            if self.directory is not None:
+                _atomic_save(self._path(key), array)
+        array = _read_only(array)
+        self._arrays[key] = array
+        while len(self._arrays) > self.maxsize:
+            self._arrays.popitem(last=False)
+        return array
+
+    def clear(self):
+        """Forget every array in memory, files of the directory are kept"""
+        self._arrays.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+BASE_DESIGNS = BaseDesignCache(directory=os.environ.get('EXPERIMENTSPYDESIGN_CACHE'))
+
+
+def _to_builtin(value):
+    return value.item() if isinstance(value, generic) else repr(value)
+
+
+class DesignCache(object):
+    """Directory of .npy files of computed designs addressed by a sha256 of the parameters that produced them,
+    any number of processes may share a directory
+    """
+
+    def __init__(self, directory, max_bytes=2 ** 30, mmap=True):
+        """
+
+        :param directory: str, directory of the cached files, created when it does not exist
+        :param max_bytes: int, size of the directory after which the least recently used files are removed
+        :param mmap: bool, load files memory mapped read-only instead of reading them into memory
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.mmap = mmap
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(**params):
+        """Hex digest of the parameters of a design and the library version, parameters must be json serializable
+        or have a repr that identifies them
+        """
+        from experimentspydesign import __version__
+        params = dict(params, __version__=__version__)
+        text = json.dumps(params, sort_keys=True, default=_to_builtin)
+        return sha256(text.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npy')
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        """Cached array of 'key' or None, a hit marks the file as most recently used
+
+        :param key: str, from DesignCache.key
+        :return: numpy.ndarray, memory mapped read-only when the cache uses mmap
+        """
+        path = self._path(key)
+        try:
+            array = load(path, mmap_mode='r' if self.mmap else None, allow_pickle=False)
+            os.utime(path)
+        except (OSError, ValueError):
+            # missing, removed by another process or unreadable
+            return None
+        if not self.mmap:
+            array.setflags(write=False)
+        return array
+
+    def put(self, key, array):
+        """Store an array under 'key' and remove least recently used files when the directory is too large
+
+        :return: numpy.ndarray, the array as get returns it
+        """
+        _atomic_save(self._path(key), asarray(array))
+        self.evict()
+        cached = self.get(key)
+        return cached if cached is not None else _read_only(array)
+
+    def get_or_compute(self, compute, **params):
+        """Cached array for 'params' or the result of compute() which is stored for later calls
+
+        :param compute: callable without arguments returning a numpy.ndarray
+        :param params: every parameter that determines the result of compute
+        :return: numpy.ndarray
+        """
+        key = self.key(**params)
+        array = self.get(key)
+        if array is None:
+            array = self.put(key, compute())
+        return array
+
+    def _files(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npy'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+        return files
+
+    @property
+    def nbytes(self):
+        return sum([size for _, size, _ in self._files()])
+
+    def evict(self, max_bytes=None):
+        """Remove the least recently used files until the directory is at most 'max_bytes'
+
+        :param max_bytes: int, default None uses the cache's max_bytes
+        :return: int, number of files removed
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        files = sorted(self._files())
+        total = sum([size for _, size, _ in files])
+        removed = 0
+        for _, size, name in files:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                removed += 1
+            except OSError:
+                # another process removed it first
+                pass
+            total -= size
+        return removed
+
+    def clear(self):
+        """Remove every cached file"""
+        return self.evict(0)
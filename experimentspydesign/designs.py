@@ -1,9 +1,20 @@
-from copy import copy
-from numpy import argmax, sqrt, power, vstack, corrcoef, array, arange, mod, zeros, prod, eye, unique
-from numpy.random import permutation
-from experimentspydesign.tools import latin_hyper_index
-from experimentspydesign.factors import FactorBase, FactorDiscrete, FactorCombo
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from time import time
+from warnings import warn
+from numpy import (argmax, argmin, sqrt, power, vstack, array, arange, mod, zeros, prod, eye, unique, empty, exp,
+                   fill_diagonal, inf, triu_indices, asarray, rint, clip, ones, flatnonzero, linspace, int64,
+                   integer, where, int8, int16, int32, iinfo, bincount, cumsum, newaxis, kron)
+from numpy.random import permutation, default_rng, SeedSequence
+from experimentspydesign.factors import FactorBase, FactorDiscrete, FactorCombo, FactorArray
+from experimentspydesign.levels import LevelRange
 from experimentspydesign.services import FormattedDict
+from experimentspydesign.metrics import (correlation_matrix, distance_squared, distance_rectangular, condensed_distances,
+                                         row_phi_sums)
+from experimentspydesign.spatial import KDTree
+from experimentspydesign.sequences import SobolSequence, HaltonSequence
+from experimentspydesign.optimal import model_terms, coordinate_exchange, fedorov_exchange
+from experimentspydesign.cache import BASE_DESIGNS
 
 
 class Design(FormattedDict):
@@ -33,71 +44,220 @@ class Design(FormattedDict):
             self[name].name = name
 
 
-def ls(*design, by=None, def_scale='traditional'):
+def _code_dtype(n_levels):
+    for dtype in (int8, int16, int32):
+        if n_levels <= iinfo(dtype).max + 1:
+            return dtype
+    return int64
+
+
+class CodedDesign(object):
+    """Design stored as small integer level codes for each run and a table of values for each factor, values are
+    only decoded when they are needed with one take per column
+
+    A factor with at most 128 levels uses one byte per run instead of the eight of a float64 matrix and changing the
+    values of a factor's levels swaps its table without touching the runs. Every run at a level decodes to the same
+    value, a level that is a range of values decodes to the single value of the level instead of a value drawn for
+    each run
+
+    EXAMPLE:
+
+        >> coded = fullfact([10, 20, 30], [0.1, 0.2], 4, coded=True)
+        >> coded.codes.dtype                     # int8
+        >> coded.decode()                        # the matrix fullfact returns for levels with single values
+        >> coded.relabel(0, [15, 20, 25])        # new levels for the first factor, codes are shared
+    """
+
+    def __init__(self, codes, tables, names=None):
+        """
+
+        :param codes: numpy.ndarray (m, k) of int, index of each run's level in the factor's table
+        :param tables: list of array-like, values of each factor's levels
+        :param names: list of str, names of the factors
+        """
+        tables = [asarray(table) for table in tables]
+        codes = asarray(codes)
+        if codes.ndim != 2 or codes.shape[1] != len(tables):
+            raise ValueError('codes must be an array of shape (m, {}), not {}'.format(len(tables), codes.shape))
+        dtype = _code_dtype(max([len(table) for table in tables] + [1]))
+        self._codes = codes if codes.dtype == dtype else codes.astype(dtype)
+        self._tables = tables
+        self._names = list(names) if names is not None else ['factor_{:02d}'.format(j) for j in range(len(tables))]
+
+    @classmethod
+    def from_raw(cls, raw_design, *design, def_scale='traditional'):
+        """Code a raw design with each column scaled to [-1, 1], for factors whose levels are single values the
+        decoded values are the values measure_scale gives the raw design, levels that are ranges decode to the value
+        of the level where measure_scale samples the range for each run
+
+        :param raw_design: numpy.ndarray (m, k)
+        :param design: definitions of factors' levels in design, factors defined with an int will be
+            scaled per the method selected with the def_scale argument
+        :param def_scale: str, paradigm for scaling factors that don't have values defined
+        :return: CodedDesign
+        """
+        raw_design = asarray(raw_design, dtype=float)
+        m, k = raw_design.shape
+        if len(design) == 1 and k > 1:
+            design = design[0].values() if isinstance(design[0], dict) else design[0]
+        design = list(design) if len(design) > 0 else [2] * k
+
+        codes = empty((m, k), dtype=_code_dtype(m))
+        tables = []
+        for j, factor in enumerate(design):
+            values, codes[:, j] = unique(raw_design[:, j], return_inverse=True)
+            tables.append(_column_table(factor, values, def_scale=def_scale))
+        names = [factor.name if isinstance(factor, FactorBase) else 'factor_{:02d}'.format(j)
+                 for j, factor in enumerate(design)]
+        return cls(codes, tables, names=names)
+
+    @property
+    def codes(self):
+        return self._codes
+
+    @property
+    def tables(self):
+        return self._tables
+
+    @property
+    def names(self):
+        return self._names
+
+    @property
+    def shape(self):
+        return self._codes.shape
+
+    @property
+    def nbytes(self):
+        return self._codes.nbytes + sum([table.nbytes for table in self._tables])
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __getitem__(self, rows):
+        """Runs of the design, still coded and sharing the tables"""
+        codes = self._codes[rows]
+        return CodedDesign(codes.reshape(-1, len(self._tables)), self._tables, names=self._names)
+
+    def _column(self, column):
+        if isinstance(column, str):
+            if column not in self._names:
+                raise KeyError("'{}' is not a factor of the design: {}".format(column, self._names))
+            return self._names.index(column)
+        return column
+
+    def decode(self, column=None):
+        """Values of every run
+
+        :param column: int or str, index or name of a single factor to decode, default None decodes every factor
+        :return: numpy.ndarray (m, k) or (m,) for a single factor
+        """
+        if column is not None:
+            j = self._column(column)
+            return self._tables[j].take(self._codes[:, j])
+        return _stack_columns([table.take(self._codes[:, j]) for j, table in enumerate(self._tables)])
+
+    def __array__(self, dtype=None, copy=None):
+        d = self.decode()
+        return d if dtype is None else d.astype(dtype)
+
+    def relabel(self, column, table):
+        """New design with the values of one factor's levels replaced, runs keep their codes
+
+        :param column: int or str, index or name of the factor
+        :param table: array-like, new values for each of the factor's levels
+        :return: CodedDesign
+        """
+        j = self._column(column)
+        table = asarray(table)
+        if len(table) != len(self._tables[j]):
+            raise ValueError('Factor {} has {} levels, the new table has {} values'.format(
+                self._names[j], len(self._tables[j]), len(table)))
+        tables = list(self._tables)
+        tables[j] = table
+        return CodedDesign(self._codes, tables, names=self._names)
+
+
+def ls(*design, by=None, def_scale='traditional', seed=None, n_workers=0):
     """Create a Latin Square or Rectangle from factor definitions, sparse quick design for a large number of factors
 
+    The design has a run for each level of the factor with the most levels, every other factor's levels are tiled
+    from random permutations so each level is used equally often (within one run). With 'by' a latin table of the
+    other factors is made for every level of the 'by' factor, all blocks are generated in one batched draw or
+    in groups across a process pool when there are very many blocks.
+
     :param design: definitions of factors' levels in design, factors defined with an int will be
         scaled per the method selected with the def_scale argument
-    :param by: str, name of factor to block experiment
+    :param by: str or int, name or position of factor to block experiment
     :param def_scale: str, paradigm for scaling factors that don't have a high and low defined
             'traditional' : scale output to [-1, 1]
             'standard' : scale output to [0, 1]
             'level_n' : scale output to [1, n]
-    :return: numpy.ndarray, a table with experiment values for each factor
+    :param seed: int or numpy.random.SeedSequence, entropy of the generators, groups of blocks use spawned
+        generators so the design does not depend on n_workers
+    :param n_workers: int, number of worker processes for groups of blocks, None uses all cpus, default 0 generates
+        every block in this process
+    :return: numpy.ndarray, a table with experiment values for each factor in the order the factors are defined,
+        blocks follow each other when 'by' is used
     """
-    if isinstance(design[0], dict):
-        design = design[0]
+    if len(design) == 1 and isinstance(design[0], dict):
+        keys, factors = list(design[0].keys()), list(design[0].values())
     else:
-        design, n_factors, rescale = _parse_design(*design)
-        design = dict([(i, factor) for i, factor in enumerate(design)])
+        factors, n_factors, rescale = _parse_design(*design)
+        factors = list(factors) if len(factors) > 0 else [2] * n_factors
+        keys = list(range(len(factors)))
+    sizes = [f if type(f) is int else len(f) for f in factors]
 
+    blocked = None
     if by is not None:
-        tables = []
-        blocks = design[by].values
-        des = copy(design)
-        des.pop(by)
-        for b in blocks:
-            tables.append(ls(des))
-            tables[-1][by] = b
-        return tables  # concat(tables)
-
-    sizes = []
-    factors = []
-    for factor in design.keys():
-        if type(design[factor]) is int:
-            sizes.append(design[factor])
-        else:
-            sizes.append(len(design[factor]))
-        factors.append(factor)
-    i_max = argmax(sizes)
-    f_max = factors[i_max]
-
-    factors.remove(f_max)
-    table = []
-    # switch to accommodate different factor definitions and ensure each type properly initializes the output table
-    if type(design[f_max]) is int:
-        # if just an integer for the number of levels is passed then create n levels from -1 to 1
-        table.append(arange(design[f_max]))
-    elif isinstance(design[f_max], FactorBase):
-        table.append(array(design[f_max].levels.values()))
-    elif isinstance(design[f_max], dict):
-        table.append(array(design[f_max].values()))
+        if by not in keys:
+            raise KeyError("Blocking factor '{}' is not one of the design's factors: {}".format(by, keys))
+        blocked = keys.index(by)
+    other = [j for j in range(len(factors)) if j != blocked]
+    n_runs = max([sizes[j] for j in other] + [1])
+    n_blocks = sizes[blocked] if blocked is not None else 1
+
+    seed = _seed_sequence(seed)
+    groups = [min(_LS_GROUP, n_blocks - start) for start in range(0, n_blocks, _LS_GROUP)]
+    seeds = seed.spawn(len(groups) + 1)
+    args = [(n_runs, [sizes[j] for j in other], n, s) for n, s in zip(groups, seeds[1:])]
+    if n_workers == 0 or len(groups) == 1:
+        codes = [_latin_codes(*a) for a in args]
     else:
-        table.append(array(design[f_max]))
-
-    for f_name in factors:
-        hyper_ix = latin_hyper_index(design[f_max], design[f_name])
-        # switch to accommodate different factor definitions
-        if type(design[f_name]) is int:
-            table.append(hyper_ix / hyper_ix.max() * 2 - 1)
-        elif isinstance(design[f_name], FactorBase):
-            latin = [design[f_name][hi].value for hi in hyper_ix]
-        else:
-            latin = [design[f_name][hi] for hi in hyper_ix]
-        table.append(array(latin))
-    # TODO include a way to re-sample the factors in the design
-    # size = sizes[i_max] if size < sizes[i_max] else size
-    return table  # vstack(table).T
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            codes = list(pool.map(_latin_codes, *zip(*args)))
+    codes = vstack([c.reshape(-1, len(other)) for c in codes])
+
+    raw = empty((n_blocks * n_runs, len(factors)))
+    for c, j in enumerate(other):
+        raw[:, j] = codes[:, c] / max(sizes[j] - 1, 1) * 2 - 1
+    if blocked is not None:
+        raw[:, blocked] = arange(n_blocks).repeat(n_runs) / max(n_blocks - 1, 1) * 2 - 1
+    return measure_scale(*factors, raw_design=raw, def_scale=def_scale, rng=default_rng(seeds[0]))
+
+
+# number of blocks of a latin table generated by one task
+_LS_GROUP = 256
+
+
+def _seed_sequence(seed):
+    """SeedSequence to spawn children from, a copy of a SeedSequence that is passed in so spawning never changes the
+    caller's object and the same SeedSequence always gives the same children
+    """
+    if isinstance(seed, SeedSequence):
+        return SeedSequence(seed.entropy, spawn_key=seed.spawn_key, pool_size=seed.pool_size)
+    return SeedSequence(seed)
+
+
+def _latin_codes(n_runs, n_levels, n_blocks, seed):
+    """Level codes (n_blocks, n_runs, len(n_levels)) of latin tables, a column of a factor with n levels is the first
+    n_runs values of ceil(n_runs / n) random permutations of range(n)"""
+    rng = default_rng(seed)
+    codes = empty((n_blocks, n_runs, len(n_levels)), dtype=int)
+    for j, n in enumerate(n_levels):
+        reps = -(-n_runs // n)
+        codes[:, :, j] = rng.random((n_blocks, reps, n)).argsort(axis=-1).reshape(n_blocks, -1)[:, :n_runs]
+    return codes
 
 
 def _parse_design(*design):
@@ -117,7 +277,7 @@ def _parse_design(*design):
     return design, n_factors, rescale
 
 
-def lhs(*design, n_samples=None, def_scale='traditional'):
+def lhs(*design, n_samples=None, def_scale='traditional', coded=False):
     """Randomly combine 'n_samples' evenly spaced values for each factor with
     other factor values to create a space filling design
 
@@ -128,6 +288,7 @@ def lhs(*design, n_samples=None, def_scale='traditional'):
             'traditional' : scale output to [-1, 1]
             'standard' : scale output to [0, 1]
             'level_n' : scale output to [1, n]
+    :param coded: bool, return a CodedDesign of level codes and value tables instead of the values
     :return: numpy.ndarray, a table with experiment values for each factor
     """
     design, n_factors, rescale = _parse_design(*design)
@@ -138,11 +299,13 @@ def lhs(*design, n_samples=None, def_scale='traditional'):
     basis = arange(0, n_samples)
     hyper = vstack([permutation(basis) for _ in range(n_factors)]).T
 
-    hyper = measure_scale(*design, raw_design=hyper / hyper.max(axis=0, keepdims=True) * 2 - 1, def_scale=def_scale)
-    return hyper
+    raw = hyper / hyper.max(axis=0, keepdims=True) * 2 - 1
+    if coded:
+        return CodedDesign.from_raw(raw, *design, def_scale=def_scale)
+    return measure_scale(*design, raw_design=raw, def_scale=def_scale)
 
 
-def ccdesign(*design, face='ccc', alpha='rotatable', n_centers=None, def_scale='traditional'):
+def ccdesign(*design, face='ccc', alpha='rotatable', n_centers=None, def_scale='traditional', coded=False):
     """Central Composite a rotatable design useful for quadratic models with a small number of factors
     NOTE when including DiscreteFactors the design will not be rotatable
 
@@ -160,6 +323,7 @@ def ccdesign(*design, face='ccc', alpha='rotatable', n_centers=None, def_scale='
             'traditional' : scale output to [-1, 1]
             'standard' : scale output to [0, 1]
             'level_n' : scale output to [1, n]
+    :param coded: bool, return a CodedDesign of level codes and value tables instead of the values
     :return: numpy.ndarray, a table with experiment values for each factor
     """
 
@@ -168,9 +332,9 @@ def ccdesign(*design, face='ccc', alpha='rotatable', n_centers=None, def_scale='
             n_factors = design[0]
             design = [5] * n_factors
         elif isinstance(design[0], dict):
-            return ccdesign(*list(design[0].values()), face=face, alpha=alpha, n_centers=n_centers)
+            return ccdesign(*list(design[0].values()), face=face, alpha=alpha, n_centers=n_centers, coded=coded)
         elif hasattr(design[0], '__iter__'):
-            return ccdesign(*design[0], face=face, alpha=alpha, n_centers=n_centers)
+            return ccdesign(*design[0], face=face, alpha=alpha, n_centers=n_centers, coded=coded)
         else:
             raise TypeError('Factor definition must be an iterable of Factor instances or an integer ')
     else:
@@ -179,9 +343,21 @@ def ccdesign(*design, face='ccc', alpha='rotatable', n_centers=None, def_scale='
     if n_centers is None:
         n_centers = power(2 ** (n_factors - 1) + 2 * (n_factors - 1), 0.27).astype(int) + 4
 
+    d = BASE_DESIGNS.get(('ccdesign', n_factors, face, alpha, int(n_centers)),
+                         lambda: _cc_base(n_factors, face, alpha, int(n_centers)))
+
+    if coded:
+        return CodedDesign.from_raw(d, *design, def_scale=def_scale)
+    d = measure_scale(*design, raw_design=d, def_scale=def_scale)
+
+    return d
+
+
+def _cc_base(n_factors, face, alpha, n_centers):
+    """Coded runs of a central composite design: the 2k factorial, star points and center points"""
     C = zeros((n_centers, n_factors))
 
-    F = ff2n(n_factors)
+    F = _ff2n_base(n_factors)
 
     if face == 'ccf':
         # if Face-Centered then star points are on faces and nothing is scaled
@@ -198,33 +374,38 @@ def ccdesign(*design, face='ccc', alpha='rotatable', n_centers=None, def_scale='
 
     if face == 'cci':
         d /= alpha
-
-    d = measure_scale(*design, raw_design=d, def_scale=def_scale)
-
     return d
 
 
-def measure_scale(*design, raw_design=None, def_scale='traditional'):
+def measure_scale(*design, raw_design=None, def_scale='traditional', rng=None):
     """Scale a design to defined factor levels, factors which only have an int for number of levels
     will be scaled by the method selected with the def_scale argument
 
+    Each column is coded with unique(return_inverse=True) and its values are taken from a table of the factor's
+    value for each code, levels that are ranges are sampled for every run with one vectorized draw per factor
+
     :param design: definitions of factors' levels in design, factors defined with an int will be
         scaled per the method selected with the def_scale argument
-    :param raw_design: numpy.ndarray with each column scaled to factor values of low=-1 and high=1
+    :param raw_design: numpy.ndarray with each column scaled to factor values of low=-1 and high=1, or a list of
+        such arrays which are scaled together and returned as a list
     :param def_scale: str, paradigm for scaling factors that don't have a high and low defined
             'traditional' : scale output to [-1, 1]
             'standard' : scale output to [0, 1]
             'level_n' : scale output to [1, n]
+    :param rng: numpy.random.Generator or int seed used to sample levels that are ranges,
+        default None uses numpy.random's global generator
     :return: numpy.ndarray design with values scaled to factor ranges
     """
-    # make a copy of the design and scale from [-1, 1] to [0, 1]
-    d = raw_design / 2 + 0.5
-
     if raw_design is None:
         return [[]]
-    elif len(design) == 1:
-        return measure_scale(*design[0], raw_design=raw_design)
-    elif len(design) == 0:
+    elif isinstance(raw_design, (list, tuple)):
+        return _measure_scale_many(*design, raw_designs=raw_design, def_scale=def_scale, rng=rng)
+
+    # scale from [-1, 1] to [0, 1]
+    d = raw_design / 2 + 0.5
+    if len(design) == 1 and d.shape[1] > 1:
+        design = list(design[0].values()) if isinstance(design[0], dict) else list(design[0])
+    if len(design) == 0:
         if def_scale == 'traditional':
             return d * 2 - 1
         elif def_scale == 'level_n':
@@ -236,57 +417,33 @@ def measure_scale(*design, raw_design=None, def_scale='traditional'):
         else:
             return d
 
-    all_ints = True
-    for i in range(len(design)):
-        to_int = False
-
-        values = unique(d[:, i])
-        if isinstance(design[i], int):
-            # if argument for a factor is only an integer assume continuous and linear mapping then scale directly
-            if def_scale == 'level_n':
-                to_int = True
-                low = 1
-                high = len(unique(d[:, i]))
-            elif def_scale == 'traditional':
-                low = -1
-                high = 1
-            else:
-                low = 0
-                high = 1
-            d[:, i] = _scale(d[:, i], high - low, low, to_int=to_int)
-        elif len(design[i]) == len(values):
-            d_i = d[:, i] + 0
-            # if the number of defined levels in the argument matches the number in the design then directly
-            # use the level values from argument in the design
-            if isinstance(design[i], FactorBase):
-                for v, level in zip(values, design[i].values()):
-                    ix = d_i == v
-                    d[ix, i] = array([level.value for _ in range(ix.sum())])
-            elif isinstance(design[i], dict):
-                for v, level in zip(values, design[i].values()):
-                    ix = d_i == v
-                    d[ix, i] = level
-            elif hasattr(design[i], '__iter__'):
-                for j, v in enumerate(values):
-                    ix = d_i == v
-                    d[ix, i] = design[i][j]
+    rng = default_rng(rng) if rng is not None else None
+    columns = []
+    for i, factor in enumerate(design):
+        values, codes = unique(raw_design[:, i], return_inverse=True)
+        if isinstance(factor, FactorBase) and len(factor) == len(values):
+            columns.append(factor.sample(codes.reshape(-1), rng=rng))
         else:
-            # if number of defined level values in argument do not match number of values in design
-            # assume a continuous and linear mapping and scale using the high and low values from argument
-            if isinstance(design[i], FactorBase):
-                low = min(design[i].values()).lower
-                high = max(design[i].values()).upper
-                to_int = isinstance(design[i], FactorDiscrete)
-            elif isinstance(design[i], dict):
-                low = min(design[i].values())
-                high = max(design[i].values())
-            elif hasattr(design[i], '__iter__'):
-                low = min(design[i])
-                high = max(design[i])
-            d[:, i] = _scale(d[:, i], high - low, low, to_int=to_int)
-        all_ints = all_ints and abs(d[:, i] - d[:, i].round()).sum() == 0
-
-    return d.astype(int) if all_ints else d
+            columns.append(_column_table(factor, values, def_scale=def_scale).take(codes.reshape(-1)))
+    return _stack_columns(columns)
+
+
+def _measure_scale_many(*design, raw_designs=(), def_scale='traditional', rng=None):
+    raw_designs = [asarray(raw) for raw in raw_designs]
+    if len(raw_designs) == 0:
+        return []
+    sizes = [len(raw) for raw in raw_designs]
+    stacked = vstack(raw_designs)
+    # the designs can only be scaled as one when every design has all of the stack's values in each column,
+    # otherwise matching the number of levels to the factor definitions could differ between designs
+    design_ix = arange(len(raw_designs)).repeat(sizes)
+    for i in range(stacked.shape[1]):
+        values, codes = unique(stacked[:, i], return_inverse=True)
+        present = bincount(design_ix * len(values) + codes.reshape(-1), minlength=len(values) * len(raw_designs))
+        if (present.reshape(len(raw_designs), len(values)) == 0).any():
+            return [measure_scale(*design, raw_design=raw, def_scale=def_scale, rng=rng) for raw in raw_designs]
+    scaled = measure_scale(*design, raw_design=stacked, def_scale=def_scale, rng=rng)
+    return [scaled[s:e] for s, e in zip(cumsum([0] + sizes[:-1]), cumsum(sizes))]
 
 
 def _scale(f, spread, low, to_int=False):
@@ -299,7 +456,7 @@ def _scale(f, spread, low, to_int=False):
     return x
 
 
-def bbdesign(*design, n_centers=None, def_scale='traditional'):
+def bbdesign(*design, n_centers=None, def_scale='traditional', coded=False):
     """Box-Behnken an efficient rotatable design useful for quadratic models with a small to moderate number of factors
     NOTE when DiscreteFactors are included the design will not be rotatable
 
@@ -311,6 +468,7 @@ def bbdesign(*design, n_centers=None, def_scale='traditional'):
             'traditional' : scale output to [-1, 1]
             'standard' : scale output to [0, 1]
             'level_n' : scale output to [1, n]
+    :param coded: bool, return a CodedDesign of level codes and value tables instead of the values
     :return: numpy.ndarray design with values scaled to factor ranges
     """
 
@@ -319,36 +477,43 @@ def bbdesign(*design, n_centers=None, def_scale='traditional'):
             n_factors = design[0]
             design = [3] * n_factors
         elif isinstance(design[0], dict):
-            return bbdesign(*list(design[0].values()), n_centers=n_centers)
+            return bbdesign(*list(design[0].values()), n_centers=n_centers, coded=coded)
         elif hasattr(design[0], '__iter__'):
-            return bbdesign(*design[0], n_centers=n_centers)
+            return bbdesign(*design[0], n_centers=n_centers, coded=coded)
     else:
         n_factors = len(design)
 
     if n_centers is None:
         n_centers = power(2 ** (n_factors - 3) + 2 * (n_factors - 3), 0.27).astype(int) + 4
 
-    f_ = ff2n(2, def_scale='traditional')
-    m, n = f_.shape
-    v = n_factors * (n_factors - 1) // 2
+    d = BASE_DESIGNS.get(('bbdesign', n_factors, int(n_centers)), lambda: _bb_base(n_factors, int(n_centers)))
 
-    F = zeros((v * m, n_factors))
+    if coded:
+        return CodedDesign.from_raw(d, *design, def_scale=def_scale)
+    d = measure_scale(*design, raw_design=d, def_scale=def_scale)
 
-    for o, (i, j) in enumerate([(i, j) for i in range(n_factors) for j in range(n_factors) if j > i]):
-        F[o * m:(o + 1) * m, i] = f_[:, 0]
-        F[o * m:(o + 1) * m, j] = f_[:, 1]
+    return d
 
-    C = zeros((n_centers, n_factors))
 
-    d = vstack([F, C])
+def _bb_base(n_factors, n_centers):
+    """Coded runs of a Box-Behnken design, a 2^2 factorial for every pair of factors followed by center points"""
+    f_ = _ff2n_base(2)
+    m, n = f_.shape
+    i, j = triu_indices(n_factors, 1)
 
-    d = measure_scale(*design, raw_design=d, def_scale=def_scale)
+    F = zeros((len(i), m, n_factors))
+    blocks = arange(len(i))[:, newaxis]
+    F[blocks, :, i[:, newaxis]] = f_[:, 0]
+    F[blocks, :, j[:, newaxis]] = f_[:, 1]
 
-    return d
+    C = zeros((n_centers, n_factors))
+
+    return vstack([F.reshape(-1, n_factors), C])
 
 
-def fullfact(*design, def_scale='traditional'):
-    """Full Factorial design: all combinations of all factors' level values
+def fullfact(*design, def_scale='traditional', coded=False, rng=None):
+    """Full Factorial design: all combinations of all factors' level values, levels that are ranges are sampled for
+    every run like measure_scale
 
     :param design: definitions of factors' levels in design, factors defined with an int will be
         scaled per the method selected with the def_scale argument
@@ -356,19 +521,20 @@ def fullfact(*design, def_scale='traditional'):
             'traditional' : scale output to [-1, 1]
             'standard' : scale output to [0, 1]
             'level_n' : scale output to [1, n]
+    :param coded: bool, return a CodedDesign of level codes and value tables instead of the values, a level that is
+        a range decodes to the single value of the level
+    :param rng: numpy.random.Generator or int seed used to sample levels that are ranges,
+        default None uses numpy.random's global generator
     :return:
     """
-    design, n_factors, rescale = _parse_design(*design)
+    ff = FullFactorial(*design, def_scale=def_scale, rng=rng)
+    if coded:
+        codes = ff.codes(arange(len(ff)), dtype=_code_dtype(max(ff.levels + [1])))
+        return CodedDesign(codes, ff.tables, names=ff.names)
+    return ff[:]
 
-    d = _full_fact(*design)
-    # raw_designs have to be scaled [-1, 1] for the low, high values of the factor
-    d = d / d.max(axis=0, keepdims=True) * 2 - 1
-    d = measure_scale(*design, raw_design=d, def_scale=def_scale)
-
-    return d
 
-
-def _full_fact(*design):
+def _n_levels(*design):
     design, n_factors, rescale = _parse_design(*design)
     factors_n_levels = []
     for arg in design:
@@ -376,6 +542,11 @@ def _full_fact(*design):
             factors_n_levels.append(len(arg))
         elif type(arg) is int:
             factors_n_levels.append(arg)
+    return factors_n_levels
+
+
+def _full_fact(*design):
+    factors_n_levels = _n_levels(*design)
 
     basis = arange(prod(factors_n_levels))
     f = []
@@ -386,7 +557,215 @@ def _full_fact(*design):
     return array(f).T
 
 
-def ff2n(*design, def_scale='traditional'):
+def _column_table(factor, raw_values, def_scale='traditional'):
+    """Values of one factor for each of its sorted raw design values, the same scaling measure_scale applies to a
+    column
+
+    :param factor: definition of the factor's levels, an int, iterable, dict or Factor instance
+    :param raw_values: numpy.ndarray, sorted unique values of the factor's column scaled to [-1, 1]
+    :param def_scale: str, paradigm for scaling factors that don't have values defined
+    :return: numpy.ndarray, value of the factor for each raw value
+    """
+    d = asarray(raw_values, dtype=float) / 2 + 0.5
+    if isinstance(factor, int):
+        if def_scale == 'level_n':
+            return _scale(d, len(d) - 1, 1, to_int=True)
+        elif def_scale == 'traditional':
+            return _scale(d, 2, -1)
+        return d
+    elif len(factor) == len(d):
+        if isinstance(factor, FactorBase):
+            return array([level.value for level in factor.values()])
+        elif isinstance(factor, dict):
+            return array(list(factor.values()))
+        return array(list(factor))
+
+    low, high, to_int = _factor_range(factor)
+    return _scale(d, high - low, low, to_int=to_int)
+
+
+def _factor_range(factor):
+    # lowest and highest value of a factor's levels and whether its values are rounded to int
+    if isinstance(factor, FactorBase):
+        return min(factor.values()).lower, max(factor.values()).upper, isinstance(factor, FactorDiscrete)
+    elif isinstance(factor, dict):
+        return min(factor.values()), max(factor.values()), False
+    return min(factor), max(factor), False
+
+
+def _continuous_column(factor, raw_values, def_scale='traditional'):
+    """Values of one factor for raw values in [-1, 1] mapped onto the range of the factor's levels, unlike
+    _column_table the mapping does not depend on which or how many values are scaled, Factors with level bounds are
+    mapped with FactorArray.quantile
+
+    :param factor: definition of the factor's levels, an int, iterable, dict or Factor instance
+    :param raw_values: numpy.ndarray, values of the factor's column scaled to [-1, 1]
+    :param def_scale: str, paradigm for scaling factors that don't have values defined, 'level_n' rounds an int
+        factor's values to 1..n
+    :return: numpy.ndarray
+    """
+    d = asarray(raw_values, dtype=float) / 2 + 0.5
+    if isinstance(factor, int):
+        if def_scale == 'level_n':
+            return _scale(d, factor - 1, 1, to_int=True)
+        elif def_scale == 'traditional':
+            return _scale(d, 2, -1)
+        return d
+    elif isinstance(factor, FactorArray):
+        # levels take equal shares of the range so discrete levels are used equally often
+        return factor.quantile(d)
+    low, high, to_int = _factor_range(factor)
+    return _scale(d, high - low, low, to_int=to_int)
+
+
+def _has_ranges(factor):
+    # factors with a level that is a range of values draw a value for every run instead of using their table
+    return isinstance(factor, FactorBase) and any([isinstance(level, LevelRange) and level.lower != level.upper
+                                                   for level in factor.values()])
+
+
+def _stack_columns(columns):
+    # columns of one dtype, cast to int when every value is a whole number like measure_scale
+    d = vstack(columns).T if len(columns) > 0 else empty((0, 0))
+    if d.dtype.kind == 'f' and (d == d.round()).all():
+        return d.astype(int)
+    return d
+
+
+class FullFactorial(object):
+    """Full factorial design that is never materialized, run i is decoded from its index with mixed radix
+    arithmetic in the same order as fullfact, the first factor changes fastest
+
+    Levels with a single value are taken from the factor's table, levels that are ranges are sampled every time a
+    run is decoded, like measure_scale does for each run of a materialized design
+
+    EXAMPLE:
+
+        >> ff = FullFactorial(*[5] * 12, [0.1, 0.2, 0.5], def_scale='level_n')
+        >> len(ff)                           # 732421875 runs, nothing is allocated
+        >> ff[123456789]                     # a single run
+        >> ff[1000:2000]                     # a block of runs
+        >> for block in ff.chunks(100000):   # stream every run in blocks
+        ..     submit(block)
+        >> ff.sample(500, rng=0)             # 500 distinct random runs
+    """
+
+    def __init__(self, *design, def_scale='traditional', rng=None):
+        """
+
+        :param design: definitions of factors' levels in design, factors defined with an int will be
+            scaled per the method selected with the def_scale argument
+        :param def_scale: str, paradigm for scaling factors that don't have values defined
+                'traditional' : scale output to [-1, 1]
+                'standard' : scale output to [0, 1]
+                'level_n' : scale output to [1, n]
+        :param rng: numpy.random.Generator or int seed used to sample levels that are ranges,
+            default None uses numpy.random's global generator
+        """
+        design, n_factors, rescale = _parse_design(*design)
+        self._levels = _n_levels(*design)
+        self._tables = [_column_table(factor, linspace(-1, 1, n), def_scale=def_scale)
+                        for factor, n in zip(design, self._levels)]
+        self._sampled = [factor if _has_ranges(factor) and len(factor) == n else None
+                         for factor, n in zip(design, self._levels)]
+        self._rng = default_rng(rng) if rng is not None else None
+        self._names = [factor.name if isinstance(factor, FactorBase) else 'factor_{:02d}'.format(j)
+                       for j, factor in enumerate(design)]
+        self._strides = []
+        self._size = 1
+        for n in self._levels:
+            self._strides.append(self._size)
+            self._size *= n
+
+    @property
+    def levels(self):
+        return list(self._levels)
+
+    @property
+    def tables(self):
+        """Value of each level of every factor, a level that is a range has the single value of the level"""
+        return self._tables
+
+    @property
+    def names(self):
+        return self._names
+
+    @property
+    def size(self):
+        """Number of runs as a python int, unlike len() it is not limited to sys.maxsize"""
+        return self._size
+
+    @property
+    def shape(self):
+        return self._size, len(self._levels)
+
+    def __len__(self):
+        return self._size
+
+    def codes(self, index, dtype=int64):
+        """Level index of every factor for runs with the given indices
+
+        :param index: int or array-like of int, negative indices count from the last run
+        :param dtype: numpy integer type of the returned level indices
+        :return: numpy.ndarray (n, k) of level indices
+        """
+        index = asarray(index, dtype=int64).reshape(-1)
+        index = where(index < 0, index + self._size, index)
+        if ((index < 0) | (index >= self._size)).any():
+            raise IndexError('Run indices must be in [-{0}, {0})'.format(self._size))
+        codes = empty((len(index), len(self._levels)), dtype=dtype)
+        for j, (n, stride) in enumerate(zip(self._levels, self._strides)):
+            codes[:, j] = index // stride % n
+        return codes
+
+    def decode(self, codes):
+        """Factor values of runs given as level indices
+
+        :param codes: numpy.ndarray (n, k) of level indices
+        :return: numpy.ndarray (n, k)
+        """
+        return _stack_columns([table.take(codes[:, j]) if factor is None else factor.sample(codes[:, j], rng=self._rng)
+                               for j, (table, factor) in enumerate(zip(self._tables, self._sampled))])
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._size)
+            return self.decode(self.codes(arange(start, stop, step, dtype=int64)))
+        elif isinstance(key, (int, integer)):
+            # python int arithmetic so single runs of designs with more than 2^63 runs can be decoded
+            index = int(key) + self._size if key < 0 else int(key)
+            if not 0 <= index < self._size:
+                raise IndexError('Run indices must be in [-{0}, {0})'.format(self._size))
+            codes = array([[index // stride % n for n, stride in zip(self._levels, self._strides)]])
+            return self.decode(codes)[0]
+        return self.decode(self.codes(key))
+
+    def chunks(self, size=65536):
+        """Iterate over every run in blocks of 'size' runs
+
+        :return: generator of numpy.ndarray (size, k), the last block may be smaller
+        """
+        for start in range(0, self._size, size):
+            yield self[start:min(start + size, self._size)]
+
+    def __iter__(self):
+        for block in self.chunks():
+            for run in block:
+                yield run
+
+    def sample(self, n, rng=None):
+        """Random runs without replacement
+
+        :param n: int, number of runs
+        :param rng: numpy.random.Generator or int seed, default None uses a new unseeded generator
+        :return: numpy.ndarray (n, k)
+        """
+        if n > self._size:
+            raise ValueError('Can not sample {} runs without replacement from {} runs'.format(n, self._size))
+        return self[default_rng(rng).choice(self._size, size=n, replace=False)]
+
+
+def ff2n(*design, def_scale='traditional', coded=False):
     """2k Factorial design: all combinations of all factors' high and low values
 
     :param design: definitions of factors' levels in design, factors defined with an int will be
@@ -395,13 +774,14 @@ def ff2n(*design, def_scale='traditional'):
             'traditional' : scale output to [-1, 1]
             'standard' : scale output to [0, 1]
             'level_n' : scale output to [1, n]
+    :param coded: bool, return a CodedDesign of level codes and value tables instead of the values
     :return:
     """
     design, n_factors, rescale = _parse_design(*design)
-    d = _full_fact([2] * n_factors)
-    # raw_designs have to be scaled [-1, 1] for the low, high values of the factor
-    d = d / d.max(axis=0, keepdims=True) * 2 - 1
+    d = _ff2n_base(n_factors)
 
+    if coded:
+        return CodedDesign.from_raw(d, *(design if len(design) > 0 else [2] * n_factors), def_scale=def_scale)
     if len(design) == 0:
         d = measure_scale(*[2] * n_factors, raw_design=d, def_scale=def_scale)
     else:
@@ -410,71 +790,1049 @@ def ff2n(*design, def_scale='traditional'):
     return d
 
 
-def orthogonal_maximin_lhs(*design, n_samples=None, omega=0.5, temperature=1, def_scale='traditional'):
+def _ff2n_base(n_factors):
+    """Coded runs of a 2k factorial, shared read-only array from BASE_DESIGNS"""
+    def build():
+        d = _full_fact([2] * n_factors)
+        # raw_designs have to be scaled [-1, 1] for the low, high values of the factor
+        return d / d.max(axis=0, keepdims=True) * 2 - 1
+    return BASE_DESIGNS.get(('ff2n', n_factors), build)
+
+
+def _factor_label(j):
+    # letters a..z name the first factors of generators and words, later factors are f26, f27, ...
+    return chr(ord('a') + j) if j < 26 else 'f{}'.format(j)
+
+
+def _parity(x):
+    # parity of the set bits of each int64 of an array
+    for shift in (32, 16, 8, 4, 2, 1):
+        x = x ^ (x >> shift)
+    return x & 1
+
+
+def _parse_generators(gen):
+    """Base factor count, GF(2) masks over the base factors and signs of the columns of a generator string like
+    'a b c -ab ac', single letter words are the base factors in the order they appear
+    """
+    words = gen.replace(',', ' ').split() if isinstance(gen, str) else list(gen)
+    signs, letters = [], []
+    for word in words:
+        word = word.strip().lower()
+        sign = -1 if word.startswith('-') else 1
+        word = word.lstrip('+-')
+        if len(word) == 0 or not word.isalpha() or len(set(word)) != len(word):
+            raise ValueError("Generator '{}' must be letters of distinct base factors with an optional sign".format(word))
+        signs.append(sign)
+        letters.append(word)
+    base = [word for word in letters if len(word) == 1]
+    if len(set(base)) != len(base):
+        raise ValueError('Base factors appear more than once in generators: {}'.format(base))
+    index = dict([(letter, i) for i, letter in enumerate(base)])
+    masks = []
+    for word in letters:
+        missing = [letter for letter in word if letter not in index]
+        if len(missing) > 0:
+            raise ValueError("Generator '{}' uses letters {} which are not base factors {}".format(word, missing, base))
+        masks.append(sum([1 << index[letter] for letter in word]))
+    return len(base), masks, signs
+
+
+def _search_generators(n_factors, resolution):
+    """Smallest number of base factors and columns as GF(2) masks of a 2-level fraction of at least 'resolution'
+
+    A fraction has resolution R when no R - 1 columns have masks that XOR to 0, so a new column is allowed when its
+    mask is not the XOR of R - 2 or fewer columns already chosen. Odd weight masks are tried first, heaviest first,
+    which gives the largest resolution IV fractions and the usual highest order generators.
+    """
+    if resolution < 3:
+        raise ValueError('resolution must be at least 3, not {}'.format(resolution))
+    for r in range(max(n_factors.bit_length(), 1), n_factors + 1):
+        masks = [1 << i for i in range(r)]
+        # XOR of every t-subset of the chosen masks for t = 0..R - 2
+        sums = [set([0])] + [set() for _ in range(resolution - 2)]
+        for t in range(1, resolution - 1):
+            sums[t] = set([sum([1 << i for i in c]) for c in combinations(range(r), t)])
+        candidates = sorted([m for m in range(1, 1 << r) if bin(m).count('1') > 1],
+                            key=lambda m: (bin(m).count('1') % 2 == 0, -bin(m).count('1'), m))
+        for c in candidates:
+            if len(masks) == n_factors:
+                break
+            if any([c in t_sums for t_sums in sums]):
+                continue
+            masks.append(c)
+            for t in range(len(sums) - 1, 0, -1):
+                sums[t] |= set([x ^ c for x in sums[t - 1]])
+        if len(masks) == n_factors:
+            return r, masks
+    return n_factors, [1 << i for i in range(n_factors)]
+
+
+class FractionalFactorial(object):
+    """2-level fractional factorial 2^(k-p), the runs of a full factorial of r = k - p base factors with every other
+    column the product of base factors named by a generator
+
+    A column is a GF(2) mask of the base factors it is the product of, so effects are aliased exactly when the XORs
+    of their columns' masks are equal and the resolution is the smallest number of columns with masks that XOR to 0.
+    Nothing is computed over the 2^k runs of the full design.
+
+    EXAMPLE:
+
+        >> ff = FractionalFactorial(gen='a b c d abc abd acd bcd')
+        >> ff.resolution                     # 4
+        >> ff.defining_relation()            # ['abce', 'abdf', 'cdef', ...]
+        >> ff.aliases(order=2)               # chains of aliased main effects and 2 factor interactions
+        >> FractionalFactorial(20, resolution=4).generators
+    """
+
+    def __init__(self, n_factors=None, gen=None, resolution=None):
+        """
+
+        :param n_factors: int, number of factors, default None uses the number of generators
+        :param gen: str or list of str, a generator for each factor, single letters are base factors and words of
+            several letters their products, a '-' in front of a word negates the column, e.g. 'a b c -ab ac'
+        :param resolution: int, smallest resolution of the fraction when no generators are given, the fraction
+            with the fewest runs found by a greedy search of generators is used
+        """
+        if gen is not None:
+            self._n_base, self._masks, self._signs = _parse_generators(gen)
+            if n_factors is not None and n_factors != len(self._masks):
+                raise ValueError('{} generators for {} factors'.format(len(self._masks), n_factors))
+        elif resolution is not None and n_factors is not None:
+            self._n_base, self._masks = _search_generators(n_factors, resolution)
+            self._signs = [1] * n_factors
+        else:
+            raise ValueError("FractionalFactorial needs generators 'gen' or the number of factors and a 'resolution'")
+        if len(set(self._masks)) != len(self._masks):
+            raise ValueError('Generators must be distinct products of base factors: {}'.format(self.generators))
+
+    @property
+    def n_factors(self):
+        return len(self._masks)
+
+    @property
+    def n_base(self):
+        return self._n_base
+
+    @property
+    def size(self):
+        return 1 << self._n_base
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def masks(self):
+        """list of int, bit i of a factor's mask is set when base factor i is part of its product"""
+        return list(self._masks)
+
+    @property
+    def signs(self):
+        return list(self._signs)
+
+    @property
+    def generators(self):
+        """list of str, the generator of every factor in terms of the base factors"""
+        return [('-' if sign < 0 else '') + ''.join([_factor_label(i) for i in range(self._n_base) if mask >> i & 1])
+                for mask, sign in zip(self._masks, self._signs)]
+
+    def _word(self, columns):
+        return ''.join([_factor_label(j) for j in columns])
+
+    @property
+    def resolution(self):
+        """int, length of the shortest word of the defining relation, None for a full factorial"""
+        masks = self._masks
+        k = len(masks)
+        if k == self._n_base:
+            return None
+        # meet in the middle, t columns XOR to 0 when an a-subset and a b-subset have the same XOR with a + b = t,
+        # the subsets are disjoint because no shorter word exists
+        for t in range(2, k + 1):
+            a, b = (t + 1) // 2, t // 2
+            xors_b = {}
+            for c in combinations(range(k), b):
+                x = 0
+                for j in c:
+                    x ^= masks[j]
+                if a == b and x in xors_b:
+                    return t
+                xors_b[x] = c
+            if a != b:
+                for c in combinations(range(k), a):
+                    x = 0
+                    for j in c:
+                        x ^= masks[j]
+                    if x in xors_b:
+                        return t
+        return None
+
+    def defining_relation(self, max_words=2 ** 16):
+        """Words of the defining relation I = w1 = w2 = ..., every product of generator words
+
+        :param max_words: int, largest number of words 2^p to enumerate
+        :return: list of str, shortest words first, '-' marks words equal to -I
+        """
+        generated = [j for j, mask in enumerate(self._masks) if bin(mask).count('1') > 1]
+        if 1 << len(generated) > max_words:
+            raise ValueError('the defining relation has 2^{} words, more than max_words'.format(len(generated)))
+        base_column = dict([(mask, j) for j, mask in enumerate(self._masks) if bin(mask).count('1') == 1])
+        words = [(0, 1)]
+        for j in generated:
+            # the word of a generated column is the column and the base factor columns of its product
+            w, sign = 1 << j, self._signs[j]
+            for i in range(self._n_base):
+                if self._masks[j] >> i & 1:
+                    w ^= 1 << base_column[1 << i]
+                    sign *= self._signs[base_column[1 << i]]
+            words += [(x ^ w, s * sign) for x, s in words]
+        words = sorted(words[1:], key=lambda ws: (bin(ws[0]).count('1'), ws[0]))
+        return [('-' if s < 0 else '') + self._word([j for j in range(self.n_factors) if w >> j & 1])
+                for w, s in words]
+
+    def aliases(self, order=2):
+        """Chains of effects with up to 'order' factors that cannot be estimated separately, 'I' in a chain marks
+        effects aliased with the mean
+
+        :param order: int, largest number of factors of an effect
+        :return: list of list of str, chains of two or more effects, '-' marks an effect aliased with the negative of
+            the first effect of its chain
+        """
+        chains = {}
+        for t in range(1, order + 1):
+            for c in combinations(range(self.n_factors), t):
+                x, sign = 0, 1
+                for j in c:
+                    x ^= self._masks[j]
+                    sign *= self._signs[j]
+                chains.setdefault(x, []).append((self._word(c), sign))
+        if 0 in chains:
+            chains[0].insert(0, ('I', 1))
+        out = []
+        for x, effects in sorted(chains.items(), key=lambda item: (len(item[1][0][0]), item[1][0][0])):
+            if len(effects) > 1:
+                first = effects[0][1]
+                out.append([('-' if sign != first else '') + word for word, sign in effects])
+        return out
+
+    def runs(self):
+        """Coded runs, -1 and 1 for the low and high level of each factor
+
+        :return: numpy.ndarray (2^r, k) of int, the base factors in the order of ff2n with the first changing fastest
+        """
+        index = arange(self.size, dtype=int64)[:, newaxis]
+        masks = array(self._masks, dtype=int64)[newaxis, :]
+        # a product of -1/1 base columns is -1 when an odd number of them are at the low level
+        low = _parity(~index & masks)
+        return (1 - 2 * low) * array(self._signs)[newaxis, :]
+
+
+def fracfact(*design, gen=None, resolution=None, def_scale='traditional', coded=False):
+    """Fractional factorial 2^(k-p) design built from generators or the smallest fraction of a resolution, see
+    FractionalFactorial for the alias structure
+
+    EXAMPLE:
+
+        >> fracfact('a b c ab ac')                          # 2^(5-2), generators passed positionally like pyDOE
+        >> fracfact([10, 20], 2, 2, 2, [0.1, 0.2], gen='a b c ab ac')
+        >> fracfact(7, resolution=4)
+
+    :param design: definitions of factors' levels in design, factors defined with an int will be
+        scaled per the method selected with the def_scale argument, a single str is taken as the generators
+    :param gen: str or list of str, generators of the factors, e.g. 'a b c ab ac', see FractionalFactorial
+    :param resolution: int, smallest resolution when no generators are given
+    :param def_scale: str, paradigm for scaling factors that don't have values defined
+            'traditional' : scale output to [-1, 1]
+            'standard' : scale output to [0, 1]
+            'level_n' : scale output to [1, n]
+    :param coded: bool, return a CodedDesign of level codes and value tables instead of the values
+    :return: numpy.ndarray, a table with experiment values for each factor
+    """
+    if len(design) == 1 and isinstance(design[0], str):
+        if gen is not None:
+            raise ValueError("Generators were passed both positionally, '{}', and as gen='{}', pass them "
+                             "once".format(design[0], gen))
+        gen, design = design[0], ()
+    design, n_factors, rescale = _parse_design(*design)
+    if gen is not None and n_factors == 0:
+        n_factors = None
+    d = FractionalFactorial(n_factors, gen=gen, resolution=resolution).runs()
+    factors = design if len(design) > 0 else [2] * d.shape[1]
+
+    if coded:
+        return CodedDesign.from_raw(d, *factors, def_scale=def_scale)
+    return measure_scale(*factors, raw_design=d, def_scale=def_scale)
+
+
+def _is_prime(n):
+    return n > 1 and all([n % q != 0 for q in range(2, int(sqrt(n)) + 1)])
+
+
+def _quadratic_character(q):
+    # chi[a] is 1 for a quadratic residue of the prime q, -1 for a non residue and 0 for 0
+    chi = -ones(q, dtype=int)
+    chi[(arange(1, q) ** 2) % q] = 1
+    chi[0] = 0
+    return chi
+
+
+def _jacobsthal(q):
+    i = arange(q)
+    return _quadratic_character(q)[(i[newaxis, :] - i[:, newaxis]) % q]
+
+
+def _hadamard(n):
+    """Hadamard matrix of order n from the Sylvester, Paley I (n - 1 a prime 3 mod 4), Paley II (n / 2 - 1 a prime
+    1 mod 4) or Kronecker product of smaller constructions
+
+    :return: numpy.ndarray (n, n) of -1 and 1 with H H' = n I
+    """
+    h2 = array([[1, 1], [1, -1]])
+    if n == 1:
+        return array([[1]])
+    elif n == 2:
+        return h2
+    elif n % 4 != 0:
+        raise ValueError('Hadamard matrices have order 1, 2 or a multiple of 4, not {}'.format(n))
+    elif n & (n - 1) == 0:
+        return kron(h2, _hadamard(n // 2))
+    q = n - 1
+    if _is_prime(q) and q % 4 == 3:
+        # Paley I, I + S with the skew matrix S = [[0, 1'], [-1, Q]]
+        s = zeros((n, n), dtype=int)
+        s[0, 1:] = 1
+        s[1:, 0] = -1
+        s[1:, 1:] = _jacobsthal(q)
+        return s + eye(n, dtype=int)
+    q = n // 2 - 1
+    if _is_prime(q) and q % 4 == 1:
+        # Paley II from the symmetric conference matrix C = [[0, 1'], [1, Q]]
+        c = zeros((q + 1, q + 1), dtype=int)
+        c[0, 1:] = 1
+        c[1:, 0] = 1
+        c[1:, 1:] = _jacobsthal(q)
+        return kron(c, h2) + kron(eye(q + 1, dtype=int), array([[1, -1], [-1, -1]]))
+    for a in range(2, n // 2 + 1):
+        if n % a == 0:
+            try:
+                return kron(_hadamard(a), _hadamard(n // a))
+            except ValueError:
+                continue
+    raise ValueError('No Sylvester, Paley or Kronecker construction of a Hadamard matrix of order {}'.format(n))
+
+
+def pbdesign(*design, n_runs=None, def_scale='traditional', coded=False):
+    """Plackett-Burman screening design, 2-level runs from the columns of a normalized Hadamard matrix, the number
+    of runs is a multiple of 4 instead of a power of 2 so n factors take about n + 1 runs
+
+    :param design: definitions of factors' levels in design, factors defined with an int will be
+        scaled per the method selected with the def_scale argument
+    :param n_runs: int, multiple of 4 larger than the number of factors, default None uses the smallest one a
+        Hadamard matrix can be constructed for. Hadamard matrices are built by the Sylvester, Paley I, Paley II and
+        Kronecker product constructions which cover every multiple of 4 up to 48 and every one below 200 except 52,
+        92, 100, 116, 156, 172, 184 and 188, other orders raise a ValueError naming the next order that is
+        supported
+    :param def_scale: str, paradigm for scaling factors that don't have values defined
+            'traditional' : scale output to [-1, 1]
+            'standard' : scale output to [0, 1]
+            'level_n' : scale output to [1, n]
+    :param coded: bool, return a CodedDesign of level codes and value tables instead of the values
+    :return: numpy.ndarray, a table with experiment values for each factor
+    """
+    design, n_factors, rescale = _parse_design(*design)
+    d = _pb_columns(n_factors, n_runs=n_runs)
+
+    factors = design if len(design) > 0 else [2] * n_factors
+    if coded:
+        return CodedDesign.from_raw(d, *factors, def_scale=def_scale)
+    return measure_scale(*factors, raw_design=d, def_scale=def_scale)
+
+
+def _pb_columns(n_factors, n_runs=None):
+    # -1/1 columns of a Plackett-Burman design, every column but the first of a normalized Hadamard matrix
+    if n_runs is None:
+        n_runs = _hadamard_order(n_factors + 1)
+    elif n_runs <= n_factors:
+        raise ValueError('{} runs cannot screen {} factors, n_runs must be larger'.format(n_runs, n_factors))
+    try:
+        h = _hadamard(n_runs)
+    except ValueError:
+        if n_runs % 4 != 0:
+            raise
+        raise ValueError('No Hadamard matrix of order {} can be constructed, the next supported number of runs is '
+                         '{}'.format(n_runs, _hadamard_order(n_runs)))
+    # normalize the first column to 1, every other column then has as many -1 as 1
+    h = h * h[:, :1]
+    return h[:, 1:n_factors + 1]
+
+
+def _hadamard_order(n):
+    # smallest order of at least n that has a construction
+    order = max(4 * -(-n // 4), 4) if n > 2 else n
+    while True:
+        try:
+            _hadamard(order)
+            return order
+        except ValueError:
+            order += 4
+
+
+def _prime_power(q):
+    # (p, n) with q = p^n for a prime p, None when q is not a prime power
+    for p in range(2, q + 1):
+        if q % p == 0:
+            n = 0
+            while q % p == 0:
+                q //= p
+                n += 1
+            return (p, n) if q == 1 else None
+    return None
+
+
+def _gf_tables(q):
+    """Addition and multiplication tables of the finite field GF(q), q = p^n, element a is the polynomial over GF(p)
+    whose coefficients are the base p digits of a, products are reduced by the first monic irreducible polynomial
+    of degree n
+
+    :return: tuple of numpy.ndarray (q, q) of int, addition and multiplication tables
+    """
+    p, n = _prime_power(q)
+    weights = p ** arange(n)
+    digits = arange(q)[:, newaxis] // weights % p
+    add = ((digits[:, newaxis, :] + digits[newaxis, :, :]) % p).dot(weights)
+    product = zeros((q, q, 2 * n - 1), dtype=int)
+    for i in range(n):
+        for j in range(n):
+            product[:, :, i + j] += digits[:, newaxis, i] * digits[newaxis, :, j]
+    for low in digits:
+        # x^n = -(low[0] + low[1] x + ... + low[n-1] x^(n-1)) modulo the candidate x^n + low
+        reduced = product.copy()
+        for k in range(2 * n - 2, n - 1, -1):
+            reduced[:, :, k - n:k] -= reduced[:, :, k:k + 1] * low
+        mul = (reduced[:, :, :n] % p).dot(weights)
+        # the polynomial is irreducible when the product of nonzero elements is never 0
+        if (mul[1:, 1:] != 0).all():
+            return add, mul
+    raise ValueError('no irreducible polynomial of degree {} over GF({})'.format(n, p))
+
+
+def _rao_hamming(q, m):
+    """Orthogonal array OA(q^m, (q^m - 1) / (q - 1), q, 2) of the prime power q, a column for every nonzero vector
+    of GF(q)^m with its first nonzero coordinate 1 and a run for every vector x, entries are x . c in GF(q)
+
+    :return: numpy.ndarray (q^m, (q^m - 1) / (q - 1)) of int level codes
+    """
+    def build():
+        add, mul = _gf_tables(q)
+        # every vector of GF(q)^m, the first coordinate changes fastest like fullfact
+        vectors = arange(q ** m)[:, newaxis] // q ** arange(m) % q
+        first = argmax(vectors != 0, axis=1)
+        leading = vectors[arange(len(vectors)), first]
+        columns = vectors[(leading == 1) & (vectors.any(axis=1))]
+        entries = zeros((len(vectors), len(columns)), dtype=int)
+        for i in range(m):
+            entries = add[entries, mul[vectors[:, i:i + 1], columns[newaxis, :, i]]]
+        return entries
+
+    return BASE_DESIGNS.get(('oa', q, m), build)
+
+
+def _oa_order(levels):
+    # number of levels of the field, the largest level count when every count is a power of the same prime so each
+    # factor is balanced, otherwise the smallest prime power with enough levels
+    n_levels = max(levels)
+    powers = [_prime_power(n) for n in levels]
+    if all([power is not None for power in powers]) and len(set([power[0] for power in powers])) == 1:
+        return n_levels
+    q = n_levels
+    while _prime_power(q) is None:
+        q += 1
+    return q
+
+
+def oa(*design, strength=2, def_scale='traditional', coded=False):
+    """Strength 2 orthogonal array, every pair of factors has each combination of levels equally often or in
+    proportion to their frequencies
+
+    2-level designs use the Hadamard matrices of pbdesign, other designs use the Rao-Hamming construction over the
+    finite field GF(q) of a prime power q in the fewest q^m runs with enough columns. When every factor's number of
+    levels is a power of the same prime, q is the largest of them and every factor is balanced: a factor with s
+    levels takes the last digits of the field's elements. Otherwise q is the smallest prime power with enough levels
+    and the q levels of a column are merged into s nearly equal groups (level collapsing), pairs of factors keep
+    proportional frequencies but a factor whose number of levels does not divide q is unbalanced and a warning is
+    issued
+
+    EXAMPLE:
+
+        >> oa(4, 4, 4)                   # 16 runs over GF(4), every level 4 times
+        >> oa(3, 9, 9, 3)                # 81 runs over GF(9)
+        >> oa(2, 3, 3)                   # 9 runs over GF(3), the 2-level factor has its levels 6 and 3 times
+
+    :param design: definitions of factors' levels in design, an int is the number of levels of a factor like in
+        fullfact
+    :param strength: int, only 2 is constructed
+    :param def_scale: str, paradigm for scaling factors that don't have values defined
+            'traditional' : scale output to [-1, 1]
+            'standard' : scale output to [0, 1]
+            'level_n' : scale output to [1, n]
+    :param coded: bool, return a CodedDesign of level codes and value tables instead of the values
+    :return: numpy.ndarray, a table with experiment values for each factor
+    """
+    if strength != 2:
+        raise ValueError('only strength 2 orthogonal arrays are constructed, not strength {}'.format(strength))
+    design, n_factors, rescale = _parse_design(*design)
+    factors = design if len(design) > 0 else [2] * n_factors
+    levels = _n_levels(*factors)
+    if len(levels) != len(factors) or min(levels + [2]) < 2:
+        raise ValueError('every factor needs at least 2 levels, not {}'.format(levels))
+
+    if max(levels + [2]) == 2:
+        codes = (1 - _pb_columns(len(factors))) // 2
+    else:
+        q = _oa_order(levels)
+        m = 1
+        while (q ** m - 1) // (q - 1) < len(factors):
+            m += 1
+        codes = _rao_hamming(q, m)[:, :len(factors)]
+        n_levels = array(levels)
+        divides = q % n_levels == 0
+        codes = where(divides, codes % n_levels, codes * n_levels // q)
+        if not divides.all():
+            warn('oa: the {} levels of GF({}) cannot be split evenly for factors {} with {} levels, their levels '
+                 'are unbalanced'.format(q, q, flatnonzero(~divides).tolist(), n_levels[~divides].tolist()), stacklevel=2)
+
+    raw = codes / (array(levels) - 1) * 2 - 1
+    if coded:
+        return CodedDesign.from_raw(raw, *factors, def_scale=def_scale)
+    return measure_scale(*factors, raw_design=raw, def_scale=def_scale)
+
+
+def orthogonal_maximin_lhs(*design, n_samples=None, omega=0.5, temperature=1, cooling=None, n_iterations=None,
+                           rng=None, def_scale='traditional', coded=False, cache=None):
     """Search the space of latin_hyper designs for a design that is better than the initial randomly selected design
 
+    Simulated annealing over swaps of two elements within a column of a latin hypercube (Joseph & Hung 2008), the
+    criterion to minimize is omega * rho^2 + (1 - omega) * (phi - phi_lower) / (phi_upper - phi_lower) where rho^2
+    is the average squared correlation between columns and phi the phi_2 criterion of rectangular distances between
+    runs. After every swap only the distances of the two swapped rows and the correlations of the swapped column
+    are updated so each iteration costs O(n_samples + n_factors).
+
     :param design: definitions of factors' levels in design, factors defined with an int will be
         scaled per the method selected with the def_scale argument
-    :param n_samples:
-    :param omega:
-    :param temperature:
+    :param n_samples: int, number of runs in design
+    :param omega: float [0, 1], weight of the correlation criterion, 1 - omega is the weight of the distance
+        criterion
+    :param temperature: float, initial temperature, a swap that makes the criterion worse by a relative amount
+        delta is accepted with probability exp(-delta / temperature)
+    :param cooling: float (0, 1), temperature is multiplied by cooling after each iteration,
+        default None cools to temperature * 1e-4 by the last iteration
+    :param n_iterations: int, number of swaps to try, default None tries 100 * n_samples
+    :param rng: numpy.random.Generator or int seed, default None uses a new unseeded generator
     :param def_scale: str, paradigm for scaling factors that don't have values defined
             'traditional' : scale output to [-1, 1]
             'standard' : scale output to [0, 1]
             'level_n' : scale output to [1, n]
+    :param coded: bool, return a CodedDesign of level codes and value tables instead of the values
+    :param cache: experimentspydesign.cache.DesignCache, store the annealed latin hypercube and reuse it for the
+        same parameters, only used when rng is an int seed
     :return: numpy.ndarray, a table with experiment values for each factor
     """
     design, n_factors, rescale = _parse_design(*design)
     if n_samples is None:
         n_samples = n_factors * 2 + 1
-    # TODO omega does not behave consistently as n_samples increases due to expected scale of rho and phi
-    hyper = lhs(n_factors, n_samples=n_samples)
+    if n_iterations is None:
+        n_iterations = 100 * n_samples
+
+    def anneal(seed):
+        rng = default_rng(seed)
+        hyper = vstack([rng.permutation(n_samples) for _ in range(n_factors)]).T
+        return _anneal_lhs(hyper, omega=omega, temperature=temperature, cooling=cooling,
+                           n_iterations=n_iterations, rng=rng)[0]
+
+    if cache is not None and isinstance(rng, (int, integer)):
+        hyper = cache.get_or_compute(lambda: anneal(rng), design='orthogonal_maximin_lhs', n_samples=n_samples,
+                                     n_factors=n_factors, omega=omega, temperature=temperature, cooling=cooling,
+                                     n_iterations=n_iterations, seed=int(rng))
+    else:
+        hyper = anneal(rng)
+
+    raw = hyper / hyper.max(axis=0, keepdims=True) * 2 - 1
+    if coded:
+        return CodedDesign.from_raw(raw, *design, def_scale=def_scale)
+    return measure_scale(*design, raw_design=raw, def_scale=def_scale)
+
+
+def _anneal_lhs(hyper, omega=0.5, temperature=1, cooling=None, n_iterations=1000, rng=None, patience=None,
+                deadline=None):
+    """Simulated annealing of a latin hypercube of integer levels 0..m-1 with incremental criterion updates
+
+    :param patience: int, stop after this many iterations without improving the best design
+    :param deadline: float, stop once time.time() passes this wall clock time
+    :return: tuple, best design found, its criterion and the criterion of the current design at every iteration
+    """
+    hyper = array(hyper)
+    m, k = hyper.shape
+    if cooling is None:
+        cooling = power(1e-4, 1 / max(n_iterations, 1))
+
+    phi_lower = phi_lower_bound(m, k)
+    phi_spread = phi_upper_bound(m, k) - phi_lower
+    phi_spread = phi_spread if phi_spread > 0 else 1.0
+
+    # rectangular distances between runs, inverse squared distances and each row's share of phi^2
+    distances = distance_rectangular(hyper)
+    fill_diagonal(distances, inf)
+    inverse = 1 / distances ** 2
+    row_phi = inverse.sum(axis=1)
+    phi_total = row_phi.sum() / 2
+
+    # every column of a latin hypercube is a permutation of 0..m-1 so all columns share one variance
+    centered = hyper - (m - 1) / 2
+    variance = (centered[:, 0] ** 2).sum()
+    covariance = centered.T.dot(centered).astype(float)
+    fill_diagonal(covariance, 0)
+    column_rho = (covariance ** 2).sum(axis=1) / variance ** 2
+    n_pairs = k * (k - 1) / 2 if k > 1 else 1
+    rho_total = column_rho.sum() / 2
+
+    def criterion(rho_sum, phi_sum):
+        return omega * rho_sum / n_pairs + (1 - omega) * (sqrt(phi_sum) - phi_lower) / phi_spread
+
+    score = criterion(rho_total, phi_total)
+    best, best_score = hyper.copy(), score
+    trace = empty(n_iterations)
+    t = temperature
+    last_improvement = 0
+    # iterations completed, the trace of a search without iterations is empty
+    n_done = 0
+
+    for it in range(n_iterations):
+        # favor the column with the largest correlations and the row that is closest to its neighbors
+        j = argmax(column_rho) if rng.random() < omega else rng.integers(k)
+        a = argmax(row_phi) if rng.random() < 1 - omega else rng.integers(m)
+        b = rng.integers(m - 1)
+        b += b >= a
+
+        x_a, x_b = hyper[a, j], hyper[b, j]
+        column = hyper[:, j]
+        change = abs(x_b - column) - abs(x_a - column)
+        new_a = distances[a] + change
+        new_b = distances[b] - change
+        # the distance between the swapped rows does not change
+        new_a[a], new_a[b] = inf, distances[a, b]
+        new_b[b], new_b[a] = inf, distances[a, b]
+        inv_a = 1 / new_a ** 2
+        inv_b = 1 / new_b ** 2
+        new_phi_total = phi_total + (inv_a - inverse[a]).sum() + (inv_b - inverse[b]).sum()
+
+        new_covariance = covariance[j] + (x_b - x_a) * (centered[a] - centered[b])
+        new_covariance[j] = 0
+        new_rho_total = rho_total + ((new_covariance ** 2).sum() - (covariance[j] ** 2).sum()) / variance ** 2
+
+        new_score = criterion(new_rho_total, new_phi_total)
+        delta = (new_score - score) / abs(score) if score != 0 else new_score - score
+        if delta <= 0 or rng.random() < exp(-delta / t):
+            hyper[a, j], hyper[b, j] = x_b, x_a
+            centered[a, j], centered[b, j] = centered[b, j], centered[a, j]
+
+            distances[a], distances[:, a] = new_a, new_a
+            distances[b], distances[:, b] = new_b, new_b
+            row_phi += inv_a - inverse[a] + inv_b - inverse[b]
+            row_phi[a] = inv_a.sum()
+            row_phi[b] = inv_b.sum()
+            inverse[a], inverse[:, a] = inv_a, inv_a
+            inverse[b], inverse[:, b] = inv_b, inv_b
+
+            column_rho += (new_covariance ** 2 - covariance[j] ** 2) / variance ** 2
+            column_rho[j] = (new_covariance ** 2).sum() / variance ** 2
+            covariance[j], covariance[:, j] = new_covariance, new_covariance
+
+            phi_total, rho_total, score = new_phi_total, new_rho_total, new_score
+            if score < best_score:
+                best, best_score = hyper.copy(), score
+                last_improvement = it
+        trace[it] = score
+        n_done = it + 1
+        t *= cooling
+
+        if patience is not None and it - last_improvement >= patience:
+            break
+        if deadline is not None and it % 100 == 0 and time() > deadline:
+            break
+
+    return best, best_score, trace[:n_done]
+
+
+def _lhs_chain(n_samples, n_factors, seed, deadline=None, **kwargs):
+    rng = default_rng(seed)
+    hyper = vstack([rng.permutation(n_samples) for _ in range(n_factors)]).T
+    return _anneal_lhs(hyper, rng=rng, deadline=deadline, **kwargs)
+
+
+def multistart_lhs(*design, n_samples=None, n_chains=4, n_workers=None, seed=None, time_budget=None, patience=None,
+                   omega=0.5, temperature=1, cooling=None, n_iterations=None, def_scale='traditional',
+                   coded=False):
+    """Run independent orthogonal maximin annealing chains in a process pool and keep the best design
+
+    Every chain starts from its own random latin hypercube with a generator spawned from one SeedSequence so the
+    result only depends on 'seed' and the chain count, not on how chains are scheduled on workers
+
+    :param design: definitions of factors' levels in design, factors defined with an int will be
+        scaled per the method selected with the def_scale argument
+    :param n_samples: int, number of runs in design
+    :param n_chains: int, number of independent annealing chains
+    :param n_workers: int, number of worker processes, default None uses all cpus, 0 runs chains in this process
+    :param seed: int or numpy.random.SeedSequence, entropy chain generators are spawned from
+    :param time_budget: float, seconds of wall clock time after which every chain stops and returns its best design
+    :param patience: int, a chain stops after this many iterations without improving its best design
+    :param omega: float [0, 1], weight of the correlation criterion, see orthogonal_maximin_lhs
+    :param temperature: float, initial temperature, see orthogonal_maximin_lhs
+    :param cooling: float (0, 1), see orthogonal_maximin_lhs
+    :param n_iterations: int, maximum number of swaps per chain, default None tries 100 * n_samples
+    :param def_scale: str, paradigm for scaling factors that don't have values defined
+            'traditional' : scale output to [-1, 1]
+            'standard' : scale output to [0, 1]
+            'level_n' : scale output to [1, n]
+    :param coded: bool, return a CodedDesign of level codes and value tables instead of the values
+    :return: tuple, numpy.ndarray design of the best chain and a dict with 'best_chain', per chain 'scores' and
+        'traces' of the criterion at every iteration, and 'seed' the entropy of the SeedSequence
+    """
+    design, n_factors, rescale = _parse_design(*design)
+    if n_samples is None:
+        n_samples = n_factors * 2 + 1
+    if n_iterations is None:
+        n_iterations = 100 * n_samples
+
+    seed = _seed_sequence(seed)
+    seeds = seed.spawn(n_chains)
+    deadline = time() + time_budget if time_budget is not None else None
+    kwargs = dict(omega=omega, temperature=temperature, cooling=cooling, n_iterations=n_iterations,
+                  patience=patience)
+
+    if n_workers == 0:
+        chains = [_lhs_chain(n_samples, n_factors, s, deadline=deadline, **kwargs) for s in seeds]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(_lhs_chain, n_samples, n_factors, s, deadline=deadline, **kwargs) for s in seeds]
+            chains = [future.result() for future in futures]
+
+    scores = [float(score) for _, score, _ in chains]
+    best = int(argmin(scores))
+    hyper = chains[best][0]
+    info = dict(best_chain=best, scores=scores, traces=[trace for _, _, trace in chains], seed=seed.entropy)
+
+    raw = hyper / hyper.max(axis=0, keepdims=True) * 2 - 1
+    if coded:
+        return CodedDesign.from_raw(raw, *design, def_scale=def_scale), info
+    return measure_scale(*design, raw_design=raw, def_scale=def_scale), info
+
+
+def augment_lhs(existing, n_new, n_candidates=20, bounds=None, rng=None):
+    """Add runs to an existing space filling design without changing the runs already made
+
+    Each factor's range is split into len(existing) + n_new evenly spaced levels and every new run takes levels that
+    no other run of the design uses in any factor, so the augmented design stays latin as far as the existing runs
+    allow. Of 'n_candidates' random runs built from unused levels the one farthest from every run so far is kept,
+    nearest distances come from a spatial index that new runs are added to, so the cost of augmenting grows with
+    n_new and not with the size of the existing design.
+
+    :param existing: numpy.ndarray (m, k), runs of the design in the design's own scale
+    :param n_new: int, number of runs to add
+    :param n_candidates: int, number of random candidate runs compared for every new run
+    :param bounds: tuple of array-like (low, high) of each factor, default None uses the minimum and maximum of each
+        column of the existing design
+    :param rng: numpy.random.Generator or int seed, default None uses a new unseeded generator
+    :return: numpy.ndarray (n_new, k), the new runs in the existing design's scale
+    """
+    existing = asarray(existing, dtype=float)
+    if existing.ndim != 2:
+        raise ValueError('existing must be a design of shape (m, k), not {}'.format(existing.shape))
+    m, k = existing.shape
+    rng = default_rng(rng)
+    tree = KDTree(existing, bounds=bounds)
+
+    n_total = m + n_new
+    spacing = max(n_total - 1, 1)
+    occupied = rint(clip(tree.transform(existing), 0, 1) * spacing).astype(int)
+    # unused levels of each column, the first n_free[j] entries of free[j] are still available
+    free = []
+    for j in range(k):
+        unused = ones(n_total, dtype=bool)
+        unused[occupied[:, j]] = False
+        free.append(rng.permutation(flatnonzero(unused)))
+    n_free = array([len(f) for f in free])
+
+    new = empty((n_new, k))
+    columns = arange(k)
+    for i in range(n_new):
+        picks = (rng.random((n_candidates, k)) * n_free).astype(int)
+        candidates = vstack([free[j][picks[:, j]] for j in columns]).T / spacing
+        distances, _ = tree.query(tree.inverse_transform(candidates))
+        best = argmax(distances[:, 0])
+        new[i] = tree.inverse_transform(candidates[best])
+        tree.add(new[i])
+        # move the levels that were used to the end of each column's available levels
+        for j in columns:
+            p, last = picks[best, j], n_free[j] - 1
+            free[j][p], free[j][last] = free[j][last], free[j][p]
+        n_free -= 1
+
+    return new
+
+
+class SequenceDesign(object):
+    """Space filling design drawn from a low-discrepancy sequence that can be extended by any number of runs
+
+    Runs are the points of the sequence mapped onto the range of each factor's levels, so the runs of a design
+    never change when more runs are requested, a design of n runs is the first n runs of every larger design.
+
+    EXAMPLE, an adaptive study that adds runs until a model is good enough:
+
+        >> design = Sobol([10., 60.], FactorDiscrete([1, 2, 3, 4]), 3, seed=11)
+        >> runs = design.next(32)
+        >> for block in design.blocks(16, n_blocks=4):     # runs 32..95 in blocks of 16
+        ..     runs = vstack([runs, block])
+    """
+
+    def __init__(self, sequence, factors, def_scale='traditional'):
+        """
+
+        :param sequence: experimentspydesign.sequences.SobolSequence or HaltonSequence with a dimension for each
+            factor
+        :param factors: list of definitions of factors' levels, factors defined with an int will be
+            scaled per the method selected with the def_scale argument
+        :param def_scale: str, paradigm for scaling factors that don't have values defined
+                'traditional' : scale output to [-1, 1]
+                'standard' : scale output to [0, 1]
+                'level_n' : scale output to [1, n]
+        """
+        self._factors = list(factors)
+        if sequence.d != len(self._factors):
+            raise ValueError('sequence has {} dimensions for {} factors'.format(sequence.d, len(self._factors)))
+        self._sequence = sequence
+        self._def_scale = def_scale
+
+    @property
+    def sequence(self):
+        return self._sequence
+
+    @property
+    def position(self):
+        """number of runs already returned or skipped"""
+        return self._sequence.position
+
+    def scale(self, points):
+        """Runs for points of the unit cube, one row per point
+
+        :param points: numpy.ndarray (n, k) in [0, 1)
+        :return: numpy.ndarray (n, k) with values scaled to factor ranges
+        """
+        raw = asarray(points) * 2 - 1
+        return _stack_columns([_continuous_column(factor, raw[:, j], def_scale=self._def_scale)
+                               for j, factor in enumerate(self._factors)])
+
+    def next(self, n):
+        """The next n runs of the design
+
+        :param n: int, number of runs, a power of 2 keeps the balance of a Sobol sequence
+        :return: numpy.ndarray (n, k)
+        """
+        return self.scale(self._sequence.next(n))
+
+    def skip(self, n):
+        """Skip n runs of the design"""
+        self._sequence.skip(n)
+        return self
+
+    def reset(self):
+        self._sequence.reset()
+        return self
+
+    def blocks(self, size, n_blocks=None):
+        """Consecutive blocks of runs
+
+        :param size: int, number of runs of each block
+        :param n_blocks: int, number of blocks, default None continues without end
+        :return: generator of numpy.ndarray (size, k)
+        """
+        i = 0
+        while n_blocks is None or i < n_blocks:
+            yield self.next(size)
+            i += 1
+
+
+class Sobol(SequenceDesign):
+    """SequenceDesign of a scrambled Sobol sequence"""
+
+    def __init__(self, *design, scramble=True, seed=None, def_scale='traditional'):
+        """
+
+        :param design: definitions of factors' levels in design
+        :param scramble: bool, random linear matrix scramble and digital shift of the sequence
+        :param seed: int or numpy.random.SeedSequence of the scramble
+        :param def_scale: str, paradigm for scaling factors that don't have values defined
+        """
+        design, n_factors, rescale = _parse_design(*design)
+        factors = design if len(design) > 0 else [2] * n_factors
+        super().__init__(SobolSequence(n_factors, scramble=scramble, seed=seed), factors, def_scale=def_scale)
+
+
+class Halton(SequenceDesign):
+    """SequenceDesign of a scrambled Halton sequence"""
+
+    def __init__(self, *design, scramble=True, seed=None, def_scale='traditional'):
+        """
+
+        :param design: definitions of factors' levels in design
+        :param scramble: bool, random digit permutations of the sequence
+        :param seed: int or numpy.random.SeedSequence of the permutations
+        :param def_scale: str, paradigm for scaling factors that don't have values defined
+        """
+        design, n_factors, rescale = _parse_design(*design)
+        factors = design if len(design) > 0 else [2] * n_factors
+        super().__init__(HaltonSequence(n_factors, scramble=scramble, seed=seed), factors, def_scale=def_scale)
 
-    rhos = get_rhos(hyper)
-    phis = get_phis(hyper)
 
-    phi_upper = phi_upper_bound(n_samples, n_factors)
-    phi_lower = phi_lower_bound(n_samples, n_factors)
-    phi_spread = phi_upper - phi_lower
+def sobol(*design, n_samples=None, skip=0, scramble=True, seed=None, def_scale='traditional'):
+    """Space filling design of the first runs of a scrambled Sobol sequence, see Sobol to extend a design
+
+    :param design: definitions of factors' levels in design, factors defined with an int will be
+        scaled per the method selected with the def_scale argument
+    :param n_samples: int, number of runs, default None uses the smallest power of 2 above 2 * n_factors
+    :param skip: int, number of points of the sequence to skip
+    :param scramble: bool, random linear matrix scramble and digital shift of the sequence
+    :param seed: int or numpy.random.SeedSequence of the scramble
+    :param def_scale: str, paradigm for scaling factors that don't have values defined
+            'traditional' : scale output to [-1, 1]
+            'standard' : scale output to [0, 1]
+            'level_n' : scale output to [1, n]
+    :return: numpy.ndarray, a table with experiment values for each factor
+    """
+    design, n_factors, rescale = _parse_design(*design)
+    if n_samples is None:
+        n_samples = 1 << (2 * n_factors).bit_length()
+    factors = design if len(design) > 0 else [2] * n_factors
+    return SequenceDesign(SobolSequence(n_factors, scramble=scramble, seed=seed), factors,
+                          def_scale=def_scale).skip(skip).next(n_samples)
 
-    i_star = argmax(phis)
-    j_star = argmax(rhos)
 
-    return hyper
+def halton(*design, n_samples=None, skip=0, scramble=True, seed=None, def_scale='traditional'):
+    """Space filling design of the first runs of a scrambled Halton sequence, see Halton to extend a design
+
+    :param design: definitions of factors' levels in design, factors defined with an int will be
+        scaled per the method selected with the def_scale argument
+    :param n_samples: int, number of runs, default None uses n_factors * 2 + 1
+    :param skip: int, number of points of the sequence to skip
+    :param scramble: bool, random digit permutations of the sequence
+    :param seed: int or numpy.random.SeedSequence of the permutations
+    :param def_scale: str, paradigm for scaling factors that don't have values defined
+            'traditional' : scale output to [-1, 1]
+            'standard' : scale output to [0, 1]
+            'level_n' : scale output to [1, n]
+    :return: numpy.ndarray, a table with experiment values for each factor
+    """
+    design, n_factors, rescale = _parse_design(*design)
+    if n_samples is None:
+        n_samples = n_factors * 2 + 1
+    factors = design if len(design) > 0 else [2] * n_factors
+    return SequenceDesign(HaltonSequence(n_factors, scramble=scramble, seed=seed), factors,
+                          def_scale=def_scale).skip(skip).next(n_samples)
+
+
+def optimal_design(*design, n_runs=None, model='linear', criterion='D', candidates=None, constraint=None, n_starts=4,
+                   max_passes=50, ridge=1e-8, rng=None, def_scale='traditional', coded=False):
+    """D- or I-optimal design for a model of the factors, found by coordinate exchange over a grid of each factor's
+    levels or by Fedorov exchange over a candidate set, exchanges are scored with rank 2 updates of the inverse
+    information matrix, see experimentspydesign.optimal
+
+    :param design: definitions of factors' levels in design, factors defined with an int will be
+        scaled per the method selected with the def_scale argument
+    :param n_runs: int, number of runs, default None uses the number of model terms + 4
+    :param model: str or list of tuple, 'linear', 'interaction', 'quadratic' or a list of terms of factor indices,
+        see experimentspydesign.optimal.model_terms
+    :param criterion: str, 'D' maximizes det(F'F), 'I' minimizes the average prediction variance over the region
+    :param candidates: numpy.ndarray (c, k), coded runs scaled to [-1, 1] to choose the design from, default None
+        exchanges coordinates over each factor's levels, evenly spaced in [-1, 1] with at least 3 levels for factors
+        with a squared term
+    :param constraint: callable, constraint(x) returns a bool for each coded run of x (n, k), runs where it is False
+        are never part of the design
+    :param n_starts: int, number of random starting designs, the best design is returned
+    :param max_passes: int, maximum number of passes over the runs of each start
+    :param ridge: float, added to the diagonal of the information matrix
+    :param rng: numpy.random.Generator, int seed or numpy.random.SeedSequence of the random starts and of the values
+        sampled for runs at levels that are ranges
+    :param def_scale: str, paradigm for scaling factors that don't have values defined
+            'traditional' : scale output to [-1, 1]
+            'standard' : scale output to [0, 1]
+            'level_n' : scale output to [1, n]
+    :param coded: bool, return a CodedDesign of level codes and value tables instead of the values
+    :return: numpy.ndarray, a table with experiment values for each factor
+    """
+    design, n_factors, rescale = _parse_design(*design)
+    terms = model_terms(n_factors, model)
+    squared = set([term[0] for term in terms if len(term) > 1 and len(set(term)) < len(term)])
+    factors = list(design) if len(design) > 0 else [3 if j in squared else 2 for j in range(n_factors)]
+    if n_runs is None:
+        n_runs = len(terms) + 4
+
+    seed = _seed_sequence(rng if isinstance(rng, SeedSequence) or rng is None else default_rng(rng).integers(2 ** 63))
+    seeds = seed.spawn(n_starts + 1)
+    starts = [default_rng(s) for s in seeds[:n_starts]]
+    # levels that are ranges are sampled for every run of the best design, like measure_scale
+    values_rng = default_rng(seeds[-1])
+    better = (lambda a, b: a > b) if criterion == 'D' else (lambda a, b: a < b)
+    best, best_value = None, None
+    if candidates is not None:
+        candidates = asarray(candidates, dtype=float)
+        if constraint is not None:
+            candidates = candidates[asarray(constraint(candidates), dtype=bool)]
+        for start in starts:
+            chosen, value = fedorov_exchange(candidates, n_runs, terms, criterion=criterion, max_passes=max_passes,
+                                             ridge=ridge, rng=start)
+            if best is None or better(value, best_value):
+                best, best_value = candidates[chosen], value
+        if coded:
+            return CodedDesign.from_raw(best, *factors, def_scale=def_scale)
+        return measure_scale(*factors, raw_design=best, def_scale=def_scale, rng=values_rng)
+
+    n_levels = [f if type(f) is int else len(f) for f in factors]
+    n_levels = [max(n, 3 if j in squared else 2) for j, n in enumerate(n_levels)]
+    grids = [linspace(-1, 1, n) for n in n_levels]
+    for start in starts:
+        x, value = coordinate_exchange(grids, n_runs, terms, criterion=criterion, constraint=constraint,
+                                       max_passes=max_passes, ridge=ridge, rng=start)
+        if best is None or better(value, best_value):
+            best, best_value = x, value
+
+    codes = rint((best + 1) / 2 * (array(n_levels) - 1)).astype(int)
+    tables = [_column_table(factor, grid, def_scale=def_scale) for factor, grid in zip(factors, grids)]
+    if coded:
+        names = [factor.name if isinstance(factor, FactorBase) else 'factor_{:02d}'.format(j)
+                 for j, factor in enumerate(factors)]
+        return CodedDesign(codes, tables, names=names)
+    return _stack_columns([factor.sample(codes[:, j], rng=values_rng)
+                           if _has_ranges(factor) and len(factor) == len(table) else table.take(codes[:, j])
+                           for j, (factor, table) in enumerate(zip(factors, tables))])
 
 
 def _column_avg_rho(design, j):
     m, k = design.shape
-    rho = 0
-    for i in range(k):
-        if i == j:
-            continue
-        rho += corrcoef(design[:, i], design[:, j]) ** 2
-
-    return rho / (k - 1)
+    return rho_matrix(design)[j].sum() / (k - 1)
 
 
 def _row_avg_distance(design, i):
-    m, k = design.shape
-    distance = 0.0
-    for j in range(m):
-        if i == j:
-            continue
-        distance += ((design[i, :] - design[j, :])[0, 1] ** 2).sum()
-    return sqrt(distance)
+    return sqrt(distance_squared_matrix(design)[i].sum())
 
 
 def _inspect_rhos(design):
     m, k = design.shape
 
-    rhos = []
-    indices = []
-
-    for i in range(k - 1):
-        for j in range(i, k):
-            indices.append((i, j))
-            rhos.append(corrcoef(design[:, i], design[:, j])[0, 1] ** 2)
-    return rhos, indices
+    rhos = correlation_matrix(design) ** 2
+    # pairs (i, j) with i < k - 1 and j >= i, including each column paired with itself
+    i, j = triu_indices(k)
+    keep = i < k - 1
+    i, j = i[keep], j[keep]
+    return list(rhos[i, j]), list(zip(i.tolist(), j.tolist()))
 
 
 def get_rhos(design):
@@ -484,13 +1842,11 @@ def get_rhos(design):
     return rhos.sum(axis=0) / (k - 1)
 
 
-def get_phis(design):
-    m, k = design.shape
-
-    ds = distance_squared_matrix(design)
-
-    phis = 1 / ds.ravel()[eye(m).ravel() == 0].reshape(m, m - 1)
-    return sqrt(phis.sum(axis=0))
+def get_phis(design, max_memory=None):
+    """Square root of the sum of inverse squared distances from each run to every other run, distances are
+    streamed over tiles of at most 'max_memory' bytes so only O(m) memory is held
+    """
+    return sqrt(row_phi_sums(design, p=2, max_memory=max_memory))
 
 
 def design_correlation(design):
@@ -505,27 +1861,35 @@ def distance_matrix(points):
     return sqrt(distance_squared_matrix(points))
 
 
-def distance_squared_matrix(points):
-    m, k = points.shape
-    dif = (points.reshape(1, m, k) - points.reshape(m, 1, k)) ** 2
-    return dif.sum(axis=-1)
+def distance_squared_matrix(points, condensed=False, max_memory=None):
+    """Squared euclidean distances between runs
 
+    :param points: numpy.ndarray (m, k)
+    :param condensed: bool, return only the upper triangle as a vector of length m * (m - 1) / 2 computed over
+        tiles of at most 'max_memory' bytes, see metrics.condensed_distances for the layout
+    :param max_memory: int, bytes per tile when condensed is True
+    :return: numpy.ndarray (m, m) or (m * (m - 1) / 2,)
+    """
+    if condensed:
+        return condensed_distances(points, max_memory=max_memory) ** 2
+    return distance_squared(points)
 
-def phi_matrix(points):
-    m, k = points.shape
 
+def _off_diagonal(matrix):
+    # drop the diagonal of a square matrix without building an (m, m) mask
+    m = len(matrix)
+    return matrix.ravel()[1:].reshape(m - 1, m + 1)[:, :-1].reshape(m, m - 1)
+
+
+def phi_matrix(points):
     ds = distance_squared_matrix(points)
 
-    return 1 / ds.ravel()[eye(m).ravel() == 0].reshape(m, m - 1)
+    return 1 / _off_diagonal(ds)
 
 
 def rho_matrix(design):
     m, k = design.shape
-    rhos = zeros((k, k))
-    for i in range(k):
-        for j in range(k):
-            rhos[i, j] = corrcoef(design[:, i], design[:, j])[0, 1] ** 2
-    return rhos - eye(k)
+    return correlation_matrix(design) ** 2 - eye(k)
 
 
 def phi_lower_bound(m, k):
@@ -1,6 +1,8 @@
-from numpy import (array, linspace, min, max)
-from experimentspydesign.levels import (LevelDiscrete, LevelContinuous,
-                                        LevelCategory, LevelCombo)
+from numpy import (array, linspace, min, max, arange, asarray, empty, flatnonzero, trunc, where, integer, maximum,
+                   hstack, newaxis, nonzero, ones, vstack, lexsort, clip)
+from numpy.random import default_rng, uniform
+from experimentspydesign.levels import (Level, LevelDiscrete, LevelContinuous,
+                                        LevelCategory, LevelCombo, LevelRange)
 from experimentspydesign.tools import factorial_indices as _factorial_indices
 from experimentspydesign.services import FormattedDict
 # from experimentspydesign.services import IterMapFunc
@@ -29,6 +31,38 @@ class FactorBase(FormattedDict):
         self._name = name
         self._n_levels = len(self)
 
+    def sample(self, codes, rng=None):
+        """Values for runs at the factor's levels, levels that are ranges with the uniform paradigm are drawn together
+        in one vectorized draw and other levels use their own Level.sample
+
+        :param codes: int, number of runs at every level, or array-like of int, the index of each run's level
+        :param rng: numpy.random.Generator or int seed, default None uses numpy.random's global generator
+        :return: numpy.ndarray, value of each run, runs are ordered by level when codes is an int
+        """
+        levels = list(self.values())
+        if isinstance(codes, int):
+            codes = arange(len(levels)).repeat(codes)
+        codes = asarray(codes, dtype=int).reshape(-1)
+        rng = default_rng(rng) if rng is not None else None
+
+        numeric = all([isinstance(level, LevelRange) for level in levels])
+        out = empty(len(codes), dtype=float if numeric else object)
+        drawn = array([numeric and level.paradigm == 'uniform' and level.lower != level.upper for level in levels])
+        if drawn.any():
+            lowers = array([level.lower for level in levels], dtype=float)
+            deltas = array([level.delta for level in levels], dtype=float)
+            is_int = array([level.dtype is int for level in levels])
+            ranged = drawn[codes]
+            u = rng.random(ranged.sum()) if rng is not None else uniform(size=ranged.sum())
+            values = u * deltas[codes[ranged]] + lowers[codes[ranged]]
+            out[ranged] = where(is_int[codes[ranged]], trunc(values), values)
+
+        for j in flatnonzero(~drawn):
+            ix = flatnonzero(codes == j)
+            if len(ix) > 0:
+                out[ix] = levels[j].sample(len(ix), rng=rng)
+        return out
+
     def _apply(self, f):
         return FormattedDict([(k, f(v)) for k, v in self.items()], name=self.name)
 
@@ -75,34 +109,36 @@ class FactorBase(FormattedDict):
             args = [args]
         return args
 
+    def _cross(self, other, compare=None):
+        """FactorCombo of the pairs of this factor's and other's levels for which compare is True
+
+        :param compare: str, name of a comparison '__ge__', '__gt__', '__le__' or '__lt__', default None keeps every
+            pair
+        """
+        if isinstance(other, FactorProduct):
+            # let the lazy product handle the operation with its reflected operator
+            return NotImplemented
+        if compare is None:
+            keep = ones((len(self), len(other)), dtype=bool)
+        else:
+            keep = _pair_mask(self, other, compare)
+        s_ix, o_ix = nonzero(keep)
+        return FactorCombo.cross(self, other, s_ix, o_ix)
+
     def __mul__(self, other):
-        s_ix, o_ix = _factorial_indices(self, other)
-        combos = [LevelCombo(self[s], other[o]) for s, o in zip(s_ix, o_ix)]
-        return FactorCombo(combos, names=[self.name, other.name])
+        return self._cross(other)
 
     def __ge__(self, other):
-        s_ix, o_ix = _factorial_indices(self, other)
-        keep = array([self[s] >= other[o] for s, o in zip(s_ix, o_ix)])
-        combos = [LevelCombo(self[s], other[o]) for s, o in zip(s_ix[keep], o_ix[keep])]
-        return FactorCombo(combos, names=[self.name, other.name])
+        return self._cross(other, '__ge__')
 
     def __gt__(self, other):
-        s_ix, o_ix = _factorial_indices(self, other)
-        keep = array([self[s] > other[o] for s, o in zip(s_ix, o_ix)])
-        combos = [LevelCombo(self[s], other[o]) for s, o in zip(s_ix[keep], o_ix[keep])]
-        return FactorCombo(combos, names=[self.name, other.name])
+        return self._cross(other, '__gt__')
 
     def __lt__(self, other):
-        s_ix, o_ix = _factorial_indices(self, other)
-        keep = array([self[s] < other[o] for s, o in zip(s_ix, o_ix)])
-        combos = [LevelCombo(self[s], other[o]) for s, o in zip(s_ix[keep], o_ix[keep])]
-        return FactorCombo(combos, names=[self.name, other.name])
+        return self._cross(other, '__lt__')
 
     def __le__(self, other):
-        s_ix, o_ix = _factorial_indices(self, other)
-        keep = array([self[s] <= other[o] for s, o in zip(s_ix, o_ix)])
-        combos = [LevelCombo(self[s], other[o]) for s, o in zip(s_ix[keep], o_ix[keep])]
-        return FactorCombo(combos, names=[self.name, other.name])
+        return self._cross(other, '__le__')
 
     def get(self, item, default=None):
         if item in self.keys():
@@ -126,7 +162,200 @@ class FactorBase(FormattedDict):
     #     return DataFrame(self.levels, index=[self.name]).T
 
 
-class FactorContinuous(FactorBase):
+class FactorLazy(FactorBase):
+    """Base for factors that do not store a Level object for each level, the Level of a level is created by
+    _level when the level is accessed and the formatted display is only built when the factor is displayed,
+    it is not intended to instanced on its own.
+    """
+
+    def __init__(self, name=None, **kwargs):
+        self._widths = None
+        super().__init__([], name=name, **kwargs)
+
+    def _level(self, i):
+        raise NotImplementedError
+
+    def _level_repr(self, i):
+        return str(self._level(i))
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __iter__(self):
+        return iter(range(len(self)))
+
+    def __contains__(self, item):
+        return isinstance(item, (int, integer)) and 0 <= item < len(self)
+
+    def __eq__(self, other):
+        if type(self) is not type(other) or len(self) != len(other):
+            return False
+        return all([s_l == o_l for s_l, o_l in zip(self.values(), other.values())])
+
+    __hash__ = None
+
+    def keys(self):
+        return range(len(self))
+
+    def values(self):
+        return [self._level(i) for i in range(len(self))]
+
+    def items(self):
+        return [(i, self._level(i)) for i in range(len(self))]
+
+    def __getitem__(self, item):
+        if item in self:
+            return self._level(int(item))
+        elif hasattr(item, '__iter__') and type(item) is not str:
+            return dict([(k, self[k]) for k in item])
+
+    def get(self, item, default=None):
+        if item in self:
+            return self._level(int(item))
+        elif hasattr(item, '__iter__') and type(item) is not str:
+            return dict([(k, self.get(k, default=default)) for k in item])
+        return default
+
+    def _string_rows(self, keys):
+        row_ = self.index_fmt + '  ' + self.column_fmt
+        return [row_.format(str(k), self._level_repr(k)) for k in keys]
+
+    def display(self, n_rows=50, header=True):
+        if self._widths is None:
+            # widths of the formatted levels are only computed the first time the factor is displayed
+            self._widths = (len(str(len(self) - 1)) if len(self) > 0 else 1,
+                            max([len(self._level_repr(i)) for i in range(len(self))] + [1]))
+        self._index_width, self._column_width = self._widths
+        return super().display(n_rows=n_rows, header=header)
+
+
+class FactorArray(FactorLazy):
+    """Base for factors whose levels are stored as arrays of lower and upper bounds, it is not intended to instanced
+    on its own.
+    """
+
+    def __init__(self, lowers, uppers, name=None, **kwargs):
+        """
+
+        :param lowers: array-like, lower bound of each level
+        :param uppers: array-like, upper bound of each level, included in the level, equal to lowers for points
+        :param name: str, name to identify factor in a design
+        """
+        self._lowers = _bounds_array(lowers)
+        self._uppers = _bounds_array(uppers)
+        super().__init__(name=name, **kwargs)
+
+    def _make_level(self, lower, upper):
+        raise NotImplementedError
+
+    def _bound(self, i):
+        return [b[i].item() if hasattr(b[i], 'item') else b[i] for b in (self._lowers, self._uppers)]
+
+    def _level(self, i):
+        return self._make_level(*self._bound(i))
+
+    def _level_repr(self, i):
+        return Level._get_str_repr(self._bound(i))
+
+    @property
+    def lower_bounds(self):
+        """numpy.ndarray, lower bound of each level"""
+        return self._lowers
+
+    @property
+    def upper_bounds(self):
+        """numpy.ndarray, upper bound of each level, included in the level"""
+        return self._uppers
+
+    @property
+    def dtype(self):
+        return float
+
+    def __len__(self):
+        return len(self._lowers)
+
+    def __eq__(self, other):
+        if not isinstance(other, FactorArray):
+            return False
+        return (type(self) is type(other) and len(self) == len(other) and bool((self._lowers == other._lowers).all())
+                and bool((self._uppers == other._uppers).all()))
+
+    __hash__ = None
+
+    @property
+    def lowers(self):
+        return FormattedDict(enumerate(self._lowers), name=self.name)
+
+    @property
+    def uppers(self):
+        return FormattedDict(enumerate(self._uppers), name=self.name)
+
+    def sample(self, codes, rng=None):
+        if isinstance(codes, int):
+            codes = arange(len(self)).repeat(codes)
+        codes = asarray(codes, dtype=int).reshape(-1)
+        lowers = self._lowers[codes].astype(float)
+        # width of the range each value is drawn from, ranges of int levels include their upper bound
+        deltas = self._uppers[codes].astype(float) - lowers + (self.dtype is int)
+        ranged = self._lowers[codes] != self._uppers[codes]
+        u = default_rng(rng).random(len(codes)) if rng is not None else uniform(size=len(codes))
+        values = where(ranged, u * deltas + lowers, lowers)
+        return trunc(values) if self.dtype is int else values
+
+    def quantile(self, u):
+        """Values at positions in [0, 1) of the factor, every level takes an equal share of [0, 1) and ranges are
+        spread over their share, the deterministic counterpart of sample for low-discrepancy designs
+
+        :param u: array-like of float in [0, 1)
+        :return: numpy.ndarray, value of each position
+        """
+        u = asarray(u, dtype=float).reshape(-1) * len(self)
+        codes = clip(u.astype(int), 0, len(self) - 1)
+        lowers = self._lowers[codes].astype(float)
+        deltas = self._uppers[codes].astype(float) - lowers + (self.dtype is int)
+        values = where(self._lowers[codes] != self._uppers[codes], (u - codes) * deltas + lowers, lowers)
+        return trunc(values) if self.dtype is int else values
+
+
+def _pair_mask(left, right, compare):
+    """Result of comparing every level of left to every level of right, factors with level bound arrays are compared
+    with broadcasting and other factors one pair of Level objects at a time
+
+    :param compare: str, name of a comparison '__ge__', '__gt__', '__le__' or '__lt__'
+    :return: numpy.ndarray of bool (len(left), len(right))
+    """
+    if isinstance(left, FactorArray) and isinstance(right, FactorArray):
+        return _compare_bounds(left, right, compare)
+    l_ix, r_ix = _factorial_indices(left, right)
+    return array([getattr(left[i], compare)(right[j]) for i, j in zip(l_ix, r_ix)],
+                 dtype=bool).reshape(len(left), len(right))
+
+
+def _compare_bounds(left, right, compare):
+    # the comparisons of LevelRange and LevelDiscrete for every pair of levels of two FactorArrays, (n_left, n_right)
+    l_lo, l_up = left.lower_bounds[:, newaxis], left.upper_bounds[:, newaxis]
+    r_lo, r_up = right.lower_bounds[newaxis, :], right.upper_bounds[newaxis, :]
+    both_int = left.dtype is int and right.dtype is int
+    if compare == '__ge__':
+        return where(l_lo == r_lo, l_up >= r_up, l_lo >= r_lo)
+    elif compare == '__le__':
+        return where(l_lo == r_lo, l_up <= r_up, l_lo <= r_lo)
+    elif compare == '__gt__':
+        return l_lo > r_up if both_int else l_lo >= r_up
+    elif compare == '__lt__':
+        return l_up < r_lo if both_int else l_up <= r_lo
+    raise ValueError("compare must be one of '__ge__', '__gt__', '__le__' or '__lt__', not '{}'".format(compare))
+
+
+def _bounds_array(values):
+    values = list(values)
+    # keep python ints as ints, a mix of int and float values keeps each value's type for display
+    if len(set([type(v) for v in values])) > 1 and all([type(v) in [int, float] for v in values]):
+        return array(values, dtype=object)
+    return array(values)
+
+
+class FactorContinuous(FactorArray):
     """Class used for Factors with continuous levels, either float point values or ranges of float values
 
     EXAMPLES:
@@ -161,21 +390,20 @@ class FactorContinuous(FactorBase):
         upper = max(args)
 
         if n_levels is None:
-            levels = [LevelContinuous(a) for a in args]
-
-        elif n_levels == 1 and lower == upper:
-            levels = [LevelContinuous(lower)]
-        elif n_levels == 1 and upper > lower:
-            levels = [LevelContinuous(lower, upper)]
-
+            lowers = uppers = list(args)
+        elif n_levels == 1:
+            lowers, uppers = [lower], [upper]
         else:  # if len(args) > 0: #  and n_levels >= 1:
             knots = linspace(lower, upper, n_levels + 1)
-            levels = [LevelContinuous(l, u) for l, u in zip(knots[:-1], knots[1:])]
+            lowers, uppers = knots[:-1], knots[1:]
 
-        super().__init__(levels, name=name, **kwargs)
+        super().__init__(lowers, uppers, name=name, **kwargs)
 
+    def _make_level(self, lower, upper):
+        return LevelContinuous(lower) if lower == upper else LevelContinuous(lower, upper)
 
-class FactorDiscrete(FactorBase):
+
+class FactorDiscrete(FactorArray):
     """Class used for Factors with integer levels, either int point values or ranges of int values
 
     EXAMPLES:
@@ -212,19 +440,22 @@ class FactorDiscrete(FactorBase):
         upper = max(args)
 
         if n_levels is None:
-            levels = [LevelDiscrete(a) for a in args]
-
-        elif n_levels == 1 and lower == upper:
-            levels = [LevelDiscrete(lower)]
-        elif n_levels == 1 and upper > lower:
-            upper += 1
-            levels = [LevelDiscrete(lower, upper)]
-
+            lowers = uppers = list(args)
+        elif n_levels == 1:
+            lowers, uppers = [lower], [upper]
         else:  # if len(args) > 0: #  and n_levels >= 1:
             knots = linspace(lower, upper + 1, n_levels + 1).astype(int)
-            levels = [LevelDiscrete(l, u) for l, u in zip(knots[:-1], knots[1:])]
+            # levels include their upper bound, a level of a single value is a point
+            lowers, uppers = knots[:-1], maximum(knots[1:] - 1, knots[:-1])
 
-        super().__init__(levels, name=name, **kwargs)
+        super().__init__(lowers, uppers, name=name, **kwargs)
+
+    @property
+    def dtype(self):
+        return int
+
+    def _make_level(self, lower, upper):
+        return LevelDiscrete(lower) if lower == upper else LevelDiscrete(lower, upper + 1)
 
 
 class FactorCategorical(FactorBase):
@@ -241,19 +472,72 @@ class FactorDatetime(FactorBase):
         super().__init__(*args, **kwargs)
 
 
-class FactorCombo(FactorBase):
+class FactorCombo(FactorLazy):
     """Class to group Factors together
 
+    The combinations are stored as the index of each combination's level in every one of the combined factors, the
+    LevelCombo of a combination is only created when it is accessed
     """
     def __init__(self, *args, **kwargs):
         names = kwargs.pop('names', [])
+        factors = kwargs.pop('factors', None)
+        codes = kwargs.pop('codes', None)
+
+        if factors is None:
+            # combinations given as LevelCombo objects
+            self._factors = None
+            self._combos = list(args[0]) if len(args) > 0 else []
+            self._codes = None
+        else:
+            self._factors = list(factors)
+            self._combos = None
+            self._codes = asarray(codes, dtype=int).reshape(-1, len(self._factors))
 
         if len(names) > 0:
             self._name = '__'.join(names)
 
-        super().__init__(*args, name='__'.join(names), **kwargs)
+        super().__init__(name='__'.join(names), **kwargs)
         self._names = names
 
+    @classmethod
+    def cross(cls, left, right, left_ix, right_ix):
+        """FactorCombo of pairs of levels of two factors, levels of a FactorCombo are expanded into the levels of the
+        factors it combines
+
+        :param left: FactorBase instance
+        :param right: FactorBase instance
+        :param left_ix: array-like of int, index of the level of left in each pair
+        :param right_ix: array-like of int, index of the level of right in each pair
+        :return: FactorCombo
+        """
+        factors, codes = [], []
+        for factor, ix in ((left, asarray(left_ix, dtype=int)), (right, asarray(right_ix, dtype=int))):
+            if isinstance(factor, FactorCombo) and factor.factors is not None:
+                factors += factor.factors
+                codes.append(factor.codes[ix])
+            else:
+                factors.append(factor)
+                codes.append(ix[:, newaxis])
+        return cls(factors=factors, codes=hstack(codes), names=[left.name, right.name])
+
+    @property
+    def factors(self):
+        """list of the combined factors, None when the combinations were given as LevelCombo objects"""
+        return self._factors
+
+    @property
+    def codes(self):
+        """numpy.ndarray (n, number of factors), index of each combination's level in every combined factor"""
+        return self._codes
+
+    def __len__(self):
+        return len(self._combos) if self._factors is None else len(self._codes)
+
+    def _level(self, i):
+        if self._factors is None:
+            return self._combos[i]
+        return LevelCombo(*[factor[c] for factor, c in zip(self._factors, self._codes[i].tolist())])
+
     # def to_series(self, transpose=False):
     #     df = self._as_frame().T if transpose else self._as_frame()
     #     return [df[col] for col in df.columns]
@@ -263,3 +547,258 @@ class FactorCombo(FactorBase):
 
     # def to_frame(self, transpose=False):
     #     return self._as_frame().T if transpose else self._as_frame()
+
+
+class FactorProduct(object):
+    """Lazy product of factors with comparison constraints between pairs of the factors
+
+    Products and comparisons are recorded instead of creating every combination. Comparing a product to a factor
+    compares the product's first factor to it like comparing a FactorCombo does. When the combinations are
+    enumerated the factors are joined one at a time, each constraint is applied as soon as both of its factors are
+    joined and the factor that keeps the fewest partial combinations is joined next, so constraints prune the
+    combinations before the unconstrained factors multiply them.
+
+    EXAMPLE:
+
+        >> a, b, c, d = [FactorContinuous(0., 1., n_levels=100) for _ in range(4)]
+        >> valid = (FactorProduct(a) * b * c >= d).where(b, '__lt__', c)     # 10^8 nominal combinations
+        >> valid.count()
+        >> for combos in valid.chunks(100000):
+        ..     combos.codes                  # level index of each combination in a, b, c and d
+    """
+
+    OPERATORS = {'__ge__': '__le__', '__gt__': '__lt__', '__le__': '__ge__', '__lt__': '__gt__'}
+
+    def __init__(self, *factors, constraints=()):
+        """
+
+        :param factors: FactorBase instances or FactorProducts that are combined
+        :param constraints: list of tuples (i, compare, j), the level of factor i compared to the level of factor j
+            with compare, one of '__ge__', '__gt__', '__le__' or '__lt__', must be True
+        """
+        self._factors = []
+        self._constraints = []
+        for factor in factors:
+            self._append(factor)
+        for i, compare, j in constraints:
+            self._add_constraint(i, compare, j)
+
+    def _append(self, factor):
+        # index of the first factor of the appended factor or product
+        offset = len(self._factors)
+        if isinstance(factor, FactorProduct):
+            self._factors += factor.factors
+            self._constraints += [(i + offset, compare, j + offset) for i, compare, j in factor.constraints]
+        elif isinstance(factor, FactorBase):
+            self._factors.append(factor)
+        else:
+            raise TypeError('FactorProduct only combines FactorBase instances and FactorProducts, '
+                            'not {}'.format(type(factor)))
+        return offset
+
+    def _add_constraint(self, i, compare, j):
+        if compare not in self.OPERATORS:
+            raise ValueError("compare must be one of {}, not '{}'".format(list(self.OPERATORS), compare))
+        self._constraints.append((self._index(i), compare, self._index(j)))
+
+    def _index(self, factor):
+        if isinstance(factor, (int, integer)):
+            if not 0 <= factor < len(self._factors):
+                raise IndexError('FactorProduct has {} factors, not {}'.format(len(self._factors), factor + 1))
+            return int(factor)
+        for i, f in enumerate(self._factors):
+            if f is factor or (isinstance(factor, str) and f.name == factor):
+                return i
+        raise ValueError("'{}' is not a factor of the product".format(getattr(factor, 'name', factor)))
+
+    @property
+    def factors(self):
+        return list(self._factors)
+
+    @property
+    def constraints(self):
+        return list(self._constraints)
+
+    @property
+    def names(self):
+        return [f.name for f in self._factors]
+
+    @property
+    def nominal_size(self):
+        """Number of combinations without constraints, a python int"""
+        size = 1
+        for factor in self._factors:
+            size *= len(factor)
+        return size
+
+    def _copy(self):
+        return FactorProduct(self, constraints=())
+
+    def where(self, left, compare, right):
+        """New product with a constraint between two of its factors
+
+        :param left: FactorBase instance, name or index of a factor of the product
+        :param compare: str, '__ge__', '__gt__', '__le__' or '__lt__'
+        :param right: FactorBase instance, name or index of a factor of the product
+        :return: FactorProduct
+        """
+        product = self._copy()
+        product._add_constraint(left, compare, right)
+        return product
+
+    def __mul__(self, other):
+        product = self._copy()
+        product._append(other)
+        return product
+
+    def __rmul__(self, other):
+        return FactorProduct(other, self)
+
+    def _compare(self, other, compare):
+        product = self._copy()
+        j = product._append(other)
+        product._constraints.append((0, compare, j))
+        return product
+
+    def __ge__(self, other):
+        return self._compare(other, '__ge__')
+
+    def __gt__(self, other):
+        return self._compare(other, '__gt__')
+
+    def __le__(self, other):
+        return self._compare(other, '__le__')
+
+    def __lt__(self, other):
+        return self._compare(other, '__lt__')
+
+    def _plan(self):
+        """Order factors are joined in and, for each step, the masks of the constraints with factors joined before
+
+        :return: tuple (order, steps), steps[s] is a list of (position of the joined factor in order, mask) where
+            mask[level of the joined factor, level of the new factor] is True for allowed pairs
+        """
+        n = len(self._factors)
+        masks = {}
+        for i, compare, j in self._constraints:
+            if i == j:
+                raise ValueError('A factor can not be compared with itself in a FactorProduct')
+            mask = _pair_mask(self._factors[i], self._factors[j], compare)
+            # constraints on the same pair of factors are combined
+            if (i, j) in masks:
+                masks[(i, j)] = masks[(i, j)] & mask
+            elif (j, i) in masks:
+                masks[(j, i)] = masks[(j, i)] & mask.T
+            else:
+                masks[(i, j)] = mask
+
+        def between(k, joined):
+            # masks of constraints between joined factors and factor k, oriented [joined level, k level]
+            out = []
+            for (i, j), mask in masks.items():
+                if j == k and i in joined:
+                    out.append((i, mask))
+                elif i == k and j in joined:
+                    out.append((j, mask.T))
+            return out
+
+        order = []
+        if len(masks) > 0:
+            # start from the constraint that keeps the fewest pairs
+            (i, j), mask = sorted(masks.items(), key=lambda item: item[1].sum())[0]
+            order = [i, j] if len(self._factors[i]) <= len(self._factors[j]) else [j, i]
+        while len(order) < n:
+            def estimate(k):
+                size = float(len(self._factors[k]))
+                for _, mask in between(k, order):
+                    size *= mask.mean() if mask.size > 0 else 0
+                return size
+            remaining = [k for k in range(n) if k not in order]
+            order.append(sorted(remaining, key=estimate)[0])
+
+        steps = [[(order.index(i), mask) for i, mask in between(k, order[:s])] for s, k in enumerate(order)]
+        return order, steps
+
+    def _expand(self, rows, order, steps, s, max_cells):
+        """Partial combinations extended with the factors of steps s and after, in blocks of at most about
+        max_cells allowed level checks"""
+        if s == len(steps):
+            yield rows
+            return
+        n_k = len(self._factors[order[s]])
+        block = int(max_cells // n_k) if 0 < n_k <= max_cells else 1
+        for start in range(0, len(rows), block):
+            part = rows[start:start + block]
+            allowed = ones((len(part), n_k), dtype=bool)
+            for position, mask in steps[s]:
+                allowed &= mask[part[:, position]]
+            r, k = nonzero(allowed)
+            if len(r) > 0:
+                for extended in self._expand(hstack([part[r], k[:, newaxis]]), order, steps, s + 1, max_cells):
+                    yield extended
+
+    def iter_codes(self, size=65536, max_cells=2 ** 22):
+        """Level indices of every valid combination in blocks, the combinations are not in a fixed order
+
+        :param size: int, maximum number of combinations in a block
+        :param max_cells: int, maximum number of level pairs checked at once, bounds the memory of a step
+        :return: generator of numpy.ndarray (n, number of factors), columns in the order of the product's factors
+        """
+        order, steps = self._plan()
+        inverse = [order.index(k) for k in range(len(order))]
+        start = arange(len(self._factors[order[0]]))[:, newaxis] if len(order) > 0 else empty((0, 0), dtype=int)
+        pending = []
+        n_pending = 0
+        for rows in self._expand(start, order, steps, 1, max_cells if max_cells > size else size):
+            pending.append(rows[:, inverse])
+            n_pending += len(rows)
+            while n_pending >= size:
+                rows = vstack(pending)
+                yield rows[:size]
+                pending = [rows[size:]]
+                n_pending -= size
+        if n_pending > 0:
+            yield vstack(pending)
+
+    def chunks(self, size=65536, max_cells=2 ** 22):
+        """Valid combinations in blocks
+
+        :return: generator of FactorCombo with at most size combinations
+        """
+        for codes in self.iter_codes(size=size, max_cells=max_cells):
+            yield FactorCombo(factors=self._factors, codes=codes, names=self.names)
+
+    def count(self, max_cells=2 ** 22):
+        """Number of valid combinations, the last factor joined is counted without creating its combinations"""
+        order, steps = self._plan()
+        if len(order) == 0:
+            return 0
+        last = steps[-1]
+        n_last = len(self._factors[order[-1]])
+        total = 0
+        start = arange(len(self._factors[order[0]]))[:, newaxis]
+        if len(order) == 1:
+            return len(start)
+        for rows in self._expand(start, order, steps[:-1], 1, max_cells):
+            block = int(max_cells // n_last) if 0 < n_last <= max_cells else 1
+            for i in range(0, len(rows), block):
+                part = rows[i:i + block]
+                allowed = ones((len(part), n_last), dtype=bool)
+                for position, mask in last:
+                    allowed &= mask[part[:, position]]
+                total += int(allowed.sum())
+        return total
+
+    def __len__(self):
+        return self.count()
+
+    def combo(self, max_cells=2 ** 22):
+        """Every valid combination as one FactorCombo, ordered like the combinations of the eager operators with the
+        first factor changing slowest
+
+        :return: FactorCombo
+        """
+        blocks = list(self.iter_codes(size=2 ** 20, max_cells=max_cells))
+        codes = vstack(blocks) if len(blocks) > 0 else empty((0, len(self._factors)), dtype=int)
+        codes = codes[lexsort(codes.T[::-1])]
+        return FactorCombo(factors=self._factors, codes=codes, names=self.names)
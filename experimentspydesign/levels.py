@@ -1,5 +1,10 @@
-from numpy import array, max, min, log10
-from numpy.random import uniform
+from numpy import array, max, min, log10, full, trunc, vstack
+from numpy.random import uniform, default_rng
+
+
+def _random(n, rng=None):
+    # n uniform [0, 1) values from rng, or from numpy.random's global generator like Level.value when rng is None
+    return uniform(size=n) if rng is None else default_rng(rng).random(n)
 
 
 class Level(object):
@@ -16,6 +21,16 @@ class Level(object):
     def value(self):
         return self._paradigm(self)
 
+    def sample(self, n, rng=None):
+        """Values of n runs at this level
+
+        :param n: int, number of values
+        :param rng: numpy.random.Generator or int seed, default None uses numpy.random's global generator
+        :return: numpy.ndarray (n,)
+        """
+        # paradigms are functions of a single level, call them once per value
+        return array([self.value for _ in range(n)])
+
     @property
     def lower(self):
         return min(self._value)
@@ -108,6 +123,8 @@ class LevelRange(Level):
         super().__init__(bounds)
         self._dtype = float
         self._delta = self.upper - self.lower
+        # name of a built in paradigm, None when the paradigm is a custom function
+        self._paradigm_name = paradigm if isinstance(paradigm, str) else None
         if self.lower == self.upper:
             self._paradigm = lambda l: l._value[0]
         elif paradigm == 'uniform':
@@ -119,6 +136,18 @@ class LevelRange(Level):
     def delta(self):
         return self._delta
 
+    @property
+    def paradigm(self):
+        return self._paradigm_name
+
+    def sample(self, n, rng=None):
+        if self.lower == self.upper:
+            return full(n, self.dtype(self._value[0]))
+        elif self._paradigm_name == 'uniform':
+            values = _random(n, rng) * self.delta + self.lower
+            return trunc(values).astype(int) if self.dtype is int else values
+        return super().sample(n, rng=rng)
+
     @property
     def dtype(self):
         return self._dtype
@@ -249,6 +278,15 @@ class LevelCombo(Level):
     def value(self):
         return [l.value for l in self._levels]
 
+    def sample(self, n, rng=None):
+        """Values of n runs at this combination of levels
+
+        :return: numpy.ndarray (n, number of combined levels)
+        """
+        # one generator for every level, an int seed passed on would draw the same numbers for each column
+        rng = default_rng(rng) if rng is not None else None
+        return vstack([l.sample(n, rng=rng) for l in self._levels]).T
+
     @property
     def dtype(self):
         return LevelCombo
@@ -0,0 +1,303 @@
+"""Quality metrics of designs, every function accepts a single design of shape (m, k) or a stack of B candidate
+designs of shape (B, m, k) and returns one value (or matrix) per design, computed with a few matrix products over
+the whole stack rather than loops over columns or pairs of runs
+
+EXAMPLE, screen random latin hypercubes and keep the most space filling one:
+
+    >> from numpy.random import default_rng
+    >> rng = default_rng(0)
+    >> candidates = rng.random((5000, 40, 8)).argsort(axis=1)     # 5000 random LHS of 40 runs and 8 factors
+    >> scores = evaluate(candidates)
+    >> best = candidates[argmin(scores['phi_p'])]
+"""
+from numpy import (abs, arange, asarray, empty, float64, inf, matmul, maximum, newaxis, ones, prod, sqrt, swapaxes,
+                   triu_indices, where, zeros)
+from numpy.linalg import svd
+from experimentspydesign.spatial import KDTree
+
+# default number of bytes a pairwise distance intermediate may use before computations switch to blocked tiles
+MAX_MEMORY = 2 ** 28
+
+
+def _as_stack(designs):
+    designs = asarray(designs, dtype=float64)
+    if designs.ndim == 2:
+        return designs[newaxis], True
+    elif designs.ndim == 3:
+        return designs, False
+    raise ValueError('designs must be an array of shape (m, k) or (B, m, k), not {}'.format(designs.shape))
+
+
+def _result(values, single):
+    return values[0] if single else values
+
+
+def correlation_matrix(designs):
+    """Pearson correlation between the columns of each design, columns without variance have 0 correlation
+
+    :param designs: numpy.ndarray (m, k) or (B, m, k)
+    :return: numpy.ndarray (k, k) or (B, k, k)
+    """
+    x, single = _as_stack(designs)
+    x = x - x.mean(axis=1, keepdims=True)
+    norms = sqrt((x ** 2).sum(axis=1, keepdims=True))
+    x = x / where(norms > 0, norms, inf)
+    corr = matmul(swapaxes(x, 1, 2), x)
+    # restore an exact unit diagonal, including columns without variance
+    k = corr.shape[-1]
+    corr[:, arange(k), arange(k)] = 1
+    return _result(corr, single)
+
+
+def mean_squared_correlation(designs):
+    """Average squared correlation of all pairs of distinct columns
+
+    :return: float or numpy.ndarray (B,)
+    """
+    corr = correlation_matrix(designs)
+    k = corr.shape[-1]
+    i, j = triu_indices(k, 1)
+    return (corr[..., i, j] ** 2).sum(axis=-1) / max(len(i), 1)
+
+
+def max_abs_correlation(designs):
+    """Largest absolute correlation between two distinct columns
+
+    :return: float or numpy.ndarray (B,)
+    """
+    corr = correlation_matrix(designs)
+    k = corr.shape[-1]
+    i, j = triu_indices(k, 1)
+    return abs(corr[..., i, j]).max(axis=-1, initial=0)
+
+
+def distance_squared(designs):
+    """Squared euclidean distance between every pair of runs using |a - b|^2 = |a|^2 + |b|^2 - 2 a.b, the
+    only intermediate has the size of the result
+
+    :param designs: numpy.ndarray (m, k) or (B, m, k)
+    :return: numpy.ndarray (m, m) or (B, m, m)
+    """
+    x, single = _as_stack(designs)
+    norms = (x ** 2).sum(axis=-1)
+    gram = matmul(x, swapaxes(x, 1, 2))
+    ds = maximum(norms[:, :, newaxis] + norms[:, newaxis, :] - 2 * gram, 0)
+    m = ds.shape[-1]
+    ds[:, arange(m), arange(m)] = 0
+    return _result(ds, single)
+
+
+def distance_rectangular(designs):
+    """Rectangular (L1) distance between every pair of runs
+
+    :param designs: numpy.ndarray (m, k) or (B, m, k)
+    :return: numpy.ndarray (m, m) or (B, m, m)
+    """
+    x, single = _as_stack(designs)
+    b, m, k = x.shape
+    d = 0
+    for j in range(k):
+        d = d + abs(x[:, :, newaxis, j] - x[:, newaxis, :, j])
+    return _result(d, single)
+
+
+def _block_size(m, max_memory):
+    max_memory = MAX_MEMORY if max_memory is None else max_memory
+    # a tile and its temporaries, about 3 float64 arrays of block x block
+    return int(max(min(m, sqrt(max_memory / 24)), 1))
+
+
+def iter_distance_blocks(points, metric='euclidean', max_memory=None):
+    """Tiles of the upper triangle of the pairwise distance matrix of one design, no tile uses more than about
+    'max_memory' bytes
+
+    :param points: numpy.ndarray (m, k)
+    :param metric: str, 'euclidean' or 'rectangular'
+    :param max_memory: int, bytes per tile, default None uses MAX_MEMORY
+    :return: generator of tuples (i0, i1, j0, j1, distances) where distances is the (i1 - i0, j1 - j0) tile
+        for rows i0:i1 and columns j0:j1 with j0 >= i0, tiles on the diagonal include the lower triangle and diagonal
+    """
+    x = asarray(points, dtype=float64)
+    m, k = x.shape
+    b = _block_size(m, max_memory)
+    norms = (x ** 2).sum(axis=-1)
+    for i0 in range(0, m, b):
+        i1 = min(i0 + b, m)
+        for j0 in range(i0, m, b):
+            j1 = min(j0 + b, m)
+            if metric == 'euclidean':
+                d = norms[i0:i1, newaxis] + norms[newaxis, j0:j1] - 2 * x[i0:i1].dot(x[j0:j1].T)
+                d = sqrt(maximum(d, 0))
+            elif metric == 'rectangular':
+                d = zeros((i1 - i0, j1 - j0))
+                for c in range(k):
+                    d += abs(x[i0:i1, c, newaxis] - x[newaxis, j0:j1, c])
+            else:
+                raise ValueError("metric must be 'euclidean' or 'rectangular', not '{}'".format(metric))
+            yield i0, i1, j0, j1, d
+
+
+def _upper_mask(i0, i1, j0, j1):
+    # True for entries of a tile strictly above the diagonal of the full matrix
+    return arange(i0, i1)[:, newaxis] < arange(j0, j1)[newaxis, :]
+
+
+def condensed_distances(points, metric='euclidean', max_memory=None):
+    """Distances between every pair of runs as a condensed vector of the upper triangle, pair (i, j) with i < j is
+    at index m * i - i * (i + 1) / 2 + j - i - 1, the same layout as scipy.spatial.distance.pdist
+
+    :return: numpy.ndarray (m * (m - 1) / 2,)
+    """
+    m = len(points)
+    out = empty(m * (m - 1) // 2)
+    for i0, i1, j0, j1, d in iter_distance_blocks(points, metric=metric, max_memory=max_memory):
+        for i in range(i0, i1):
+            lo = max(j0, i + 1)
+            if lo >= j1:
+                continue
+            start = m * i - i * (i + 1) // 2 + lo - i - 1
+            out[start:start + j1 - lo] = d[i - i0, lo - j0:]
+    return out
+
+
+def row_phi_sums(points, p=2, metric='euclidean', max_memory=None):
+    """Sum of d^-p between each run and every other run, streamed over tiles so memory is O(m)
+
+    :return: numpy.ndarray (m,)
+    """
+    m = len(points)
+    sums = zeros(m)
+    for i0, i1, j0, j1, d in iter_distance_blocks(points, metric=metric, max_memory=max_memory):
+        inverse = where(_upper_mask(i0, i1, j0, j1), d, inf) ** -float(p)
+        sums[i0:i1] += inverse.sum(axis=1)
+        sums[j0:j1] += inverse.sum(axis=0)
+    return sums
+
+
+def _streamed_phi_p(points, p, metric, max_memory):
+    return (row_phi_sums(points, p=p, metric=metric, max_memory=max_memory).sum() / 2) ** (1 / p)
+
+
+def _streamed_min_distance(points, metric, max_memory):
+    if metric == 'euclidean':
+        # nearest neighbours from a spatial index of the unscaled points, O(m log m) instead of every pair
+        return KDTree(points, bounds=(0, 1)).min_distance()
+    smallest = inf
+    for i0, i1, j0, j1, d in iter_distance_blocks(points, metric=metric, max_memory=max_memory):
+        smallest = min(smallest, where(_upper_mask(i0, i1, j0, j1), d, inf).min())
+    return smallest
+
+
+def _fits(designs, max_memory):
+    shape = asarray(designs).shape
+    n = shape[0] if len(shape) == 3 else 1
+    return n * shape[-2] ** 2 * 8 * 3 <= (MAX_MEMORY if max_memory is None else max_memory)
+
+
+def _pair_values(d):
+    m = d.shape[-1]
+    i, j = triu_indices(m, 1)
+    return d[..., i, j]
+
+
+def phi_p(designs, p=2, metric='euclidean', max_memory=None):
+    """Morris-Mitchell phi_p criterion (sum over pairs of runs of d^-p)^(1/p), smaller is more space filling
+
+    :param designs: numpy.ndarray (m, k) or (B, m, k)
+    :param p: int, larger p weights the closest pairs of runs more
+    :param metric: str, 'euclidean' or 'rectangular'
+    :param max_memory: int, bytes the distance matrices may use, larger designs are streamed over tiles one design
+        at a time, default None uses MAX_MEMORY
+    :return: float or numpy.ndarray (B,)
+    """
+    if not _fits(designs, max_memory):
+        return _per_design(designs, lambda x: _streamed_phi_p(x, p, metric, max_memory))
+    d = _distances(designs, metric)
+    return (_pair_values(d) ** -float(p)).sum(axis=-1) ** (1 / p)
+
+
+def min_distance(designs, metric='euclidean', max_memory=None):
+    """Smallest distance between two runs, the maximin criterion
+
+    :param max_memory: int, see phi_p
+    :return: float or numpy.ndarray (B,)
+    """
+    if not _fits(designs, max_memory):
+        return _per_design(designs, lambda x: _streamed_min_distance(x, metric, max_memory))
+    d = _distances(designs, metric)
+    return _pair_values(d).min(axis=-1)
+
+
+def _per_design(designs, f):
+    x, single = _as_stack(designs)
+    return _result(asarray([f(design) for design in x]), single)
+
+
+def _distances(designs, metric):
+    if metric == 'euclidean':
+        return sqrt(distance_squared(designs))
+    elif metric == 'rectangular':
+        return distance_rectangular(designs)
+    raise ValueError("metric must be 'euclidean' or 'rectangular', not '{}'".format(metric))
+
+
+def _unit_scale(x):
+    low = x.min(axis=1, keepdims=True)
+    spread = x.max(axis=1, keepdims=True) - low
+    return (x - low) / where(spread > 0, spread, 1)
+
+
+def centered_discrepancy(designs):
+    """Hickernell's centered L2 discrepancy (squared) of each design after scaling its columns to [0, 1], smaller is
+    more uniform
+
+    :return: float or numpy.ndarray (B,)
+    """
+    x, single = _as_stack(designs)
+    b, m, k = x.shape
+    u = _unit_scale(x)
+    z = abs(u - 0.5)
+
+    term_1 = (13 / 12) ** k
+    term_2 = prod(1 + z / 2 - z ** 2 / 2, axis=-1).sum(axis=-1) * 2 / m
+    # product over columns of the pairwise kernel, one (B, m, m) pass per column
+    pairs = ones((b, m, m))
+    for j in range(k):
+        pairs *= (1 + (z[:, :, newaxis, j] + z[:, newaxis, :, j]) / 2
+                  - abs(u[:, :, newaxis, j] - u[:, newaxis, :, j]) / 2)
+    term_3 = pairs.sum(axis=(1, 2)) / m ** 2
+    return _result(term_1 - term_2 + term_3, single)
+
+
+def condition_number(designs, intercept=True):
+    """Ratio of the largest to smallest singular value of each design's model matrix of main effects
+
+    :param intercept: bool, add a column of ones to the design before computing singular values
+    :return: float or numpy.ndarray (B,)
+    """
+    x, single = _as_stack(designs)
+    if intercept:
+        x = _with_intercept(x)
+    s = svd(x, compute_uv=False)
+    smallest = s[:, -1]
+    return _result(where(smallest > 0, s[:, 0] / where(smallest > 0, smallest, 1), inf), single)
+
+
+def _with_intercept(x):
+    b, m, k = x.shape
+    out = ones((b, m, k + 1))
+    out[:, :, 1:] = x
+    return out
+
+
+def evaluate(designs, p=2, metric='euclidean'):
+    """Every metric of this module for one design or a stack of designs
+
+    :return: dict of metric name to float or numpy.ndarray (B,)
+    """
+    return dict(mean_squared_correlation=mean_squared_correlation(designs),
+                max_abs_correlation=max_abs_correlation(designs),
+                phi_p=phi_p(designs, p=p, metric=metric),
+                min_distance=min_distance(designs, metric=metric),
+                centered_discrepancy=centered_discrepancy(designs),
+                condition_number=condition_number(designs))
@@ -0,0 +1,290 @@
+"""D- and I-optimal designs by exchange algorithms
+
+A design's runs are exchanged one at a time for the run that improves the criterion the most. Exchanging a run
+replaces one row f_old of the model matrix with f_new so the information matrix M = F'F changes by the rank 2 update
+f_new f_new' - f_old f_old'. With A = M^-1 [f_new, f_old] and the 2 x 2 matrix S = diag(1, -1) + [f_new, f_old]' A
+
+    det(M_new) = -det(S) det(M)
+    M_new^-1 = M^-1 - A S^-1 A'
+    trace(W M_new^-1) = trace(W M^-1) - trace(S^-1 A' W A)
+
+so every candidate of an exchange is scored with a few vector products and M^-1 is never factorized again.
+
+Coordinate exchange (Meyer & Nachtsheim 1995) changes a single factor of a run at a time, trying each level of
+the factor's grid, Fedorov exchange picks the best row of a candidate set for each run.
+
+EXAMPLE:
+
+    >> x, log_det = coordinate_exchange([[-1, 0, 1]] * 6, 30, model_terms(6, 'quadratic'), rng=1)
+    >> d_efficiency(x, 'quadratic')
+"""
+from numpy import (arange, argmax, array, asarray, concatenate, einsum, exp, eye, full, hstack, inf, log, ones, prod,
+                   vstack)
+from numpy.linalg import inv, slogdet
+from numpy.random import default_rng
+
+CRITERIA = ('D', 'I')
+
+
+def model_terms(n_factors, model='linear'):
+    """Terms of a model, a term is a tuple of the factors whose product it is
+
+    :param n_factors: int
+    :param model: str or list of tuple,
+            'linear' : intercept and main effects
+            'interaction' : linear and every two factor interaction
+            'quadratic' : interaction and the square of every factor
+        or a list of terms, () is the intercept, (0,) a main effect, (0, 1) an interaction and (0, 0) a square
+    :return: list of tuple
+    """
+    if not isinstance(model, str):
+        return [tuple(term) for term in model]
+    if model not in ('linear', 'interaction', 'quadratic'):
+        raise ValueError("model must be 'linear', 'interaction', 'quadratic' or a list of terms, not '{}'"
+                         .format(model))
+    terms = [()] + [(i,) for i in range(n_factors)]
+    if model in ('interaction', 'quadratic'):
+        terms += [(i, j) for i in range(n_factors) for j in range(i + 1, n_factors)]
+    if model == 'quadratic':
+        terms += [(i, i) for i in range(n_factors)]
+    return terms
+
+
+def _term_index(terms, n_factors):
+    # each term as a row of column indices padded with the index of a column of ones
+    order = max([len(term) for term in terms] + [1])
+    index = full((len(terms), order), n_factors)
+    for t, term in enumerate(terms):
+        index[t, :len(term)] = term
+    return index
+
+
+def model_matrix(x, model='linear'):
+    """Model matrix of a coded design, a column for each term
+
+    :param x: numpy.ndarray (n, k), coded design
+    :param model: str or list of tuple, see model_terms
+    :return: numpy.ndarray (n, p)
+    """
+    x = asarray(x, dtype=float)
+    terms = model_terms(x.shape[1], model)
+    return _expand(x, _term_index(terms, x.shape[1]))
+
+
+def _expand(x, index):
+    padded = hstack([x, ones((len(x), 1))])
+    return prod(padded[:, index], axis=-1)
+
+
+def information(x, model='linear', ridge=0.0):
+    """Information matrix F'F of a coded design, with 'ridge' added to the diagonal"""
+    f = model_matrix(x, model)
+    return f.T.dot(f) + ridge * eye(f.shape[1])
+
+
+def d_efficiency(x, model='linear'):
+    """D-efficiency in percent, 100 * det(F'F / n)^(1 / p), 100 for an orthogonal design of runs at +-1"""
+    f = model_matrix(x, model)
+    n, p = f.shape
+    sign, logdet = slogdet(f.T.dot(f) / n)
+    return 100 * exp(logdet / p) if sign > 0 else 0.0
+
+
+def i_criterion(x, moments, model='linear'):
+    """Average prediction variance over the region described by 'moments', trace(W (F'F)^-1)
+
+    :param moments: numpy.ndarray (p, p), mean of f f' over the design region
+    """
+    return float((moments * inv(information(x, model))).sum())
+
+
+def region_moments(points, model='linear'):
+    """Moment matrix W, the mean of f f' over points of the design region
+
+    :param points: numpy.ndarray (n, k), coded points spread over the region
+    """
+    f = model_matrix(points, model)
+    return f.T.dot(f) / len(f)
+
+
+class _Exchange(object):
+    """Model matrix and inverse information matrix of a design kept current through rank 2 exchanges of rows"""
+
+    def __init__(self, f, criterion='D', moments=None, ridge=1e-8):
+        if criterion not in CRITERIA:
+            raise ValueError('criterion must be one of {}, not {}'.format(CRITERIA, criterion))
+        if criterion == 'I' and moments is None:
+            raise ValueError("criterion 'I' needs the region's moment matrix")
+        self.f = array(f, dtype=float)
+        self.criterion = criterion
+        self.moments = moments
+        self.ridge = ridge
+        self.refactor()
+
+    def refactor(self):
+        # recompute M^-1 so rounding errors of the updates do not accumulate
+        p = self.f.shape[1]
+        self.m_inv = inv(self.f.T.dot(self.f) + self.ridge * eye(p))
+
+    def value(self):
+        """log det(M) for D, trace(W M^-1) for I"""
+        if self.criterion == 'D':
+            return slogdet(self.f.T.dot(self.f) + self.ridge * eye(self.f.shape[1]))[1]
+        return float((self.moments * self.m_inv).sum())
+
+    def _terms(self, i, candidates):
+        f_old = self.f[i]
+        a = candidates.dot(self.m_inv)
+        b = self.m_inv.dot(f_old)
+        s00 = 1 + einsum('ij,ij->i', a, candidates)
+        s01 = a.dot(f_old)
+        s11 = f_old.dot(b) - 1
+        return a, b, s00, s01, s11
+
+    def gains(self, i, candidates):
+        """Improvement of the criterion when run i is exchanged for each candidate row of the model matrix,
+        the log of the determinant ratio for D and the decrease of the average variance for I
+
+        :param candidates: numpy.ndarray (c, p)
+        :return: numpy.ndarray (c,)
+        """
+        a, b, s00, s01, s11 = self._terms(i, candidates)
+        det_s = s00 * s11 - s01 ** 2
+        if self.criterion == 'D':
+            ratio = -det_s
+            out = full(len(candidates), -inf)
+            out[ratio > 0] = log(ratio[ratio > 0])
+            return out
+        aw = a.dot(self.moments)
+        t00 = einsum('ij,ij->i', aw, a)
+        t01 = aw.dot(b)
+        t11 = b.dot(self.moments).dot(b)
+        with_inverse = det_s != 0
+        out = full(len(candidates), -inf)
+        out[with_inverse] = ((s11 * t00 - 2 * s01 * t01 + s00 * t11)[with_inverse]) / det_s[with_inverse]
+        return out
+
+    def exchange(self, i, f_new):
+        a, b, s00, s01, s11 = self._terms(i, f_new[None, :])
+        s = array([[s00[0], s01[0]], [s01[0], s11]])
+        u = array([a[0], b])
+        self.m_inv = self.m_inv - u.T.dot(inv(s)).dot(u)
+        self.f[i] = f_new
+
+
+def _initial_rows(sample, n_runs, constraint, max_tries=100):
+    # random runs that satisfy the constraint, drawn in batches
+    rows, n_found, size = [], 0, max(n_runs, 64)
+    for _ in range(max_tries):
+        x = sample(size)
+        if constraint is not None:
+            x = x[asarray(constraint(x), dtype=bool)]
+        rows.append(x)
+        n_found += len(x)
+        if n_found >= n_runs:
+            return vstack(rows)[:n_runs]
+    raise ValueError('the constraint rejected all but {} of {} random runs, the feasible region is empty or too small'
+                     ' to sample'.format(n_found, max_tries * size))
+
+
+def coordinate_exchange(levels, n_runs, terms, criterion='D', constraint=None, moments=None, max_passes=50,
+                        ridge=1e-8, tol=1e-9, rng=None):
+    """Coordinate exchange of a random starting design, every change of a single factor of a run is scored at once
+    and the best one is kept until the run cannot be improved, the search stops after a pass over the runs without
+    improvement. An I-optimal search starts from a D-optimized design so the information matrix is not singular.
+
+    :param levels: list of array-like, coded levels each factor may take
+    :param n_runs: int, number of runs
+    :param terms: list of tuple, terms of the model, see model_terms
+    :param criterion: str, 'D' maximizes det(F'F), 'I' minimizes the average prediction variance
+    :param constraint: callable, constraint(x) returns a bool for each coded run of x (n, k), runs where it is False
+        are never part of the design
+    :param moments: numpy.ndarray (p, p), moment matrix of the region for 'I', default None uses region_moments of
+        random feasible runs
+    :param max_passes: int, maximum number of passes over the runs
+    :param ridge: float, added to the diagonal of F'F so designs with fewer runs than terms can start improving
+    :param tol: float, smallest gain that counts as an improvement
+    :param rng: numpy.random.Generator or int seed
+    :return: tuple, coded design numpy.ndarray (n_runs, k) and its criterion value
+    """
+    rng = default_rng(rng)
+    levels = [asarray(l, dtype=float) for l in levels]
+    k = len(levels)
+    index = _term_index(terms, k)
+    # every single factor change of a run, the factor changed and its new value
+    changed = concatenate([full(len(l), j) for j, l in enumerate(levels)])
+    values = concatenate(levels)
+    changes = arange(len(values))
+
+    def sample(n):
+        return array([rng.choice(l, size=n) for l in levels]).T.reshape(n, k)
+
+    x = _initial_rows(sample, n_runs, constraint)
+    if criterion == 'I' and moments is None:
+        moments = region_moments(_initial_rows(sample, 2000, constraint), terms)
+
+    for step in (['D', 'I'] if criterion == 'I' else ['D']):
+        state = _Exchange(_expand(x, index), criterion=step, moments=moments, ridge=ridge)
+        for _ in range(max_passes):
+            improved = False
+            for i in rng.permutation(n_runs):
+                # at most one change per factor before moving on to the next run
+                for _ in range(k):
+                    rows = x[i].repeat(len(values)).reshape(k, -1).T
+                    rows[changes, changed] = values
+                    if constraint is not None:
+                        rows = rows[asarray(constraint(rows), dtype=bool)]
+                        if len(rows) == 0:
+                            break
+                    candidates = _expand(rows, index)
+                    gains = state.gains(i, candidates)
+                    best = argmax(gains)
+                    if gains[best] <= tol:
+                        break
+                    state.exchange(i, candidates[best])
+                    x[i] = rows[best]
+                    improved = True
+                    if gains[best] > 1:
+                        # large steps leave a nearly singular start, the updated inverse is not accurate enough
+                        state.refactor()
+            state.refactor()
+            if not improved:
+                break
+    return x, state.value()
+
+
+def fedorov_exchange(candidates, n_runs, terms, criterion='D', moments=None, max_passes=50, ridge=1e-8, tol=1e-9,
+                     rng=None):
+    """Fedorov exchange, every run is exchanged for the candidate that improves the criterion the most, a candidate
+    may be used by several runs
+
+    :param candidates: numpy.ndarray (c, k), coded runs the design is chosen from
+    :param moments: numpy.ndarray (p, p), moment matrix of the region for 'I', default None uses region_moments of
+        the candidates
+    :return: tuple, index of the design's runs in candidates numpy.ndarray (n_runs,) and its criterion value
+    """
+    rng = default_rng(rng)
+    candidates = asarray(candidates, dtype=float)
+    if len(candidates) == 0:
+        raise ValueError('no candidate runs satisfy the constraint')
+    f = _expand(candidates, _term_index(terms, candidates.shape[1]))
+    if criterion == 'I' and moments is None:
+        moments = f.T.dot(f) / len(f)
+    chosen = rng.integers(len(candidates), size=n_runs)
+    state = _Exchange(f[chosen], criterion=criterion, moments=moments, ridge=ridge)
+
+    for _ in range(max_passes):
+        improved = False
+        for i in rng.permutation(n_runs):
+            gains = state.gains(i, f)
+            best = argmax(gains)
+            if gains[best] > tol:
+                state.exchange(i, f[best])
+                chosen[i] = best
+                improved = True
+                if gains[best] > 1:
+                    state.refactor()
+        state.refactor()
+        if not improved:
+            break
+    return chosen, state.value()
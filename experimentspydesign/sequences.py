@@ -0,0 +1,282 @@
+"""Low-discrepancy sequences of points in the unit cube [0, 1)^d
+
+Sequences are generated from the index of each point so any block of a sequence costs the same to compute:
+next(n) continues where the previous call stopped, skip(n) jumps ahead and the points of a sequence never depend on
+how it was split into blocks.
+
+SobolSequence is a base 2 digital sequence with the direction numbers of Joe & Kuo (2008) for its first 21
+dimensions, further dimensions use the next primitive polynomials and random odd initial direction numbers from a
+fixed seed. It is scrambled with a random linear matrix scramble and digital shift (Matousek 1998). HaltonSequence
+uses the radical inverse in the first d primes with a random permutation of the digits of every digit position.
+
+EXAMPLE:
+
+    >> sobol = SobolSequence(4, seed=1)
+    >> first = sobol.next(256)           # (256, 4), powers of 2 keep the balance properties of the sequence
+    >> sobol.skip(256)
+    >> third = sobol.next(256)           # points 512..767
+"""
+from numpy import arange, array, bitwise_xor, ceil, empty, float64, log, log2, uint64, zeros
+from numpy.random import default_rng
+
+# bits of every coordinate of a Sobol point, indices are limited to 2^BITS
+BITS = 52
+
+# degree s, coefficients a and initial direction numbers m of Joe & Kuo for dimensions 2..21
+_JOE_KUO = [(1, 0, (1,)),
+            (2, 1, (1, 3)),
+            (3, 1, (1, 3, 1)),
+            (3, 2, (1, 1, 1)),
+            (4, 1, (1, 1, 3, 3)),
+            (4, 4, (1, 3, 5, 13)),
+            (5, 2, (1, 1, 5, 5, 17)),
+            (5, 4, (1, 1, 5, 5, 5)),
+            (5, 7, (1, 1, 7, 11, 19)),
+            (5, 11, (1, 1, 5, 1, 1)),
+            (5, 13, (1, 1, 1, 3, 11)),
+            (5, 14, (1, 3, 5, 5, 31)),
+            (6, 1, (1, 3, 3, 9, 7, 49)),
+            (6, 13, (1, 1, 1, 15, 21, 21)),
+            (6, 16, (1, 3, 1, 13, 27, 49)),
+            (6, 19, (1, 1, 1, 15, 7, 5)),
+            (6, 22, (1, 3, 1, 15, 13, 25)),
+            (6, 25, (1, 1, 5, 5, 19, 61)),
+            (7, 1, (1, 3, 7, 11, 23, 15, 103)),
+            (7, 4, (1, 3, 7, 13, 13, 15, 69))]
+
+
+def _is_primitive(s, a):
+    """True when x^s + a_1 x^(s-1) + ... + a_(s-1) x + 1 is primitive over GF(2), the bits of 'a' are a_1..a_(s-1)"""
+    poly = (1 << s) | (a << 1) | 1
+    order = (1 << s) - 1
+
+    def multiply(x, y):
+        r = 0
+        while y:
+            if y & 1:
+                r ^= x
+            y >>= 1
+            x <<= 1
+            if x >> s & 1:
+                x ^= poly
+        return r
+
+    def power(e):
+        r, base = 1, 2 if s > 1 else 1
+        while e:
+            if e & 1:
+                r = multiply(r, base)
+            base = multiply(base, base)
+            e >>= 1
+        return r
+
+    if power(order) != 1:
+        return False
+    factors, n, q = [], order, 2
+    while q * q <= n:
+        if n % q == 0:
+            factors.append(q)
+            while n % q == 0:
+                n //= q
+        q += 1
+    if n > 1:
+        factors.append(n)
+    return all([power(order // q) != 1 for q in factors])
+
+
+def _polynomials(n):
+    """Degree, coefficients and initial direction numbers of n dimensions after the first"""
+    out = list(_JOE_KUO[:n])
+    if len(out) == n:
+        return out
+    rng = default_rng(2008)
+    s, a = _JOE_KUO[-1][:2]
+    while len(out) < n:
+        a += 1
+        if a >= 1 << (s - 1):
+            s, a = s + 1, 0
+        if _is_primitive(s, a):
+            out.append((s, a, tuple(int(2 * rng.integers(1 << k) + 1) for k in range(s))))
+    return out
+
+
+def _direction_numbers(d, bits=BITS):
+    """Direction numbers v (d, bits) of a Sobol sequence, bit k of an index selects v[:, k]"""
+    m = zeros((d, bits), dtype=object)
+    m[0] = 1
+    for j, (s, a, initial) in enumerate(_polynomials(d - 1)):
+        m[j + 1, :s] = initial[:bits]
+        for k in range(s, bits):
+            value = m[j + 1, k - s] ^ (m[j + 1, k - s] << s)
+            for i in range(1, s):
+                if a >> (s - 1 - i) & 1:
+                    value ^= m[j + 1, k - i] << i
+            m[j + 1, k] = value
+    shifts = array([bits - 1 - k for k in range(bits)], dtype=object)
+    return (m << shifts).astype(uint64)
+
+
+def _parity(x):
+    for shift in (32, 16, 8, 4, 2, 1):
+        x = x ^ (x >> uint64(shift))
+    return x & uint64(1)
+
+
+def _linear_scramble(v, rng, bits=BITS):
+    """Multiply the direction numbers of each dimension by a random lower triangular binary matrix with a unit
+    diagonal, the matrix acts on the bits from the most significant one
+    """
+    d = len(v)
+    lower = rng.integers(0, 2, size=(d, bits, bits), dtype=uint64)
+    rows, columns = arange(bits)[:, None], arange(bits)[None, :]
+    lower[:, rows < columns] = 0
+    lower[:, arange(bits), arange(bits)] = 1
+    weights = array([1 << (bits - 1 - c) for c in range(bits)], dtype=uint64)
+    masks = (lower * weights).sum(axis=-1, dtype=uint64)
+    # bit r of a scrambled number is the parity of the number masked by row r of the matrix
+    scrambled = _parity(v[:, None, :] & masks[:, :, None])
+    return (scrambled * weights[None, :, None]).sum(axis=1, dtype=uint64)
+
+
+class _Sequence(object):
+
+    def __init__(self, d):
+        self._d = d
+        self._position = 0
+
+    @property
+    def d(self):
+        return self._d
+
+    @property
+    def position(self):
+        """index of the point next returns first"""
+        return self._position
+
+    def _points(self, index):
+        raise NotImplementedError
+
+    def _block(self, start, n):
+        return self._points(arange(start, start + n, dtype=uint64))
+
+    def next(self, n):
+        """The next n points of the sequence
+
+        :param n: int, number of points
+        :return: numpy.ndarray (n, d) in [0, 1)
+        """
+        points = self._block(self._position, n)
+        self._position += n
+        return points
+
+    def skip(self, n):
+        """Move ahead n points without computing them"""
+        self._position += n
+        return self
+
+    def reset(self):
+        self._position = 0
+        return self
+
+    def __getitem__(self, index):
+        """Points at indices of the sequence, the position does not change"""
+        if isinstance(index, slice):
+            stop = index.stop if index.stop is not None else self._position
+            index = arange(index.start or 0, stop, index.step or 1, dtype=uint64)
+        return self._points(array(index, dtype=uint64).reshape(-1))
+
+
+class SobolSequence(_Sequence):
+    """Sobol sequence in d dimensions, points are generated in Gray code order so each block of 2^m points
+    starting at a multiple of 2^m is a (t, m, d)-net
+    """
+
+    def __init__(self, d, scramble=True, seed=None):
+        """
+
+        :param d: int, number of dimensions
+        :param scramble: bool, apply a random linear matrix scramble and digital shift
+        :param seed: int, numpy.random.SeedSequence or Generator of the scramble
+        """
+        super().__init__(d)
+        self._v = _direction_numbers(d)
+        self._shift = zeros(d, dtype=uint64)
+        if scramble:
+            rng = default_rng(seed)
+            self._v = _linear_scramble(self._v, rng)
+            self._shift = rng.integers(0, 1 << BITS, size=d, dtype=uint64)
+
+    def _points(self, index):
+        if len(index) > 0 and int(index.max()) >= 1 << BITS:
+            raise IndexError('Sobol sequences have at most 2^{} points'.format(BITS))
+        return self._unit(self._bits(index))
+
+    def _bits(self, index):
+        gray = index ^ (index >> uint64(1))
+        x = empty((len(index), self._d), dtype=uint64)
+        x[:] = self._shift
+        k = 0
+        while len(index) > 0 and int(gray.max()) >> k > 0:
+            selected = ((gray >> uint64(k)) & uint64(1)).astype(bool)
+            x[selected] ^= self._v[:, k]
+            k += 1
+        return x
+
+    def _block(self, start, n):
+        if start + n > 1 << BITS:
+            raise IndexError('Sobol sequences have at most 2^{} points'.format(BITS))
+        if n == 0:
+            return empty((0, self._d))
+        # consecutive points in Gray code order differ by the direction number of the lowest set bit of the index
+        index = arange(start + 1, start + n, dtype=uint64)
+        lowest = log2((index & (~index + uint64(1))).astype(float64)).astype(int)
+        x = empty((n, self._d), dtype=uint64)
+        x[0] = self._bits(array([start], dtype=uint64))[0]
+        x[1:] = self._v.T[lowest]
+        return self._unit(bitwise_xor.accumulate(x, axis=0))
+
+    @staticmethod
+    def _unit(x):
+        return x.astype(float64) / float(1 << BITS)
+
+
+def _primes(n):
+    primes = []
+    candidate = 2
+    while len(primes) < n:
+        if all([candidate % p != 0 for p in primes if p * p <= candidate]):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+
+class HaltonSequence(_Sequence):
+    """Halton sequence in d dimensions, coordinate j is the radical inverse of the index in the j-th prime"""
+
+    def __init__(self, d, scramble=True, seed=None):
+        """
+
+        :param d: int, number of dimensions
+        :param scramble: bool, permute the digits of every digit position with random permutations
+        :param seed: int, numpy.random.SeedSequence or Generator of the permutations
+        """
+        super().__init__(d)
+        self._bases = _primes(d)
+        # enough digits for every index below 2^BITS
+        self._n_digits = [int(ceil(BITS * log(2) / log(b))) for b in self._bases]
+        rng = default_rng(seed) if scramble else None
+        self._permutations = [array([rng.permutation(b) if scramble else arange(b) for _ in range(n)])
+                              for b, n in zip(self._bases, self._n_digits)]
+
+    def _points(self, index):
+        x = empty((len(index), self._d))
+        for j, (b, permutation) in enumerate(zip(self._bases, self._permutations)):
+            remaining = index.copy()
+            value = zeros(len(index))
+            scale = 1.0
+            for digits in permutation:
+                scale /= b
+                value += digits[(remaining % uint64(b)).astype(int)] * scale
+                remaining //= uint64(b)
+            x[:, j] = value
+        return x
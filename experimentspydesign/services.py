@@ -8,7 +8,8 @@ class FormattedDict(dict):
         super().__init__(*args, **kwargs)
         if name is not None:
             self.name = name
-        if len(self) is not 0:
+        # the stored items, subclasses may report a different length for levels they do not store
+        if dict.__len__(self) != 0:
             self._index_width = max([len(str(k)) for k in super().keys()])
             self._column_width = max([len(str(v)) for v in super().values()])
         else:
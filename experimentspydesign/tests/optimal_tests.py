@@ -0,0 +1,46 @@
+import unittest as ut
+from numpy import allclose, eye
+from numpy.linalg import inv, slogdet
+from numpy.random import default_rng
+from experimentspydesign.optimal import _Exchange, model_matrix, region_moments
+
+
+class Test_Exchange(ut.TestCase):
+    def setUp(self):
+        rng = default_rng(0)
+        self.f = model_matrix(rng.uniform(-1, 1, (12, 3)), 'quadratic')
+        self.candidates = model_matrix(rng.uniform(-1, 1, (20, 3)), 'quadratic')
+        self.moments = region_moments(rng.uniform(-1, 1, (500, 3)), 'quadratic')
+
+    def _information(self, f, ridge):
+        return f.T.dot(f) + ridge * eye(f.shape[1])
+
+    def _exchanged(self, state, i):
+        for c in self.candidates:
+            f = state.f.copy()
+            f[i] = c
+            yield f
+
+    def test_d_gains(self):
+        state = _Exchange(self.f, criterion='D')
+        before = slogdet(self._information(self.f, state.ridge))[1]
+        brute = [slogdet(self._information(f, state.ridge))[1] - before for f in self._exchanged(state, 4)]
+        self.assertTrue(allclose(state.gains(4, self.candidates), brute))
+
+    def test_i_gains(self):
+        state = _Exchange(self.f, criterion='I', moments=self.moments)
+        before = (self.moments * inv(self._information(self.f, state.ridge))).sum()
+        brute = [before - (self.moments * inv(self._information(f, state.ridge))).sum()
+                 for f in self._exchanged(state, 7)]
+        self.assertTrue(allclose(state.gains(7, self.candidates), brute))
+
+    def test_exchange(self):
+        state = _Exchange(self.f, criterion='D')
+        for i, c in [(0, 3), (5, 11), (0, 8)]:
+            state.exchange(i, self.candidates[c])
+        self.assertTrue(allclose(state.m_inv, inv(self._information(state.f, state.ridge))))
+        self.assertTrue(allclose(state.f[0], self.candidates[8]))
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,41 @@
+import unittest as ut
+from numpy import allclose, fill_diagonal, inf, newaxis, sqrt
+from numpy.random import default_rng
+from experimentspydesign.spatial import KDTree
+
+
+def _brute_nearest(points):
+    d = sqrt(((points[:, newaxis, :] - points[newaxis, :, :]) ** 2).sum(axis=-1))
+    fill_diagonal(d, inf)
+    return d.min(axis=1)
+
+
+class Test_KDTree(ut.TestCase):
+    def test_nearest_distances(self):
+        rng = default_rng(0)
+        for n, k in [(2, 3), (40, 1), (700, 2), (1500, 5), (600, 8)]:
+            points = rng.random((n, k))
+            # repeated points are at distance 0 of each other
+            points[:n // 10] = points[n // 10:2 * (n // 10)]
+            self.assertTrue(allclose(KDTree(points, bounds=(0, 1)).nearest_distances(), _brute_nearest(points)))
+
+    def test_nearest_distances_small_blocks(self):
+        points = default_rng(1).random((900, 4))
+        tree = KDTree(points, bounds=(0, 1))
+        static = tree._trees[0][0]
+        self.assertTrue(allclose(static.nearest_self(max_memory=2 ** 12), _brute_nearest(points)))
+
+    def test_nearest_distances_added_points(self):
+        rng = default_rng(2)
+        tree = KDTree(rng.random((300, 3)), bounds=(0, 1))
+        tree.add(rng.random((70, 3)))
+        self.assertTrue(allclose(tree.nearest_distances(), _brute_nearest(tree.points)))
+
+    def test_min_distance(self):
+        points = default_rng(3).random((500, 3))
+        self.assertAlmostEqual(KDTree(points, bounds=(0, 1)).min_distance(), _brute_nearest(points).min())
+        self.assertEqual(KDTree(points[:1]).min_distance(), inf)
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -3,7 +3,7 @@ from distutils.core import setup
 setup(
     name='surrogate',
     version='0.0.1',
-    packages=['simple', 'simple.trees'],
+    packages=['simple', 'simple.trees', 'simple.benchmarks'],
     url='www.spa.com',
     license='N/A',
     author='Josh McCrary',
@@ -1,4 +1,5 @@
-from simple.simulation import CLOCK, SimulationQueue
+from simple.simulation import CLOCK, SimulationQueue, run, reset
+from simple.inventory import INVENTORY, InventoryLedger
 from simple.models import ComponentType, ComponentManifest, ComponentModel
 from simple.processes import Process, Create, Consume
 from simple.objects import Component, ProcessingFacility
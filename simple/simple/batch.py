@@ -0,0 +1,174 @@
+"""Run a model over every point of an experimental design
+
+Rows of a design matrix, for example from experimentspydesign.lhs or fullfact, are mapped to keyword parameters of a
+model function and every design point is run for a number of replications across a process pool. Each finished
+run is appended to a checkpoint file so an interrupted sweep skips the runs it already completed when it is started
+again, runs that finish after another run raised are still written before the error is raised.
+
+EXAMPLE:
+
+    >> from experimentspydesign import lhs
+    >> from simple import run
+    >> from simple.benchmarks import FactoryModel
+    >> def model(params, rng):
+    ..     factory = FactoryModel(n_servers=int(params['servers']), life_time_steps=params['life'], seed=rng)
+    ..     factory.start(100)
+    ..     return dict(events=run())
+    >> design = lhs([1, 2, 3, 4], [10.0, 60.0], n_samples=20)
+    >> rows = run_design(design, model, dict(servers=0, life=1), replications=5, checkpoint='sweep.jsonl')
+    >> write_table(rows, 'sweep.csv')
+"""
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+from numpy import asarray, generic
+from numpy.random import SeedSequence, default_rng
+from simple.simulation import reset
+
+
+def design_parameters(design, parameters, names=None):
+    """Map each row of a design to a dict of model parameters
+
+    :param design: array-like with a row for each design point
+    :param parameters: dict of parameter name to column index or column name
+    :param names: list of column names of the design, required when parameters reference columns by name
+    :return: list of dict
+    """
+    design = asarray(design)
+    columns = {}
+    for parameter, column in parameters.items():
+        if type(column) is str:
+            if names is None or column not in names:
+                raise ValueError("Column '{}' for parameter '{}' is not one of the design's column names: "
+                                 "{}".format(column, parameter, names))
+            column = list(names).index(column)
+        columns[parameter] = column
+    return [dict([(p, _to_builtin(row[c])) for p, c in columns.items()]) for row in design]
+
+
+def _to_builtin(value):
+    return value.item() if isinstance(value, generic) else value
+
+
+def _run_point(model, design_row, replication, params, seed):
+    # every run starts from an empty simulation so results do not depend on which worker ran the previous point
+    reset(2000, 1, 1)
+    rng = default_rng(SeedSequence(seed, spawn_key=(design_row, replication)))
+    t = perf_counter()
+    outputs = model(dict(params), rng)
+    row = dict(design_row=design_row, replication=replication)
+    row.update(params)
+    row.update(outputs)
+    row['seconds'] = perf_counter() - t
+    return row
+
+
+def _load_checkpoint(path, points, seed):
+    completed = {}
+    if path is None or not os.path.exists(path):
+        return completed
+    with open(path, 'rb') as f:
+        lines = f.readlines()
+    size = 0
+    for n, line in enumerate(lines):
+        try:
+            row = json.loads(line) if line.strip() != b'' else None
+        except ValueError:
+            row = line
+        if n == len(lines) - 1 and (not line.endswith(b'\n') or type(row) is bytes):
+            # a run interrupted while writing leaves a partial last line, it is removed and the run done again
+            with open(path, 'r+b') as f:
+                f.truncate(size)
+            break
+        if type(row) is bytes:
+            raise ValueError("Line {} of checkpoint '{}' is not valid JSON".format(n + 1, path))
+        size += len(line)
+        if row is None:
+            continue
+        if 'design_row' not in row:
+            if row.get('seed', seed) != seed:
+                raise ValueError("Checkpoint '{}' was written with seed {} but the design is run with seed {}, use "
+                                 "the same seed or a new checkpoint file".format(path, row['seed'], seed))
+            continue
+        i = row['design_row']
+        if i >= len(points) or any([row.get(p) != v for p, v in points[i].items()]):
+            raise ValueError("Checkpoint '{}' has results for design row {} which does not match the design "
+                             "being run, use a new checkpoint file for a different design".format(path, i))
+        completed[(i, row['replication'])] = row
+    return completed
+
+
+def run_design(design, model, parameters, names=None, replications=1, n_workers=None, checkpoint=None, seed=0):
+    """Run 'model' for every design point and replication
+
+    :param design: array-like with a row for each design point
+    :param model: callable, model(params, rng) returns a dict of outputs for one run, params is the dict of
+        parameters of a design point and rng a numpy.random.Generator, it must be importable by worker processes
+    :param parameters: dict of parameter name to column index or column name
+    :param names: list of column names of the design, required when parameters reference columns by name
+    :param replications: int, number of runs of every design point
+    :param n_workers: int, number of worker processes, default None uses all cpus, 0 runs in this process
+    :param checkpoint: str, path of a JSON lines file completed runs are appended to and read from when restarting,
+        its first line holds the seed and a partially written last line is dropped
+    :param seed: int, entropy of the SeedSequence every run's generator is spawned from, the generator of a run
+        only depends on the seed, design row and replication so restarted sweeps reproduce the same results
+    :return: list of dict, one row per run with 'design_row', 'replication', parameters, outputs and 'seconds'
+        sorted by design row and replication
+    """
+    points = design_parameters(design, parameters, names=names)
+    completed = _load_checkpoint(checkpoint, points, seed)
+    tasks = [(i, r) for i in range(len(points)) for r in range(replications) if (i, r) not in completed]
+
+    out = open(checkpoint, 'a') if checkpoint is not None else None
+    try:
+        if out is not None and out.tell() == 0:
+            # the first line of a checkpoint holds the seed so a restart with a different seed is refused
+            out.write(json.dumps(dict(seed=seed)) + '\n')
+            out.flush()
+
+        def record(row):
+            completed[(row['design_row'], row['replication'])] = row
+            if out is not None:
+                out.write(json.dumps(row, default=_to_builtin) + '\n')
+                out.flush()
+
+        if n_workers == 0:
+            for i, r in tasks:
+                record(_run_point(model, i, r, points[i], seed))
+        elif len(tasks) > 0:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                futures = [pool.submit(_run_point, model, i, r, points[i], seed) for i, r in tasks]
+                error = None
+                for future in as_completed(futures):
+                    if future.cancelled():
+                        continue
+                    try:
+                        row = future.result()
+                    except Exception as e:
+                        if error is None:
+                            # runs already started still finish and are checkpointed before the error is raised
+                            error = e
+                            for pending in futures:
+                                pending.cancel()
+                        continue
+                    record(row)
+                if error is not None:
+                    raise error
+    finally:
+        if out is not None:
+            out.close()
+
+    return [completed[k] for k in sorted(completed.keys()) if k[1] < replications]
+
+
+def write_table(rows, path):
+    """Write result rows to a csv file, columns are the union of every row's keys in order of appearance"""
+    columns = []
+    for row in rows:
+        columns += [k for k in row.keys() if k not in columns]
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,3 @@
+from simple.benchmarks.factory import FactoryModel
+from simple.benchmarks.runner import run_scenario, run_suite, compare, save, load
+from simple.benchmarks.micro import MICRO_BENCHMARKS, run_micro
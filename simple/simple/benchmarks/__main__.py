@@ -0,0 +1,50 @@
+"""Command line interface of the benchmarks
+
+    python -m simple.benchmarks run --facilities 2 8 --types 16 --depth 1 3 --output results.json
+    python -m simple.benchmarks compare baseline.json results.json
+"""
+import argparse
+from simple.benchmarks.runner import compare, grid, run_suite, save
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m simple.benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    bench = commands.add_parser('run', help='run factory scenarios for every combination of parameters')
+    bench.add_argument('--facilities', type=int, nargs='+', default=[4])
+    bench.add_argument('--types', type=int, nargs='+', default=[8])
+    bench.add_argument('--depth', type=int, nargs='+', default=[2])
+    bench.add_argument('--arrival-rate', type=float, nargs='+', default=[1.0])
+    bench.add_argument('--life', type=float, nargs='+', default=[30.0])
+    bench.add_argument('--servers', type=int, nargs='+', default=[2])
+    bench.add_argument('--horizon', type=float, nargs='+', default=[200.0])
+    bench.add_argument('--seed', type=int, default=0)
+    bench.add_argument('--micro-size', type=int, default=2000, help='operations per micro benchmark, 0 skips them')
+    bench.add_argument('--no-isolate', action='store_true', help='run scenarios in this process')
+    bench.add_argument('--output', default=None, help='path of JSON results file')
+
+    diff = commands.add_parser('compare', help='compare two JSON results files')
+    diff.add_argument('baseline')
+    diff.add_argument('candidate')
+
+    args = parser.parse_args(argv)
+    if args.command == 'compare':
+        print(compare(args.baseline, args.candidate))
+        return
+
+    scenarios = grid(n_facilities=args.facilities, n_types=args.types, bom_depth=args.depth,
+                     arrival_rate=args.arrival_rate, life_time_steps=args.life, n_servers=args.servers,
+                     horizon=args.horizon, seed=[args.seed])
+    results = run_suite(scenarios, isolate=not args.no_isolate, micro_size=args.micro_size or None)
+    for scenario in results['scenarios']:
+        print('{params}: {events} events, {events_per_second:.0f} events/s, peak rss {peak_rss_kb} kB, '
+              'phases {phases}'.format(**scenario))
+    for name, micro in results['micro'].items():
+        print('micro {}: {:.3g} s/op'.format(name, micro['seconds_per_op']))
+    if args.output is not None:
+        save(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+from numpy.random import default_rng
+from simple.simulation import Action, CLOCK
+from simple.models import ComponentModel, ComponentType
+from simple.processes import Process, Create
+from simple.objects import ProcessingFacility
+
+
+class Fabricate(Create):
+    """Create components and install newly created components for every model in their bill of materials"""
+    ID = 0
+    ABBREVIATION = 'FB'
+
+    def __call__(self, inputs):
+        outputs = super().__call__(inputs)
+        for component in outputs:
+            self._install_bom(component)
+        return outputs
+
+    def _install_bom(self, component):
+        for child_model in component.model.children:
+            child = child_model.create()
+            component.install_components(child)
+            self._install_bom(child)
+
+
+class Arrivals(object):
+    """Orders for one component model arriving at a facility as a Poisson process until the simulation horizon"""
+
+    def __init__(self, facility, process, rate, rng):
+        self._facility = facility
+        self._process = process
+        self._rate = rate
+        self._horizon = None
+        self._rng = rng
+        self._name = 'arrivals_' + process.name
+
+    @property
+    def name(self):
+        return self._name
+
+    def start(self, horizon):
+        self._horizon = CLOCK.to_datetime(horizon)
+        self.schedule()
+
+    def schedule(self):
+        date = CLOCK + self._rng.exponential(1 / self._rate)
+        if date <= self._horizon:
+            Action(date, self)
+
+    def __call__(self, inputs=(), owner=None, step=0):
+        self._facility.submit(self._process)
+        self.schedule()
+
+
+class FactoryModel(object):
+    """Synthetic factory for benchmarks, 'n_types' component models spread over 'n_facilities' facilities
+
+    Models are arranged in 'bom_depth' levels and every model above the last level has the model in the same
+    position of the next level in its bill of materials. Each facility has a store for every model and one
+    processing line that fabricates the models assigned to it, orders for each model arrive at 'arrival_rate' per
+    simulation step and components expire 'life_time_steps' after they are created
+    """
+
+    def __init__(self, n_facilities=4, n_types=8, bom_depth=2, arrival_rate=1.0, life_time_steps=30,
+                 creation_time_steps=1, n_servers=2, capacity=10 ** 9, seed=0):
+        self._params = dict(n_facilities=n_facilities, n_types=n_types, bom_depth=bom_depth,
+                            arrival_rate=arrival_rate, life_time_steps=life_time_steps,
+                            creation_time_steps=creation_time_steps, n_servers=n_servers, seed=seed)
+        self._rng = default_rng(seed)
+
+        # ComponentType is a registry of names, prefix with the parameters so models from different runs
+        # in the same process do not collide
+        prefix = 'bench-{}x{}x{}-'.format(n_facilities, n_types, bom_depth)
+        self._models = [ComponentModel(prefix + '{:03d}'.format(i), life_time_steps, creation_time_steps, 0.0)
+                        for i in range(n_types)]
+        per_level = max(n_types // max(bom_depth, 1), 1)
+        for i, model in enumerate(self._models):
+            level = i // per_level
+            child = i + per_level
+            if level < bom_depth - 1 and child < n_types:
+                model.add_component(self._models[child])
+
+        self._processes = [Process(Fabricate(outputs=(model,), time_steps=creation_time_steps),
+                                   name='fabricate_' + model.name) for model in self._models]
+
+        self._facilities = []
+        for f in range(n_facilities):
+            processes = self._processes[f::n_facilities]
+            stores = [(ComponentType(model.name), capacity) for model in self._models]
+            facility = ProcessingFacility(name='bench-facility-{:03d}'.format(f), storage_types_capacities=stores)
+            if len(processes) > 0:
+                facility.add_processing_line(*processes, n_servers=n_servers)
+            self._facilities.append(facility)
+
+        self._arrivals = [Arrivals(self._facilities[i % n_facilities], process, arrival_rate, self._rng)
+                          for i, process in enumerate(self._processes)]
+
+    @property
+    def params(self):
+        return self._params
+
+    @property
+    def facilities(self):
+        return self._facilities
+
+    @property
+    def models(self):
+        return self._models
+
+    def start(self, horizon):
+        """Schedule the first order of every model, orders stop arriving after 'horizon' simulation steps"""
+        for arrivals in self._arrivals:
+            arrivals.start(horizon)
+
+    def report(self):
+        return dict(facilities=[facility.report() for facility in self._facilities],
+                    lines=[facility.line_statistics() for facility in self._facilities])
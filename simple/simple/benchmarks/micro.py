@@ -0,0 +1,96 @@
+from time import perf_counter
+from simple.simulation import Action, CLOCK, MAIN_ACTIONS, reset
+from simple.models import ComponentModel, ComponentType
+from simple.processes import Process, Create
+from simple.objects import Component, StorageComponent, ProcessingLine
+
+
+def _noop(inputs=(), owner=None, step=0):
+    return None
+
+
+_noop.name = 'noop'
+
+
+def queue_schedule_pop(n):
+    """Schedule 'n' actions at pseudo random dates and call them in date order"""
+    reset(2000, 1, 1)
+    t = perf_counter()
+    for i in range(n):
+        Action(CLOCK + (i * 7919) % n, _noop)
+    while len(MAIN_ACTIONS) > 0:
+        MAIN_ACTIONS.pop()()
+    return perf_counter() - t
+
+
+def store_pluck(n):
+    """Store 'n' components in a StorageComponent and pluck them all"""
+    reset(2000, 1, 1)
+    model = _model()
+    components = [model.create() for _ in range(n)]
+    store = StorageComponent(ComponentType(model.name), n)
+    t = perf_counter()
+    for component in components:
+        store.store(component)
+    for _ in range(n):
+        store.pluck()
+    return perf_counter() - t
+
+
+def tree_install_count(n):
+    """Install 'n' components in a two level tree and count its nodes by model"""
+    reset(2000, 1, 1)
+    model = _model()
+    root = model.create()
+    t = perf_counter()
+    width = max(int(n ** 0.5), 1)
+    for _ in range(width):
+        branch = model.create()
+        root.install_components([model.create() for _ in range(n // width)])
+        root.install_components(branch)
+    root.node_count_by_attr('name')
+    return perf_counter() - t
+
+
+def line_submit(n):
+    """Submit 'n' jobs to a two server ProcessingLine and run them"""
+    reset(2000, 1, 1)
+    process = Process(Create(outputs=(), time_steps=1), name='micro_line_process')
+    line = ProcessingLine(processes=[process], n_servers=2)
+    line.assign_owner(None)
+    t = perf_counter()
+    for i in range(n):
+        line.submit(process, priority=i % 5)
+    while len(MAIN_ACTIONS) > 0:
+        action = MAIN_ACTIONS.pop()
+        CLOCK.append(action.date)
+        action()
+    return perf_counter() - t
+
+
+def _model():
+    name = 'micro-benchmark-model'
+    return ComponentModel(name, 0, 0, 0.0)
+
+
+MICRO_BENCHMARKS = dict(queue_schedule_pop=queue_schedule_pop,
+                        store_pluck=store_pluck,
+                        tree_install_count=tree_install_count,
+                        line_submit=line_submit)
+
+
+def run_micro(n=1000, repeat=3, names=None):
+    """Best of 'repeat' timings of each micro benchmark
+
+    :param n: int, number of operations per timing
+    :param repeat: int, number of timings of each benchmark
+    :param names: list of str, benchmarks to run, default None runs all of MICRO_BENCHMARKS
+    :return: dict of benchmark name to dict with 'n', 'seconds' and 'seconds_per_op'
+    """
+    names = list(MICRO_BENCHMARKS.keys()) if names is None else names
+    results = {}
+    for name in names:
+        seconds = min([MICRO_BENCHMARKS[name](n) for _ in range(repeat)])
+        results[name] = dict(n=n, seconds=seconds, seconds_per_op=seconds / n)
+    reset()
+    return results
@@ -0,0 +1,140 @@
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from itertools import product
+from multiprocessing import get_context
+from time import perf_counter
+import numpy
+from simple.simulation import reset, run
+from simple.inventory import INVENTORY
+from simple.benchmarks.factory import FactoryModel
+from simple.benchmarks.micro import run_micro
+
+
+def peak_rss_kb():
+    """Peak resident set size of the current process in kilobytes, None where the resource module is missing"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, linux reports kilobytes
+    return rss / 1024 if sys.platform == 'darwin' else rss
+
+
+def run_scenario(horizon=100, **params):
+    """Build, run and report a FactoryModel timing each phase
+
+    :param horizon: number of simulation steps orders arrive for
+    :param params: keyword arguments of FactoryModel
+    :return: dict with parameters, number of events, events per second, peak rss and seconds per phase
+    """
+    phases = {}
+    t = perf_counter()
+    reset(2000, 1, 1)
+    model = FactoryModel(**params)
+    model.start(horizon)
+    phases['setup'] = perf_counter() - t
+
+    t = perf_counter()
+    events = run()
+    phases['run'] = perf_counter() - t
+
+    t = perf_counter()
+    model.report()
+    INVENTORY.counts()
+    phases['report'] = perf_counter() - t
+
+    return dict(params=dict(model.params, horizon=horizon),
+                events=events,
+                events_per_second=events / phases['run'] if phases['run'] > 0 else None,
+                peak_rss_kb=peak_rss_kb(),
+                phases=phases)
+
+
+def _run_isolated(kwargs):
+    return run_scenario(**kwargs)
+
+
+def run_suite(scenarios, isolate=True, micro_size=None):
+    """Run benchmark scenarios and optionally the micro benchmarks
+
+    :param scenarios: iterable of dicts of keyword arguments of run_scenario
+    :param isolate: bool, run each scenario in a new process so peak rss belongs to that scenario alone
+    :param micro_size: int, number of operations per micro benchmark, default None skips them
+    :return: dict with 'meta', 'scenarios' and 'micro' entries
+    """
+    results = []
+    if isolate:
+        ctx = get_context('spawn')
+        for scenario in scenarios:
+            with ctx.Pool(1) as pool:
+                results.append(pool.apply(_run_isolated, (scenario,)))
+    else:
+        results = [run_scenario(**scenario) for scenario in scenarios]
+
+    micro = run_micro(micro_size) if micro_size is not None else {}
+    return dict(meta=_meta(), scenarios=results, micro=micro)
+
+
+def _meta():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return dict(timestamp=datetime.now().isoformat(timespec='seconds'),
+                commit=commit,
+                python=platform.python_version(),
+                numpy=numpy.__version__,
+                platform=platform.platform())
+
+
+def grid(**params):
+    """Cartesian product of parameter lists as a list of scenario dicts
+
+    >>> grid(n_facilities=[2, 4], bom_depth=[1])
+    [{'n_facilities': 2, 'bom_depth': 1}, {'n_facilities': 4, 'bom_depth': 1}]
+    """
+    names = list(params.keys())
+    return [dict(zip(names, values)) for values in product(*[params[n] for n in names])]
+
+
+def save(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def load(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def compare(baseline, candidate):
+    """Ratios of candidate to baseline results for scenarios with identical parameters and shared micro benchmarks
+
+    :param baseline: dict or str, results or path to a results file
+    :param candidate: dict or str, results or path to a results file
+    :return: str, one line per comparison, ratios above 1 mean the candidate is faster
+    """
+    baseline = load(baseline) if type(baseline) is str else baseline
+    candidate = load(candidate) if type(candidate) is str else candidate
+    lines = ['baseline {} vs candidate {}'.format(baseline['meta'].get('commit'), candidate['meta'].get('commit'))]
+
+    base = dict([(json.dumps(s['params'], sort_keys=True), s) for s in baseline['scenarios']])
+    for scenario in candidate['scenarios']:
+        key = json.dumps(scenario['params'], sort_keys=True)
+        if key not in base or not base[key]['events_per_second'] or not scenario['events_per_second']:
+            continue
+        speedup = scenario['events_per_second'] / base[key]['events_per_second']
+        phases = ', '.join(['{} {:.2f}x'.format(p, base[key]['phases'][p] / t) for p, t in scenario['phases'].items()
+                            if t > 0 and base[key]['phases'].get(p)])
+        lines.append('{}: events/s {:.2f}x ({})'.format(key, speedup, phases))
+
+    for name, result in candidate.get('micro', {}).items():
+        if name in baseline.get('micro', {}):
+            speedup = baseline['micro'][name]['seconds_per_op'] / result['seconds_per_op']
+            lines.append('micro {}: {:.2f}x'.format(name, speedup))
+    return '\n'.join(lines)
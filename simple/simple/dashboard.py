@@ -0,0 +1,339 @@
+"""Live view of a running simulation in a Bokeh document
+
+A SimulationMonitor is added to simple.simulation.OBSERVERS and samples inventory levels, processing line queue
+depths and the event rate every 'sample_every' actions into preallocated arrays, the full resolution series stay
+on the server. A SimulationDashboard periodically decimates the series and streams the new points to its
+ColumnDataSources so the browser never holds more than about 'max_points' points per series regardless of how long
+the simulation runs. Decimation keeps the minimum and maximum of every bucket of samples ('minmax', extremes are
+never lost) or the one point of every bucket that best preserves the shape of the line ('lttb', half as many points).
+
+EXAMPLE, a bokeh server app (bokeh serve app.py) running the simulation in a thread:
+
+    >> from threading import Thread
+    >> from bokeh.plotting import curdoc
+    >> from simple import run
+    >> from simple.dashboard import SimulationMonitor, SimulationDashboard
+    >> monitor = SimulationMonitor(facilities, sample_every=50).attach()
+    >> SimulationDashboard(monitor, max_points=2000, decimation='lttb').document(curdoc())
+    >> Thread(target=run, daemon=True).start()
+"""
+from numpy import (arange, argmax, argmin, ceil, empty, full, isnan, minimum, maximum, nan, nanmean,
+                   vstack)
+from simple.simulation import CLOCK, OBSERVERS
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets downsampling, keeps the point of each of n_out equally sized buckets that
+    best preserves the visual shape of the series
+
+    :param x: numpy.ndarray, sorted x values
+    :param y: numpy.ndarray, y values
+    :param n_out: int, maximum number of points to return
+    :return: tuple of numpy.ndarray, downsampled x and y values
+    """
+    n = len(x)
+    if n_out >= n:
+        return x, y
+    bucket = int(ceil(n / max(n_out, 1)))
+    return _bucket_lttb(x, y, bucket)
+
+
+def minmax_decimate(x, y, n_out):
+    """Keep the minimum and maximum point of n_out / 2 equally sized buckets, extremes of the series are never lost
+
+    :param x: numpy.ndarray, sorted x values
+    :param y: numpy.ndarray, y values
+    :param n_out: int, maximum number of points to return
+    :return: tuple of numpy.ndarray, downsampled x and y values
+    """
+    n = len(x)
+    if n_out >= n:
+        return x, y
+    bucket = int(ceil(n / max(n_out // 2, 1)))
+    return _bucket_minmax(x, y, bucket)
+
+
+def _bucket_minmax(x, y, bucket):
+    if bucket == 1 or len(x) == 0:
+        return x, y
+    n_buckets = int(ceil(len(x) / bucket))
+    padded = full(n_buckets * bucket, nan)
+    padded[:len(y)] = y
+    padded = padded.reshape(n_buckets, bucket)
+    # nan padding only exists in the last bucket, fill it with a real value of that bucket
+    padded[isnan(padded)] = y[-1]
+
+    offsets = arange(n_buckets) * bucket
+    i_min = offsets + argmin(padded, axis=1)
+    i_max = offsets + argmax(padded, axis=1)
+    # emit the two extremes of each bucket in the order they happened
+    selected = vstack([minimum(i_min, i_max), maximum(i_min, i_max)]).T.ravel()
+    selected = minimum(selected, len(x) - 1)
+    return x[selected], y[selected]
+
+
+def _bucket_lttb(x, y, bucket, anchor=None):
+    """Largest-Triangle-Three-Buckets over fixed size buckets, 'anchor' is the (x, y) point selected before the
+    first bucket, without one the first bucket keeps its first point. The last bucket has no next bucket and is
+    compared with its own mean
+    """
+    if bucket == 1 or len(x) == 0:
+        return x, y
+    n_buckets = int(ceil(len(x) / bucket))
+    means = []
+    for values in (x, y):
+        padded = full(n_buckets * bucket, nan)
+        padded[:len(values)] = values
+        means.append(nanmean(padded.reshape(n_buckets, bucket), axis=1))
+    mean_x, mean_y = means
+
+    selected = empty(n_buckets, dtype=int)
+    for i in range(n_buckets):
+        lo, hi = i * bucket, min((i + 1) * bucket, len(x))
+        if anchor is None:
+            selected[i] = lo
+        else:
+            j = min(i + 1, n_buckets - 1)
+            area = abs((anchor[0] - mean_x[j]) * (y[lo:hi] - anchor[1]) -
+                       (anchor[0] - x[lo:hi]) * (mean_y[j] - anchor[1]))
+            selected[i] = lo + argmax(area)
+        anchor = x[selected[i]], y[selected[i]]
+    return x[selected], y[selected]
+
+
+class StreamingDecimator(object):
+    """Decimation of a growing series into fixed size buckets, the bucket size doubles whenever the decimated
+    series would be longer than 'max_points' which forces a reset of the points already sent
+
+    'minmax' keeps the minimum and maximum of every bucket, 'lttb' keeps the point of every bucket that forms the
+    largest triangle with the point kept before it and the mean of the next bucket
+    """
+    MODES = ('minmax', 'lttb')
+
+    def __init__(self, max_points=2000, mode='minmax'):
+        if mode not in self.MODES:
+            raise ValueError("decimation mode must be one of {}, not '{}'".format(self.MODES, mode))
+        self._max_points = max_points
+        self._mode = mode
+        self._per_bucket = 2 if mode == 'minmax' else 1
+        self._bucket = 1
+        self._consumed = 0
+        self._anchor = None
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @property
+    def bucket(self):
+        return self._bucket
+
+    def update(self, x, y):
+        """Decimate samples of the series that were not consumed by a previous update
+
+        :param x: numpy.ndarray, all x values of the series
+        :param y: numpy.ndarray, all y values of the series
+        :return: tuple (reset, x, y), when reset is True the returned points replace every point already sent
+            otherwise they are appended to them
+        """
+        n = len(x)
+        reset = False
+        while n // self._bucket * min(self._per_bucket, self._bucket) > self._max_points:
+            self._bucket *= 2
+            reset = True
+        if reset:
+            self._consumed = 0
+            self._anchor = None
+
+        stop = self._consumed + (n - self._consumed) // self._bucket * self._bucket
+        chunk_x, chunk_y = x[self._consumed:stop], y[self._consumed:stop]
+        if self._mode == 'lttb':
+            new_x, new_y = _bucket_lttb(chunk_x, chunk_y, self._bucket, self._anchor)
+            if len(new_x) > 0:
+                self._anchor = new_x[-1], new_y[-1]
+        else:
+            new_x, new_y = _bucket_minmax(chunk_x, chunk_y, self._bucket)
+        self._consumed = stop
+        return reset, new_x, new_y
+
+
+class SeriesBuffer(object):
+    """Growable table of float samples, capacity doubles when full so appending is amortized O(1)"""
+
+    def __init__(self, columns, capacity=1024):
+        self._columns = list(columns)
+        self._index = dict([(c, i) for i, c in enumerate(self._columns)])
+        self._data = empty((capacity, len(self._columns)))
+        self._n = 0
+
+    @property
+    def columns(self):
+        return self._columns
+
+    def __len__(self):
+        return self._n
+
+    def append(self, row):
+        if self._n == len(self._data):
+            data = empty((2 * len(self._data), len(self._columns)))
+            data[:self._n] = self._data
+            self._data = data
+        self._data[self._n] = row
+        self._n += 1
+
+    def __getitem__(self, column):
+        return self._data[:self._n, self._index[column]]
+
+
+class SimulationMonitor(object):
+    """Observer for simple.simulation.run that samples the state of facilities every 'sample_every' actions
+
+    Sampled columns are 'time' (simulation steps), 'event_rate' (actions per simulation step since the previous
+    sample), 'inventory:<facility name>' (components held in the facility's stores) and 'queue:<line name>' (jobs
+    waiting for a server of each processing line)
+    """
+
+    def __init__(self, facilities=(), sample_every=100):
+        self._facilities = list(facilities)
+        self._lines = [p_l for facility in self._facilities for p_l in facility.processing_lines]
+        self._sample_every = sample_every
+        self._countdown = sample_every
+        self._n_events = 0
+        self._last_events = 0
+        self._last_time = None
+
+        columns = ['time', 'event_rate']
+        columns += ['inventory:' + facility.name for facility in self._facilities]
+        columns += ['queue:' + p_l.name for p_l in self._lines]
+        self._buffer = SeriesBuffer(columns)
+
+    @property
+    def series(self):
+        return self._buffer
+
+    @property
+    def n_events(self):
+        return self._n_events
+
+    def attach(self):
+        if self not in OBSERVERS:
+            OBSERVERS.append(self)
+        return self
+
+    def detach(self):
+        if self in OBSERVERS:
+            OBSERVERS.remove(self)
+        return self
+
+    def __call__(self, action):
+        self._n_events += 1
+        self._countdown -= 1
+        if self._countdown == 0:
+            self._countdown = self._sample_every
+            self.sample()
+
+    def sample(self):
+        time = CLOCK.to_simtime(CLOCK())
+        if self._last_time is None or time <= self._last_time:
+            rate = 0.0 if self._last_time is None else nan
+        else:
+            rate = (self._n_events - self._last_events) / (time - self._last_time)
+        if rate != rate:
+            # several samples at the same simulation time, keep the previous rate
+            rate = self._buffer['event_rate'][-1] if len(self._buffer) > 0 else 0.0
+        else:
+            self._last_events = self._n_events
+            self._last_time = time
+
+        row = [time, rate]
+        row += [sum([c_s.count for c_s in facility.component_stores]) for facility in self._facilities]
+        row += [p_l.queue_length for p_l in self._lines]
+        self._buffer.append(row)
+
+
+class SimulationDashboard(object):
+    """Bokeh figures of a SimulationMonitor's series which are updated with ColumnDataSource.stream and patch"""
+
+    def __init__(self, monitor, max_points=2000, period=500, decimation='minmax'):
+        """
+
+        :param monitor: SimulationMonitor instance
+        :param max_points: int, maximum number of points of each series sent to the browser
+        :param period: int, milliseconds between updates of the document
+        :param decimation: str, 'minmax' or 'lttb', see StreamingDecimator
+        """
+        if decimation not in StreamingDecimator.MODES:
+            raise ValueError("decimation must be one of {}, not '{}'".format(StreamingDecimator.MODES, decimation))
+        self._monitor = monitor
+        self._max_points = max_points
+        self._period = period
+        self._decimation = decimation
+        self._sources = {}
+        self._decimators = {}
+        self._n_sent = {}
+
+    def _figure(self, title, columns):
+        from bokeh.models import ColumnDataSource
+        from bokeh.palettes import Category10_10
+        from bokeh.plotting import figure
+
+        fig = figure(title=title, height=250, sizing_mode='stretch_width', x_axis_label='simulation steps')
+        for i, column in enumerate(columns):
+            self._sources[column] = ColumnDataSource(dict(x=[], y=[]))
+            self._decimators[column] = StreamingDecimator(self._max_points, self._decimation)
+            self._n_sent[column] = 0
+            fig.line('x', 'y', source=self._sources[column], legend_label=column.split(':', 1)[-1],
+                     color=Category10_10[i % 10])
+        fig.legend.location = 'top_left'
+        fig.legend.click_policy = 'hide'
+        return fig
+
+    def document(self, doc=None):
+        """Add the dashboard's figures and periodic update to a bokeh document
+
+        :param doc: bokeh.document.Document, default None uses bokeh.plotting.curdoc()
+        :return: bokeh.document.Document
+        """
+        try:
+            from bokeh.layouts import column
+            from bokeh.plotting import curdoc
+        except ImportError:
+            raise ImportError("'SimulationDashboard' requires bokeh to be installed")
+
+        if doc is None:
+            doc = curdoc()
+        columns = self._monitor.series.columns
+        figures = [self._figure('inventory', [c for c in columns if c.startswith('inventory:')]),
+                   self._figure('queue depth', [c for c in columns if c.startswith('queue:')]),
+                   self._figure('event rate', ['event_rate'])]
+        for fig in figures[1:]:
+            fig.x_range = figures[0].x_range
+        doc.add_root(column(*figures, sizing_mode='stretch_width'))
+        doc.add_periodic_callback(self.update, self._period)
+        return doc
+
+    def update(self):
+        """Send points sampled since the last update to the browser, the newest sample is always shown as the last
+        point of each series and is patched with committed points as they become available
+        """
+        series = self._monitor.series
+        n = len(series)
+        if n == 0:
+            return
+        x = series['time']
+        for column, source in self._sources.items():
+            y = series[column]
+            reset, new_x, new_y = self._decimators[column].update(x[:n], y[:n])
+            live_x, live_y = float(x[n - 1]), float(y[n - 1])
+            new_x = list(new_x) + [live_x]
+            new_y = list(new_y) + [live_y]
+            if reset or self._n_sent[column] == 0:
+                source.data = dict(x=new_x, y=new_y)
+                self._n_sent[column] = len(new_x)
+                continue
+            # the previous live point is replaced by the first new point, the rest is streamed
+            last = len(source.data['x']) - 1
+            source.patch(dict(x=[(last, new_x[0])], y=[(last, new_y[0])]))
+            if len(new_x) > 1:
+                source.stream(dict(x=new_x[1:], y=new_y[1:]), rollover=2 * self._max_points)
+            self._n_sent[column] += len(new_x) - 1
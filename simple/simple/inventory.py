@@ -0,0 +1,64 @@
+from collections import defaultdict
+from itertools import product
+
+
+class InventoryLedger(object):
+    """Running counts of components by model type, kind of owner and state
+
+    Every change updates the count of the (model_type, owner_kind, state) key and all of its marginals, where
+    None stands for any value, so any count can be read in O(1) without walking facilities and platforms. Expired
+    components are a running total and are only counted when the 'expired' state is asked for explicitly
+
+    EXAMPLE:
+    >> INVENTORY.count('widget', state='stored')            # widgets in any store
+    >> INVENTORY.count(owner_kind='Platform')               # components of any type installed on platforms
+    >> INVENTORY.count('widget', 'ProcessingFacility', 'stored')
+    """
+    STATES = ('stored', 'installed', 'expired')
+
+    def __init__(self):
+        self._counts = defaultdict(int)
+
+    def add(self, model_type, owner_kind, state, n=1):
+        if state not in self.STATES:
+            raise ValueError("'{}' is not a valid inventory state, expected one of {}".format(state, self.STATES))
+        states = (state,) if state == 'expired' else (state, None)
+        for key in product((model_type, None), (owner_kind, None), states):
+            self._counts[key] += n
+
+    def remove(self, model_type, owner_kind, state, n=1):
+        self.add(model_type, owner_kind, state, n=-n)
+
+    def count(self, model_type=None, owner_kind=None, state=None):
+        """Number of components matching the arguments, an argument of None matches any value
+
+        :param model_type: str or ComponentType
+        :param owner_kind: str, name of the owner's class, 'ProcessingFacility', 'Platform' or 'Component'
+        :param state: str, one of InventoryLedger.STATES
+        :return: int
+        """
+        return self._counts.get((model_type, owner_kind, state), 0)
+
+    def counts(self):
+        """Counts of every fully defined (model_type, owner_kind, state) key"""
+        return dict([(k, n) for k, n in self._counts.items() if None not in k and n != 0])
+
+    def reset(self):
+        self._counts.clear()
+
+    def report(self):
+        lines = ['{} - {} - {}: {:d}'.format(*k, n) for k, n in sorted(self.counts().items(), key=str)]
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return self.report()
+
+
+def owner_kind(owner):
+    """Name of the class of the facility, platform or component that ultimately holds a component's store"""
+    if type(owner).__name__ == 'StorageComponent':
+        owner = owner.owner
+    return type(owner).__name__ if owner is not None else None
+
+
+INVENTORY = InventoryLedger()
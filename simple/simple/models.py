@@ -1,6 +1,6 @@
 from simple.trees import AbstractTreeStrict
 from simple.objects import Component
-from simple.processes import Process, Consume
+from simple.processes import Process, Expire
 from simple.simulation import CLOCK
 
 DEFINED_TYPES = []
@@ -80,7 +80,7 @@ class ComponentModel(AbstractTreeStrict):
         self._creation_time_steps = creation_time_steps
         self._base_failure_rate = base_failure_rate
         self._components = []
-        self._expire_process = Process(Consume(inputs=(self,)), name='expire_' + model_name)
+        self._expire_process = Process(Expire(inputs=(self,)), name='expire_' + model_name)
 
     @property
     def node_name(self):
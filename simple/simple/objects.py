@@ -1,6 +1,8 @@
 from copy import copy
+from heapq import heappush, heappop
 from simple.trees import AbstractTreeStrict
-from simple.simulation import CLOCK
+from simple.simulation import Action, CLOCK
+from simple.inventory import INVENTORY, owner_kind
 from numpy import argmax, argmin
 
 
@@ -74,6 +76,22 @@ class Component(AbstractTreeStrict):
             self.add_child(c)
         return None
 
+    def add_child(self, node):
+        super().add_child(node)
+        INVENTORY.add(node.model.name, 'Component', 'installed')
+
+    def remove_child(self, node):
+        removed = super().remove_child(node)
+        INVENTORY.remove(node.model.name, 'Component', 'installed')
+        return removed
+
+    def descendants(self):
+        """Components installed on this component and, recursively, on the components installed on it"""
+        nodes = []
+        for child in self.children:
+            nodes += [child] + child.descendants()
+        return nodes
+
 
 class MaintenanceSchedule(object):
     def __init__(self,
@@ -129,6 +147,15 @@ class StorageComponent(object):
     def capacity(self):
         return self._capacity
 
+    @property
+    def owner_kind(self):
+        return owner_kind(self)
+
+    @property
+    def state(self):
+        # components in a platform's stores are installed on it, anywhere else they are waiting in storage
+        return 'installed' if self.owner_kind == 'Platform' else 'stored'
+
     def assign_owner(self, owner):
         self._owner = owner
 
@@ -147,18 +174,19 @@ class StorageComponent(object):
         component.assign_owner(self)
         self._count += 1
         self._changes.append((CLOCK(), 1))
+        INVENTORY.add(component.model.name, self.owner_kind, self.state)
 
     def pluck(self, index=None, paradigm=None):
 
-        if type(index) is not None:
-            return self._storage.pop(index)
-
-        if paradigm is None:
-            paradigm = self._selection_paradigm
-        index = paradigm(self._storage)
+        if index is None:
+            if paradigm is None:
+                paradigm = self._selection_paradigm
+            index = paradigm(self._storage)
         self._count -= 1
         self._changes.append((CLOCK(), -1))
-        return self._storage.pop(index)
+        component = self._storage.pop(index)
+        INVENTORY.remove(component.model.name, self.owner_kind, self.state)
+        return component
 
     def _test_selection_paradigm(self, paradigm, n=50):
         storage = copy(self._storage)
@@ -254,8 +282,26 @@ class ProcessingFacility(object):
         index = argmax([c_s.count / c_s.capacity for c_s in valid_stores])
         return valid_stores[index]
 
-    def add_processing_line(self, *processes):
+    @property
+    def component_stores(self):
+        return self._component_stores
+
+    @property
+    def processing_lines(self):
+        return self._processing_lines
+
+    def add_processing_line(self, *processes, n_servers=1):
+        """Add a line running 'processes', a trailing number is the line's processing multiplier and when two
+        trailing numbers are passed they are the processing multiplier and the number of servers
+
+        :param processes: Process instances optionally followed by a multiplier and number of servers
+        :param n_servers: int, number of jobs the line can run at the same time
+        """
         if 'int' in type(processes[-1]).__name__ or 'float' in type(processes[-1]).__name__:
+            if len(processes) > 1 and ('int' in type(processes[-2]).__name__ or
+                                       'float' in type(processes[-2]).__name__):
+                n_servers = int(processes[-1])
+                processes = processes[:-1]
             multiplier = float(processes[-1])
             processes = processes[:-1]
         else:
@@ -263,13 +309,32 @@ class ProcessingFacility(object):
         if len(processes) == 0 and hasattr(processes[0], '__iter__'):
             processes = processes[0]
 
-        self._processing_lines.append(ProcessingLine(processing_multiplier=multiplier, processes=processes))
+        self._processing_lines.append(ProcessingLine(processing_multiplier=multiplier, processes=processes,
+                                                     n_servers=n_servers))
         self._processing_lines[-1].assign_owner(self)
 
         for process in processes:
             if process.name not in self.available_processes:
                 self._available_processes.append(process.name)
 
+    def submit(self, process, inputs=(), priority=0):
+        """Submit a job for 'process' to the least loaded processing line that can run it
+
+        :param process: Process instance
+        :param inputs: list of Component instances passed to the process when the job completes
+        :param priority: number, jobs with lower priority values are started first
+        :return: LineJob instance
+        """
+        lines = [p_l for p_l in self._processing_lines if process.name in p_l.available_processes]
+        if len(lines) == 0:
+            raise ValueError("Process '{}' is not available at ProcessingFacility '{}'".format(process.name,
+                                                                                             self.name))
+        index = argmin([(p_l.n_busy + p_l.queue_length) / p_l.n_servers for p_l in lines])
+        return lines[index].submit(process, inputs=inputs, priority=priority)
+
+    def line_statistics(self):
+        return dict([(p_l.name, p_l.statistics()) for p_l in self._processing_lines])
+
     def pull_component(self, comordel):
         if type(comordel) is Component:
             for c_s in self._component_stores:
@@ -304,10 +369,26 @@ class ProcessingFacility(object):
 
 
 class ProcessingLine(object):
+    """A line of parallel servers at a facility that runs processes, jobs that arrive while every server is busy
+    wait in a priority queue
+
+    Service time of a job is the total 'time_steps' of its process scaled by the line's 'processing_multiplier'.
+    Time weighted utilization and queue length and job wait times are accumulated every time the line changes
+    state so they can be read at any point of a simulation without post-processing
+    """
     ID = 0
     ABBREVIATION = 'PL'
 
-    def __init__(self, name=None, processing_multiplier=1.0, processes=()):
+    def __init__(self, name=None, processing_multiplier=1.0, processes=(), n_servers=1):
+        """
+
+        :param name: str, name of line, default None creates a name from the line's id
+        :param processing_multiplier: float, scale applied to the time steps of every process run on the line
+        :param processes: iterable of Process instances the line is able to run
+        :param n_servers: int, number of jobs the line can run at the same time
+        """
+        if n_servers < 1:
+            raise ValueError("'ProcessingLine' must have at least one server, {} were requested".format(n_servers))
         self._id = ProcessingLine.ID + 0
         ProcessingLine.ID += 1
         self._name = name if name is not None else '{}-{:05d}'.format(self.ABBREVIATION, self._id)
@@ -319,6 +400,27 @@ class ProcessingLine(object):
         self._owner = None
         self._ = []
 
+        self._n_servers = n_servers
+        self._active_jobs = []
+        # heap of (priority, sequence, job), sequence keeps jobs with the same priority first in first out
+        self._queue = []
+        self._sequence = 0
+
+        # running totals for time weighted statistics, times are in simulation steps
+        self._last_change = None
+        self._elapsed = 0.0
+        self._busy_time = 0.0
+        self._queue_time = 0.0
+        self._max_queue_length = 0
+        self._n_started = 0
+        self._n_completed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @property
+    def name(self):
+        return self._name
+
     @property
     def owner(self):
         return self._owner
@@ -327,6 +429,22 @@ class ProcessingLine(object):
     def available_processes(self):
         return self._available_processes
 
+    @property
+    def processing_multiplier(self):
+        return self._processing_multiplier
+
+    @property
+    def n_servers(self):
+        return self._n_servers
+
+    @property
+    def n_busy(self):
+        return len(self._active_jobs)
+
+    @property
+    def queue_length(self):
+        return len(self._queue)
+
     def assign_owner(self, owner):
         self._owner = owner
         for process in self._processes:
@@ -340,13 +458,143 @@ class ProcessingLine(object):
             self._processes.append(process)
             self._available_processes.append(process.name)
 
+    def service_time(self, process):
+        return process.time_steps * self._processing_multiplier
+
+    def step_time(self, process, step):
+        """Time a job holds a server for step 'step' of 'process', the service time is the sum over the steps"""
+        return process.process_steps[step].step_duration * self._processing_multiplier
+
+    def submit(self, process, inputs=(), priority=0):
+        """Start a job for 'process' on a free server or queue it until a server is released
+
+        :param process: Process instance available on the line
+        :param inputs: list of Component instances passed to the process when the job completes
+        :param priority: number, jobs with lower priority values are started first
+        :return: LineJob instance
+        """
+        if process.name not in self._available_processes:
+            raise ValueError("Process '{}' is not available on ProcessingLine '{}', available processes: "
+                             "{}".format(process.name, self.name, self._available_processes))
+        self._update_statistics()
+        job = LineJob(self, process, inputs=inputs, priority=priority)
+        if len(self._active_jobs) < self._n_servers:
+            self._start(job)
+        else:
+            heappush(self._queue, (priority, self._sequence, job))
+            self._sequence += 1
+            self._max_queue_length = max(self._max_queue_length, len(self._queue))
+        return job
+
+    def release(self, job):
+        """Free the server held by 'job' and start the next queued job"""
+        self._update_statistics()
+        self._active_jobs.remove(job)
+        self._n_completed += 1
+        if len(self._queue) > 0:
+            self._start(heappop(self._queue)[-1])
+        self._active_process = self._active_jobs[-1].process if len(self._active_jobs) > 0 else None
+
+    def _start(self, job):
+        wait = CLOCK.to_simtime(CLOCK()) - CLOCK.to_simtime(job.date_queued)
+        self._n_started += 1
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
+        self._active_jobs.append(job)
+        self._active_process = job.process
+        if len(job.process.process_steps) == 0:
+            Action(CLOCK(), job, inputs=job.inputs, owner=self._owner)
+        else:
+            Action(CLOCK + self.step_time(job.process, 0), job, inputs=job.inputs, owner=self._owner)
+
+    def _update_statistics(self):
+        now = CLOCK.to_simtime(CLOCK())
+        if self._last_change is not None:
+            delta = now - self._last_change
+            self._elapsed += delta
+            self._busy_time += delta * len(self._active_jobs)
+            self._queue_time += delta * len(self._queue)
+        self._last_change = now
+
+    def statistics(self):
+        """Time weighted utilization and queue length and wait times of jobs on the line up to the current time
+
+        :return: dict
+        """
+        self._update_statistics()
+        elapsed = self._elapsed if self._elapsed > 0 else float('nan')
+        return {'utilization': self._busy_time / (elapsed * self._n_servers),
+                'mean_queue_length': self._queue_time / elapsed,
+                'max_queue_length': self._max_queue_length,
+                'queue_length': len(self._queue),
+                'busy': len(self._active_jobs),
+                'started': self._n_started,
+                'completed': self._n_completed,
+                'mean_wait': self._wait_total / self._n_started if self._n_started > 0 else 0.0,
+                'max_wait': self._wait_max}
+
     def report(self):
-        return self.__repr__() + ' (active process: {})'.format(self._active_process)
+        return self.__repr__() + ' (active process: {}, busy: {:d} / {:d}, queued: {:d})'.format(
+            self._active_process, len(self._active_jobs), self._n_servers, len(self._queue))
 
     def __repr__(self):
         return self._name
 
 
+class LineJob(object):
+    """A process waiting for or holding a server of a ProcessingLine, every step of the process is run at the end
+    of its scaled duration and the server is released after the last one
+    """
+    ID = 0
+    ABBREVIATION = 'JB'
+
+    def __init__(self, line, process, inputs=(), priority=0):
+        self._id = LineJob.ID + 0
+        LineJob.ID += 1
+        self._line = line
+        self._process = process
+        self._inputs = list(inputs)
+        self._priority = priority
+        self._date_queued = CLOCK()
+
+    @property
+    def name(self):
+        return '{}-{:05d} ({})'.format(self.ABBREVIATION, self._id, self._process.name)
+
+    @property
+    def line(self):
+        return self._line
+
+    @property
+    def process(self):
+        return self._process
+
+    @property
+    def inputs(self):
+        return self._inputs
+
+    @property
+    def priority(self):
+        return self._priority
+
+    @property
+    def date_queued(self):
+        return self._date_queued
+
+    def __call__(self, inputs=(), owner=None, step=0):
+        if step < len(self._process.process_steps):
+            remaining = self._process.run_step(list(inputs), owner=owner, step=step)
+            step += 1
+            if step < len(self._process.process_steps):
+                Action(CLOCK + self._line.step_time(self._process, step), self, inputs=remaining, owner=owner,
+                       step=step)
+                return
+        self._line.release(self)
+
+    def __repr__(self):
+        return self.name
+
+
 class Platform(object):
     ID = 0
     ABBREVIATION = 'PL'
@@ -356,6 +604,8 @@ class Platform(object):
         Platform.ID += 1
         self._name = name if name is not None else '{}-{:05}'.format(self.ABBREVIATION, self._id)
         self._component_stores = [StorageComponent(*t_c) for t_c in storage_types_capacities]
+        for c_s in self._component_stores:
+            c_s.assign_owner(self)
         self._owner = None
 
     @property
@@ -1,5 +1,6 @@
 from collections import defaultdict
 from simple.simulation import Action, CLOCK
+from simple.inventory import INVENTORY, owner_kind
 
 
 class Process(object):
@@ -71,6 +72,7 @@ class Process(object):
             self._inputs.append(needed)
 
         self._process_steps.append(process_step)
+        self._time_steps += process_step.step_duration
 
         self._outputs.append(process_step.outputs)
 
@@ -80,6 +82,20 @@ class Process(object):
         if all([t in in_types for t in req_types]) and len(in_types) == len(req_types):
             return
 
+        remaining = self.run_step(inputs, owner=owner, step=step)
+        if step + 1 < len(self._process_steps):
+            # create new action for next step in process
+            Action(CLOCK() + self.process_steps[step].step_duration, self, inputs=remaining, step=step + 1)
+
+    def run_step(self, inputs, owner=None, step=0):
+        """Run a single step of the process without scheduling the next one, outputs of the last step are stored
+        at 'owner'
+
+        :param inputs: list of Component instances
+        :param owner: facility storing the outputs, default None uses the process' owner
+        :param step: int, index of the step
+        :return: list of Component instances the step did not use
+        """
         if owner is None:
             owner = self._owner
 
@@ -87,15 +103,11 @@ class Process(object):
         received, need, remaining = p_s.parse_inputs(inputs)
         retrieved = [self.pull_input(model_name) for model_name in need]
         outputs = p_s(received + retrieved)
-        step += 1
-        if step >= len(self._process_steps):
-
+        if step + 1 >= len(self._process_steps):
             for component in outputs:
                 # should there be store actions?
                 owner.store(component)
-        else:
-            # create new action for next step in process
-            Action(CLOCK() + p_s.step_duration, self, inputs=remaining, step=step)
+        return remaining
 
     def __repr__(self):
         return self.name
@@ -270,4 +282,21 @@ class Consume(ProcessStep):
                     root_owner = root_owner.owner
                     owner_type = type(root_owner).__name__
                 root_owner.pull_component(component)
+            # components installed on a consumed component leave the inventory with it
+            for child in component.descendants():
+                INVENTORY.remove(child.model.name, 'Component', 'installed')
         return []
+
+
+class Expire(Consume):
+    """Consume components that reached the end of their life and count them as expired in the inventory"""
+    ID = 0
+    ABBREVIATION = 'EX'
+
+    def __call__(self, inputs):
+        received, need, remaining = self.parse_inputs(inputs)
+        kinds = [owner_kind(component.owner) for component in received]
+        outputs = super().__call__(received)
+        for component, kind in zip(received, kinds):
+            INVENTORY.add(component.model.name, kind, 'expired')
+        return outputs
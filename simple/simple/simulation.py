@@ -1,4 +1,5 @@
 import datetime as dt
+from simple.inventory import INVENTORY
 
 
 class Action(object):
@@ -101,5 +102,48 @@ class SimulationQueue(list):
         return super().sort(reverse=True)
 
 
+def run(until=None, max_actions=None):
+    """Call actions in MAIN_ACTIONS in date order, advancing CLOCK to the date of each action, every callable in
+    OBSERVERS is called with the action after it runs
+
+    :param until: datetime or number of simulation steps from the start of CLOCK, default None runs until
+        there are no more actions
+    :param max_actions: int, maximum number of actions to call, default None has no limit
+    :return: int, number of actions called
+    """
+    if until is not None and type(until) is not dt.datetime:
+        until = CLOCK.to_datetime(until)
+
+    n = 0
+    while len(MAIN_ACTIONS) > 0 and (max_actions is None or n < max_actions):
+        if until is not None and MAIN_ACTIONS[-1].date > until:
+            break
+        action = MAIN_ACTIONS.pop()
+        if action.date > CLOCK():
+            CLOCK.append(action.date)
+        action()
+        n += 1
+        for observer in OBSERVERS:
+            observer(action)
+    return n
+
+
+def reset(*args, **kwargs):
+    """Restart CLOCK at the date defined by args and kwargs, remove all scheduled actions and observers and clear
+    the inventory counts
+    """
+    step = kwargs.pop('step', CLOCK._step)
+    del CLOCK[:]
+    try:
+        CLOCK.append(dt.datetime(*args, **kwargs))
+    except TypeError:
+        CLOCK.append(dt.datetime.now())
+    CLOCK._step = step
+    del MAIN_ACTIONS[:]
+    del OBSERVERS[:]
+    INVENTORY.reset()
+
+
 CLOCK = SimulationClock()
 MAIN_ACTIONS = SimulationQueue()
+OBSERVERS = []